@@ -0,0 +1,113 @@
+"""
+Бенчмарк роста провинции: время роста в зависимости от размера провинции.
+
+Сравнивает ProvinceGrower с прежней реализацией, которая на каждом шаге
+пересчитывала центроид и оценки всех клеток фронта.
+
+Запуск:
+    python benchmarks/province_growth.py
+    python benchmarks/province_growth.py --sizes 25 100 400 --repeat 5
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Callable, List, Set, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.pgg_game.world.province_growth import ProvinceGrower
+
+Cell = Tuple[int, int]
+DIRECTIONS = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+
+def reference_grow(start: Cell, target_size: int, available_cells: Set[Cell]) -> List[Cell]:
+    """Прежний рост провинции (MapSystem._grow_province_from_center)."""
+    province = {start}
+    order = [start]
+    frontier = {start}
+
+    while len(province) < target_size and frontier:
+        best_cell = None
+        best_score = float('-inf')
+
+        for cell in frontier:
+            x, y = cell
+            for dx, dy in DIRECTIONS:
+                neighbor = (x + dx, y + dy)
+                if neighbor not in available_cells or neighbor in province:
+                    continue
+
+                neighbors = sum(
+                    1 for nx, ny in [(neighbor[0] + dx, neighbor[1] + dy)
+                                   for dx, dy in DIRECTIONS]
+                    if (nx, ny) in province
+                )
+
+                cx = sum(x for x, _ in province) / len(province)
+                cy = sum(y for _, y in province) / len(province)
+                distance = ((neighbor[0] - cx) ** 2 + (neighbor[1] - cy) ** 2) ** 0.5
+
+                score = neighbors - (distance * 0.5)
+                if score > best_score:
+                    best_score = score
+                    best_cell = neighbor
+
+        if best_cell is None:
+            break
+
+        province.add(best_cell)
+        order.append(best_cell)
+        frontier.add(best_cell)
+        frontier = {cell for cell in frontier
+                    if any((cell[0] + dx, cell[1] + dy) not in province
+                           for dx, dy in DIRECTIONS)}
+
+    return order
+
+def grower_grow(start: Cell, target_size: int, available_cells: Set[Cell]) -> List[Cell]:
+    """Рост провинции через ProvinceGrower."""
+    return ProvinceGrower(start, available_cells).grow(target_size)
+
+def make_land(size: int, seed: int) -> Tuple[Cell, Set[Cell]]:
+    """Создает сушу с водными дырами, в которую помещается провинция размера size."""
+    side = int(np.ceil(np.sqrt(size * 2))) + 2
+    land = np.random.default_rng(seed).random((side, side)) < 0.85
+    cells = {(int(x), int(y)) for y, x in zip(*np.nonzero(land))}
+    center = (side // 2, side // 2)
+    cells.add(center)
+    return center, cells
+
+def measure(grow: Callable, size: int, repeat: int) -> float:
+    """Возвращает лучшее время роста провинции размера size в секундах."""
+    best = float('inf')
+    for seed in range(repeat):
+        start, cells = make_land(size, seed)
+        began = time.perf_counter()
+        grow(start, size, cells)
+        best = min(best, time.perf_counter() - began)
+    return best
+
+def main() -> None:
+    """Печатает таблицу времени роста."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 25, 50, 100, 200, 400])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--reference-limit', type=int, default=400,
+                        help='Максимальный размер для прежней реализации')
+    args = parser.parse_args()
+
+    print(f"{'размер':>8} {'прежний, мс':>14} {'ProvinceGrower, мс':>20} {'ускорение':>10}")
+    for size in args.sizes:
+        grower = measure(grower_grow, size, args.repeat)
+        if size <= args.reference_limit:
+            reference = measure(reference_grow, size, args.repeat)
+            print(f"{size:>8} {reference * 1000:>14.2f} {grower * 1000:>20.2f} "
+                  f"{reference / grower:>9.1f}x")
+        else:
+            print(f"{size:>8} {'-':>14} {grower * 1000:>20.2f} {'-':>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Пакетная генерация карт без окна игры.
+
+Строит карту для каждого сида через MapSystem в пуле процессов и пишет
+отчет JSONL: по строке на сид с числом попыток, временем этапов, размером
+суши, числом и размерами провинций и причинами неудачных попыток. Ошибка
+одного сида не прерывает пакет: ее тип и текст попадают в строку отчета.
+Итоговая статистика печатается в stderr.
+
+Запуск:
+    python generate_maps.py --count 1000 --workers 4 --output report.jsonl
+    python generate_maps.py --seeds 7 42 1337 --method growth
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List
+
+# Окно не нужно, и приветствие pygame не должно попадать в отчет
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__))))
+
+from src.pgg_game.systems.map_system import MapSystem
+from src.pgg_game.world.game_world import GameWorld
+from src.pgg_game.world.map_generator_settings import MapGenerationSettings
+from src.pgg_game.world.province_partitioner import PartitionMethod
+
+def generate_report(seed: int, method: str) -> Dict[str, Any]:
+    """
+    Строит карту для сида и собирает ее статистику.
+
+    Args:
+        seed: Сид карты
+        method: Способ разбиения на провинции (значение PartitionMethod)
+
+    Returns:
+        Dict[str, Any]: Строка отчета
+    """
+    settings = MapGenerationSettings(seed=seed, province_method=PartitionMethod(method))
+    map_system = MapSystem(settings)
+    report: Dict[str, Any] = {'seed': seed}
+
+    began = time.perf_counter()
+    try:
+        # MapSystem печатает ход попыток - в пакетном режиме он не нужен
+        with contextlib.redirect_stdout(io.StringIO()):
+            map_system.generate_map(GameWorld())
+    except Exception as e:
+        report['ok'] = False
+        report['error_type'] = type(e).__name__
+        report['error'] = str(e)
+    else:
+        report['ok'] = True
+    elapsed = time.perf_counter() - began
+
+    report['attempts'] = map_system.attempts
+    report['failures'] = dict(Counter(map_system.attempt_failures))
+    report['stage_ms'] = {
+        stage: round(seconds * 1000, 3)
+        for stage, seconds in map_system.stage_timings.items()
+    }
+    report['total_ms'] = round(elapsed * 1000, 3)
+
+    if report['ok']:
+        sizes = [p.size for p in map_system.province_manager.provinces.values()]
+        report['map_seed'] = map_system.seed
+        report['land_cells'] = int(map_system.grid.sum())
+        report['provinces'] = len(sizes)
+        report['province_sizes'] = {
+            str(size): count for size, count in sorted(Counter(sizes).items())
+        }
+    return report
+
+def run_reports(seeds: List[int], method: str, workers: int) -> Iterator[Dict[str, Any]]:
+    """Строит отчеты по сидам в порядке сидов."""
+    if workers <= 1:
+        for seed in seeds:
+            yield generate_report(seed, method)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunksize = max(1, len(seeds) // (workers * 8))
+        yield from executor.map(
+            generate_report, seeds, [method] * len(seeds), chunksize=chunksize
+        )
+
+def summarize(reports: List[Dict[str, Any]], elapsed: float) -> str:
+    """Формирует итоговую статистику пакета."""
+    ok = [report for report in reports if report['ok']]
+    failures = Counter()
+    errors = Counter()
+    for report in reports:
+        failures.update(report['failures'])
+        if not report['ok']:
+            errors[report['error_type']] += 1
+
+    lines = [
+        f"Карт: {len(reports)}, успешно: {len(ok)}",
+        f"Время: {elapsed:.2f} с, {len(reports) / elapsed:.1f} карт/с"
+    ]
+    if ok:
+        attempts = sum(report['attempts'] for report in ok) / len(ok)
+        provinces = sum(report['provinces'] for report in ok) / len(ok)
+        lines.append(f"Среднее число попыток: {attempts:.2f}, провинций: {provinces:.2f}")
+    if failures:
+        lines.append("Неудачные попытки: " + ", ".join(
+            f"{reason} {count}" for reason, count in failures.most_common()
+        ))
+    if errors:
+        lines.append("Ошибки: " + ", ".join(
+            f"{error} {count}" for error, count in errors.most_common()
+        ))
+    return "\n".join(lines)
+
+def main() -> None:
+    """Точка входа пакетной генерации."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seeds', type=int, nargs='+',
+                        help='Явный список сидов (вместо --start/--count)')
+    parser.add_argument('--start', type=int, default=0, help='Первый сид')
+    parser.add_argument('--count', type=int, default=100, help='Количество сидов')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Количество рабочих процессов')
+    parser.add_argument('--method', choices=[m.value for m in PartitionMethod],
+                        default=MapGenerationSettings.province_method.value,
+                        help='Способ разбиения на провинции')
+    parser.add_argument('--output', default='-',
+                        help='Файл отчета JSONL (по умолчанию stdout)')
+    args = parser.parse_args()
+
+    seeds = args.seeds or list(range(args.start, args.start + args.count))
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+
+    reports = []
+    began = time.perf_counter()
+    try:
+        for report in run_reports(seeds, args.method, args.workers):
+            reports.append(report)
+            output.write(json.dumps(report, ensure_ascii=False) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(summarize(reports, time.perf_counter() - began), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
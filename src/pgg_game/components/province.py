@@ -1,12 +1,32 @@
 """Компонент провинции."""
-from typing import Set, List, Tuple, Dict, Optional
+import random
+from typing import Iterable, Set, List, Tuple, Dict, Optional
 from dataclasses import dataclass, field
 
+import numpy as np
+
+# Шаг строки в ключе клетки: ключ клетки (x, y) равен y * CELL_KEY_STRIDE + x,
+# поэтому порядок ключей - построчный порядок клеток (координаты не меньше 0)
+CELL_KEY_STRIDE = 1 << 32
+
+# Соседи клетки (окрестность фон Неймана)
+DIRECTIONS = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+
+def cell_keys(xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    """Переводит координаты клеток в ключи (int64)."""
+    return np.asarray(ys, dtype=np.int64) * CELL_KEY_STRIDE + np.asarray(xs, dtype=np.int64)
+
+def key_cells(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Переводит ключи клеток в координаты (xs, ys)."""
+    ys, xs = np.divmod(keys, CELL_KEY_STRIDE)
+    return xs, ys
+
 @dataclass
 class Province:
     """Класс, представляющий провинцию на карте."""
     
-    def __init__(self, id: int, center_x: int, center_y: int):
+    def __init__(self, id: int, center_x: int, center_y: int,
+                 rng: Optional[random.Random] = None):
         """
         Инициализация провинции.
         
@@ -14,42 +34,173 @@ class Province:
             id (int): Уникальный идентификатор провинции
             center_x (int): X координата центра провинции
             center_y (int): Y координата центра провинции
+            rng (random.Random): Генератор для выбора цвета; по умолчанию
+                детерминированный генератор, зависящий только от id
         """
         self.id = id
         self.center_x = center_x
         self.center_y = center_y
-        self.cells: Set[Tuple[int, int]] = set()  # Множество клеток провинции
-        self.border_cells: Set[Tuple[int, int]] = set()  # Множество граничных клеток
+        # Клетки провинции: отсортированные ключи (см. cell_keys)
+        self.keys = np.zeros(0, dtype=np.int64)
+        # Множество клеток для старого кода (строится при обращении)
+        self._cells: Optional[Set[Tuple[int, int]]] = None
+        # Граничные клетки: обновляются при добавлении и удалении клеток,
+        # после замены клеток строятся заново при обращении (см. border_cells)
+        self._border_cells: Optional[Set[Tuple[int, int]]] = set()
         self.neighbors: Set[int] = set()  # Множество соседних провинций
         
         # Случайный цвет для провинции (исключая слишком темные и светлые оттенки)
-        import random
+        if rng is None:
+            rng = random.Random(id)
         self.color = (
-            random.randint(50, 200),
-            random.randint(50, 200),
-            random.randint(50, 200)
+            rng.randint(50, 200),
+            rng.randint(50, 200),
+            rng.randint(50, 200)
         )
+    
+    @property
+    def cells(self) -> Set[Tuple[int, int]]:
+        """
+        Клетки провинции множеством (совместимость со старым кодом).
         
+        Строится по ключам при первом обращении; менять провинцию нужно
+        через add_cell / remove_cell / set_keys, а не через это множество.
+        """
+        if self._cells is None:
+            xs, ys = key_cells(self.keys)
+            self._cells = set(zip(xs.tolist(), ys.tolist()))
+        return self._cells
+    
+    @cells.setter
+    def cells(self, cells: Iterable[Tuple[int, int]]) -> None:
+        points = np.array(list(cells), dtype=np.int64).reshape(-1, 2)
+        self.set_keys(cell_keys(points[:, 0], points[:, 1]))
+    
+    @property
+    def border_cells(self) -> Set[Tuple[int, int]]:
+        """Граничные клетки провинции (строятся при первом обращении)."""
+        if self._border_cells is None:
+            self.update_border_cells()
+        return self._border_cells
+    
+    @border_cells.setter
+    def border_cells(self, cells: Set[Tuple[int, int]]) -> None:
+        self._border_cells = set(cells)
+    
+    @property
+    def size(self) -> int:
+        """Количество клеток провинции."""
+        return int(self.keys.size)
+    
+    def set_keys(self, keys: np.ndarray) -> None:
+        """Заменяет клетки провинции ключами клеток."""
+        self.keys = np.unique(np.asarray(keys, dtype=np.int64))
+        self._cells = None
+        self._border_cells = None
+    
+    def cell_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Возвращает координаты клеток (xs, ys) в построчном порядке."""
+        return key_cells(self.keys)
+    
+    def contains(self, cell: Tuple[int, int]) -> bool:
+        """Проверяет, принадлежит ли клетка провинции (двоичный поиск)."""
+        x, y = cell
+        if x < 0 or y < 0:
+            return False
+        key = y * CELL_KEY_STRIDE + x
+        index = int(np.searchsorted(self.keys, key))
+        return index < self.keys.size and int(self.keys[index]) == key
+    
     def update_border_cells(self) -> None:
         """Обновляет список граничных клеток."""
-        self.border_cells = {
-            (x, y) for x, y in self.cells
-            if any((x + dx, y + dy) not in self.cells
-                  for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)])
-        }
+        xs, ys = self.cell_arrays()
+        border = np.zeros(self.keys.size, dtype=bool)
+        for dx, dy in DIRECTIONS:
+            neighbors = cell_keys(xs + dx, ys + dy)
+            index = np.minimum(np.searchsorted(self.keys, neighbors), max(self.keys.size - 1, 0))
+            border |= (xs + dx < 0) | (ys + dy < 0) | (self.keys[index] != neighbors)
+        self._border_cells = set(zip(xs[border].tolist(), ys[border].tolist()))
     
     def add_cell(self, cell: Tuple[int, int]) -> None:
-        """Добавляет клетку в провинцию."""
-        self.cells.add(cell)
-        self.update_border_cells()
+        """
+        Добавляет клетку в провинцию.
         
+        Граница обновляется только для клетки и ее четырех соседей.
+        """
+        x, y = cell
+        key = y * CELL_KEY_STRIDE + x
+        index = int(np.searchsorted(self.keys, key))
+        if index < self.keys.size and int(self.keys[index]) == key:
+            return
+        self.keys = np.insert(self.keys, index, key)
+        if self._cells is not None:
+            self._cells.add(cell)
+        if self._border_cells is not None:
+            self._update_border_around(cell)
+    
     def remove_cell(self, cell: Tuple[int, int]) -> None:
-        """Удаляет клетку из провинции."""
-        self.cells.discard(cell)
-        self.update_border_cells()
-
+        """
+        Удаляет клетку из провинции.
+        
+        Граница обновляется только для клетки и ее четырех соседей.
+        """
+        x, y = cell
+        key = y * CELL_KEY_STRIDE + x
+        index = int(np.searchsorted(self.keys, key))
+        if index >= self.keys.size or int(self.keys[index]) != key:
+            return
+        self.keys = np.delete(self.keys, index)
+        if self._cells is not None:
+            self._cells.discard(cell)
+        if self._border_cells is not None:
+            self._update_border_around(cell)
+    
+    def add_cells(self, cells: Iterable[Tuple[int, int]]) -> None:
+        """
+        Добавляет партию клеток одной вставкой в отсортированные ключи.
+        
+        Граница пересчитывается один раз, при следующем обращении.
+        """
+        points = np.array(list(cells), dtype=np.int64).reshape(-1, 2)
+        keys = np.unique(cell_keys(points[:, 0], points[:, 1]))
+        index = np.searchsorted(self.keys, keys)
+        present = np.zeros(keys.size, dtype=bool)
+        inside = index < self.keys.size
+        present[inside] = self.keys[index[inside]] == keys[inside]
+        self.keys = np.insert(self.keys, index[~present], keys[~present])
+        self._cells = None
+        self._border_cells = None
+    
+    def remove_cells(self, cells: Iterable[Tuple[int, int]]) -> None:
+        """
+        Удаляет партию клеток одним удалением из отсортированных ключей.
+        
+        Граница пересчитывается один раз, при следующем обращении.
+        """
+        points = np.array(list(cells), dtype=np.int64).reshape(-1, 2)
+        keys = np.unique(cell_keys(points[:, 0], points[:, 1]))
+        index = np.searchsorted(self.keys, keys)
+        inside = index < self.keys.size
+        index = index[inside]
+        self.keys = np.delete(self.keys, index[self.keys[index] == keys[inside]])
+        self._cells = None
+        self._border_cells = None
+    
+    def _is_border(self, cell: Tuple[int, int]) -> bool:
+        """Проверяет, есть ли у клетки сосед вне провинции."""
+        x, y = cell
+        return not all(self.contains((x + dx, y + dy)) for dx, dy in DIRECTIONS)
+    
+    def _update_border_around(self, cell: Tuple[int, int]) -> None:
+        """Обновляет принадлежность границе клетки и ее соседей."""
+        x, y = cell
+        for nearby in [cell] + [(x + dx, y + dy) for dx, dy in DIRECTIONS]:
+            if self.contains(nearby) and self._is_border(nearby):
+                self._border_cells.add(nearby)
+            else:
+                self._border_cells.discard(nearby)
+    
     def is_adjacent(self, cell: Tuple[int, int]) -> bool:
         """Проверяет, прилегает ли клетка к провинции."""
         x, y = cell
-        return any((x + dx, y + dy) in self.cells
-                  for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)])
\ No newline at end of file
+        return any(self.contains((x + dx, y + dy)) for dx, dy in DIRECTIONS)
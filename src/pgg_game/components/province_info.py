@@ -1,23 +1,73 @@
 """Компонент информации о провинции."""
 from typing import Set, Tuple, Optional
 
+from .province import Province
+
 class ProvinceInfoComponent:
     """Хранит информацию о провинции."""
     
-    def __init__(self, name: str, min_size: int = 4):
+    def __init__(self, name: str, min_size: int = 4, province: Optional[Province] = None):
         """
         Инициализация компонента.
         
         Args:
             name: Название провинции
             min_size: Минимальный размер провинции
+            province: Провинция карты; ее клетки не копируются, а читаются
+                из нее (сетка меток ProvinceManager). У связанной провинции
+                клетки и соседи только читаются: их меняет ProvinceManager
         """
         self.name = name
         self.min_size = min_size
-        self.cells: Set[Tuple[int, int]] = set()
+        self.province = province
+        self._cells: Set[Tuple[int, int]] = set()
         self.owner: Optional[int] = None
-        self.neighbors: Set[int] = set()
-
+        self._neighbors: Set[int] = set()
+    
+    @property
+    def cells(self) -> Set[Tuple[int, int]]:
+        """Клетки провинции множеством (совместимость со старым кодом)."""
+        if self.province is not None:
+            return self.province.cells
+        return self._cells
+    
+    @cells.setter
+    def cells(self, cells: Set[Tuple[int, int]]) -> None:
+        self._check_unlinked('cells')
+        self._cells = set(cells)
+    
+    @property
+    def neighbors(self) -> Set[int]:
+        """id соседних провинций (у связанной провинции - из графа соседства)."""
+        if self.province is not None:
+            return self.province.neighbors
+        return self._neighbors
+    
+    @neighbors.setter
+    def neighbors(self, neighbors: Set[int]) -> None:
+        self._check_unlinked('neighbors')
+        self._neighbors = set(neighbors)
+    
+    def _check_unlinked(self, name: str) -> None:
+        """Запрещает запись поля, которое связанная провинция берет из карты."""
+        if self.province is not None:
+            raise AttributeError(
+                f"{name} связанной провинции меняются через ProvinceManager"
+            )
+    
+    @property
+    def size(self) -> int:
+        """Количество клеток провинции."""
+        if self.province is not None:
+            return self.province.size
+        return len(self._cells)
+    
+    def contains(self, cell: Tuple[int, int]) -> bool:
+        """Проверяет, принадлежит ли клетка провинции."""
+        if self.province is not None:
+            return self.province.contains(cell)
+        return cell in self._cells
+    
     def add_cells(self, cells: Set[Tuple[int, int]]) -> None:
         """Добавляет клетки в провинцию."""
         if len(cells) < self.min_size:
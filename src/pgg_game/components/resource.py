@@ -0,0 +1,32 @@
+"""Компоненты ресурсов."""
+from enum import Enum
+from typing import Dict
+
+class ResourceType(Enum):
+    """
+    Типы ресурсов.
+    
+    Значение - код ресурса в слое ресурсов карты (0 - клетка без ресурса).
+    """
+    GOLD = 1   # Золото
+    STONE = 2  # Камень
+    WOOD = 3   # Лес
+    FOOD = 4   # Луга
+
+class ResourceComponent:
+    """Ресурсы провинции: количество клеток каждого ресурса."""
+    
+    def __init__(self, totals: Dict[ResourceType, int]):
+        """
+        Args:
+            totals: Количество клеток провинции с каждым ресурсом
+        """
+        self.totals = {resource: count for resource, count in totals.items() if count}
+    
+    def has_resource(self, resource: ResourceType) -> bool:
+        """Проверяет, есть ли ресурс в провинции."""
+        return resource in self.totals
+    
+    def get_amount(self, resource: ResourceType) -> int:
+        """Возвращает количество клеток с ресурсом."""
+        return self.totals.get(resource, 0)
@@ -11,6 +11,13 @@ TILE_SIZE = 32
 GRID_WIDTH = SCREEN_WIDTH // TILE_SIZE
 GRID_HEIGHT = SCREEN_HEIGHT // TILE_SIZE
 
+# Размер мира по умолчанию в клетках; задается в MapGenerationSettings и не
+# зависит от разрешения экрана (GRID_* - сколько клеток помещается на экран)
+WORLD_WIDTH = GRID_WIDTH
+WORLD_HEIGHT = GRID_HEIGHT
+# Скорость прокрутки камеры, пикселей в секунду
+CAMERA_SPEED = 800
+
 # Настройки границ
 BORDER_THICKNESS = 4  # Толстая граница острова
 PROVINCE_BORDER_THICKNESS = 2  # Тонкая граница провинций
@@ -128,6 +135,27 @@ RESOURCE_PATHS = {
     'music': 'assets/music'
 }
 
+# Дисковый кэш сгенерированных карт
+MAP_CACHE = {
+    'enabled': True,
+    'directory': '.cache/maps',
+    'max_bytes': 64 * 1024 * 1024  # Ограничение размера каталога
+}
+
+# Запас готовых карт для мгновенной новой игры
+MAP_PREFETCH = {
+    'maps': 2,                     # Сколько карт держать про запас
+    'max_bytes': 16 * 1024 * 1024  # Ограничение памяти запаса
+}
+
+# Бесконечный мир из чанков вместо одного острова
+CHUNKED_WORLD = {
+    'enabled': False,
+    'chunk_size': 64,                # Сторона чанка в клетках
+    'directory': '.cache/chunks',    # Каталог вытесненных чанков
+    'max_bytes': 32 * 1024 * 1024    # Ограничение памяти загруженных чанков
+}
+
 # Отладочные настройки
 DEBUG = {
     'show_fps': True,
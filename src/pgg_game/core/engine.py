@@ -5,7 +5,12 @@ from typing import Optional, Dict
 
 from ..world.game_world import GameWorld
 from ..systems.event_system import EventSystem
-from ..systems.map_system import MapSystem
+from ..systems.input_system import InputSystem
+from ..systems.map_system import GenerationMode, GenerationState, MapSystem
+from ..systems.ui_system import UISystem
+from ..world.map_cache import MapCache
+from ..world.chunked_world import ChunkedWorld
+from ..world.map_generator_settings import MapGenerationSettings
 from ..core.game_types import GameState
 from ..config import (
     SCREEN_WIDTH,
@@ -13,7 +18,11 @@ from ..config import (
     FPS,
     WINDOW_TITLE,
     COLORS,
-    DEBUG
+    DEBUG,
+    MAP_CACHE,
+    MAP_PREFETCH,
+    CAMERA_SPEED,
+    CHUNKED_WORLD
 )
 
 class Engine:
@@ -35,7 +44,29 @@ class Engine:
             # Создаем системы
             self.event_system = EventSystem()
             self.world = GameWorld()
-            self.map_system = MapSystem()
+            map_cache = None
+            if MAP_CACHE['enabled']:
+                map_cache = MapCache(MAP_CACHE['directory'], MAP_CACHE['max_bytes'])
+            settings = MapGenerationSettings()
+            chunks = None
+            if CHUNKED_WORLD['enabled']:
+                chunks = ChunkedWorld(
+                    settings,
+                    CHUNKED_WORLD['chunk_size'],
+                    CHUNKED_WORLD['max_bytes'],
+                    CHUNKED_WORLD['directory']
+                )
+            self.map_system = MapSystem(
+                settings,
+                cache=map_cache,
+                mode=GenerationMode.THREAD,
+                prefetch=MAP_PREFETCH['maps'],
+                prefetch_bytes=MAP_PREFETCH['max_bytes'],
+                chunks=chunks
+            )
+            self.ui_system = UISystem(self.screen, self.event_system)
+            # Клики переводятся в клетки мира камерой карты
+            self.input_system = InputSystem(self.event_system, self.map_system.camera)
             
             # Состояние игры
             self.state = GameState.MENU
@@ -48,6 +79,9 @@ class Engine:
             self.fps_font = pygame.font.Font(None, 24)
             self.fps_counter: Optional[pygame.Surface] = None
             
+            # Шрифт экрана генерации карты
+            self.progress_font = pygame.font.Font(None, 36)
+            
             # Подписываемся на события
             self.event_system.subscribe('start_game', self._handle_start_game)
             self.event_system.subscribe('quit_game', self._handle_quit_game)
@@ -86,6 +120,9 @@ class Engine:
     def _handle_events(self) -> None:
         """Обработка событий."""
         for pygame_event in pygame.event.get():
+            # Системе ввода - до смены состояния игры этим же событием
+            self.input_system.handle_event(pygame_event, self.world, self.state)
+            
             if pygame_event.type == pygame.QUIT:
                 self.running = False
             elif pygame_event.type == pygame.KEYDOWN:
@@ -94,9 +131,8 @@ class Engine:
                     if self.state == GameState.GAME:
                         self.state = GameState.MENU
                 elif pygame_event.key == pygame.K_r and self.state == GameState.GAME:
-                    # Генерация новой карты
-                    self.map_system.map_generated = False
-                    self.map_system.update(self.world)
+                    # Генерация новой карты (в фоне, старая карта остается на экране)
+                    self.map_system.request_map()
             
             # Передаем событие в систему событий
             self.event_system.handle_pygame_event(pygame_event)
@@ -105,7 +141,7 @@ class Engine:
         """Обработчик начала игры."""
         self.state = GameState.GAME
         # Сбрасываем генерацию карты при новой игре
-        self.map_system.map_generated = False
+        self.map_system.request_map()
         
 
     
@@ -122,6 +158,8 @@ class Engine:
         """
         # Обновляем системы
         self.map_system.update(self.world)
+        if self.state == GameState.GAME:
+            self._update_camera(dt)
         self.ui_system.update(self.world, self.state)
         
         # Обновляем счетчик FPS если включен режим отладки
@@ -133,22 +171,48 @@ class Engine:
                 COLORS['text']
             )
     
+    def _update_camera(self, dt: float) -> None:
+        """Прокручивает карту стрелками."""
+        keys = pygame.key.get_pressed()
+        dx = keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]
+        dy = keys[pygame.K_DOWN] - keys[pygame.K_UP]
+        if dx or dy:
+            step = CAMERA_SPEED * dt
+            self.map_system.camera.move(dx * step, dy * step)
+    
     def _render(self) -> None:
         """Отрисовка игры."""
         # Очищаем экран
         self.screen.fill(self.background_color)
         
         if self.state == GameState.GAME:
-            # Отрисовываем карту
-            self.map_system.render()
-            self.screen.blit(self.map_system.get_surface(), (0, 0))
+            # Отрисовываем карту (пока новая генерируется - предыдущую)
+            if self.map_system.has_map():
+                self.map_system.render()
+                self.screen.blit(self.map_system.get_surface(), (0, 0))
+            if self.map_system.state != GenerationState.READY:
+                self._render_generation_progress()
+        
+        self.ui_system.render(self.world, self.state)
         
         # Отображаем FPS если включен режим отладки
         if DEBUG['show_fps'] and self.fps_counter:
             self.screen.blit(self.fps_counter, (10, 10))
 
+    def _render_generation_progress(self) -> None:
+        """Отрисовывает ход фоновой генерации карты."""
+        text = "Генерация карты..."
+        progress = self.map_system.progress
+        if progress is not None:
+            text = (f"Генерация карты: {progress.stage}, "
+                    f"попытка {progress.attempt} ({progress.fraction:.0%})")
+        
+        label = self.progress_font.render(text, True, COLORS['text'])
+        rect = label.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
+        self.screen.blit(label, rect)
     
     def cleanup(self) -> None:
         """Освобождение ресурсов."""
+        self.map_system.close()
         pygame.quit()
         sys.exit()
\ No newline at end of file
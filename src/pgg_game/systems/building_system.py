@@ -76,7 +76,7 @@ class BuildingSystem:
     ) -> bool:
         """Проверяет возможность строительства."""
         province = world.get_component(province_id, ProvinceInfoComponent)
-        if not province or position not in province.cells:
+        if not province or not province.contains(position):
             return False
         
         # Проверяем владельца провинции
@@ -92,11 +92,12 @@ class BuildingSystem:
         if player.gold < self.building_costs[self.selected_building_type]:
             return False
         
-        # Проверяем требования к ресурсам
+        # Проверяем требования к ресурсам (счетчики ресурсов провинции
+        # считаются при создании карты, проверка - поиск в словаре)
         if self.selected_building_type in self.building_requirements:
             required_resource = self.building_requirements[self.selected_building_type]
             province_resources = world.get_component(province_id, ResourceComponent)
-            if not province_resources.has_resource(required_resource):
+            if province_resources is None or not province_resources.has_resource(required_resource):
                 return False
         
         return True
@@ -5,14 +5,21 @@ from typing import Optional
 import pygame
 
 from ..world.game_world import GameWorld
-from ..systems.event_system import EventSystem, GameEvent
+from ..systems.event_system import EventSystem
 from ..components.selected import SelectedComponent
 from ..core.game_types import GameState
+from ..world.camera import Camera
 
 class InputSystem:
     """Система обработки пользовательского ввода."""
-    def __init__(self, event_system: EventSystem):
+    def __init__(self, event_system: EventSystem, camera: Optional[Camera] = None):
+        """
+        Args:
+            event_system: Система событий
+            camera: Камера карты; без нее позиция клика передается в пикселях
+        """
         self.event_system = event_system
+        self.camera = camera
         self._mouse_position = (0, 0)
         self._last_selected_entity: Optional[int] = None
     
@@ -21,44 +28,53 @@ class InputSystem:
         self._mouse_position = pygame.mouse.get_pos()
         
         for event in pygame.event.get():
-            # Обработка выхода
-            if event.type == pygame.QUIT:
-                self.event_system.emit(GameEvent("quit_game", {}))
-                continue
-            
-            # Обработка клавиатуры
-            if event.type == pygame.KEYDOWN:
-                self._handle_keydown(event.key, game_state)
-            
-            # Обработка мыши
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                self._handle_mouse_click(event, world, game_state)
+            self.handle_event(event, world, game_state)
+    
+    def handle_event(self, event: pygame.event.Event, world: GameWorld, game_state: GameState) -> None:
+        """
+        Обрабатывает одно событие ввода.
+        
+        Для цикла, который сам забирает события из очереди pygame
+        (update забирает их все).
+        """
+        # Обработка выхода
+        if event.type == pygame.QUIT:
+            self.event_system.emit("quit_game", {})
+            return
+        
+        # Обработка клавиатуры
+        if event.type == pygame.KEYDOWN:
+            self._handle_keydown(event.key, game_state)
+        
+        # Обработка мыши
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            self._handle_mouse_click(event, world, game_state)
     
     def _handle_keydown(self, key: int, game_state: GameState) -> None:
         """Обрабатывает нажатия клавиш."""
         if key == pygame.K_ESCAPE:
             if game_state == GameState.GAME:
                 # Переход в меню паузы
-                self.event_system.emit(GameEvent(
+                self.event_system.emit(
                     "change_state",
                     {"new_state": GameState.PAUSED}
-                ))
+                )
             else:
                 # Выход из игры
-                self.event_system.emit(GameEvent("quit_game", {}))
+                self.event_system.emit("quit_game", {})
         
         elif key == pygame.K_RETURN:
             if game_state == GameState.MENU:
                 # Начало игры
-                self.event_system.emit(GameEvent(
+                self.event_system.emit(
                     "change_state",
                     {"new_state": GameState.GAME}
-                ))
+                )
         
         elif key == pygame.K_SPACE:
             if game_state == GameState.GAME:
                 # Завершение хода
-                self.event_system.emit(GameEvent("end_turn", {}))
+                self.event_system.emit("end_turn", {})
     
     def _handle_mouse_click(self, event: pygame.event.Event, world: GameWorld, game_state: GameState) -> None:
         """Обрабатывает клики мыши."""
@@ -72,10 +88,15 @@ class InputSystem:
             
             # Определяем, по какой провинции кликнули
             clicked_pos = event.pos
-            self.event_system.emit(GameEvent(
+            if self.camera is not None:
+                # Переводим точку экрана в клетку мира
+                clicked_pos = self.camera.screen_to_cell(event.pos)
+                if clicked_pos is None:
+                    return
+            self.event_system.emit(
                 "province_clicked",
                 {"position": clicked_pos}
-            ))
+            )
         
         elif event.button == 3:  # Правая кнопка мыши
             # Отмена выделения
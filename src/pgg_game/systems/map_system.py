@@ -1,259 +1,714 @@
 """
 Система генерации и управления игровой картой.
 """
+import threading
 import numpy as np
 import pygame
-from typing import Set, Tuple, Dict, Optional
+from dataclasses import dataclass
+from enum import Enum, auto
 from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from multiprocessing.managers import SyncManager
+from typing import Deque, Set, Tuple, Dict, List, Optional, Union
 
 from ..config import (
     SCREEN_WIDTH, SCREEN_HEIGHT,
-    GRID_WIDTH, GRID_HEIGHT,
     TILE_SIZE, COLORS,
     RENDER_LAYERS,
     BORDER_THICKNESS
 )
 from ..world.game_world import GameWorld
 from ..world.province_manager import ProvinceManager
+from ..world.map_generator_settings import MapGenerationSettings
+from ..world.map_builder import STAGES, MapBuilder, build_map
+from ..world.map_cache import CachedMap, MapCache, map_cache_key
+from ..world.pipeline import StagedRun, Steps, run_steps
+from ..world.seeding import derive_seed
+from ..world.camera import Camera
+from ..world.chunked_world import ChunkedWorld, ProvinceKey
+from ..world.map_storage import load_map, save_map
+from ..world.noise_generator import create_noise_executor
+from ..world.resource_placer import NO_RESOURCE, resource_totals, totals_by_type
 from ..components.transform import TransformComponent
-from ..components.renderable import RenderableComponent
+from ..components.renderable import RenderableComponent, ShapeType
 from ..components.province_info import ProvinceInfoComponent
+from ..components.resource import ResourceComponent, ResourceType
+
+# Бюджет времени на порцию генерации за кадр в режиме SLICED, с.
+# Порции режутся по числу клеток (pipeline.STEP_CELLS) и укладываются в
+# него на картах до 512x512; на больших картах отдельные порции дольше
+DEFAULT_FRAME_BUDGET = 0.004
+
+# Ограничение памяти запаса готовых карт по умолчанию, байт
+DEFAULT_PREFETCH_BYTES = 16 * 1024 * 1024
+# Байт на клетку карты в запасе: рельеф и ресурс int8, метка провинции int32
+PREFETCH_CELL_BYTES = 6
+
+# Цвета клеток суши по коду слоя ресурсов
+LAND_COLORS = {NO_RESOURCE: COLORS['province_neutral']}
+LAND_COLORS.update({
+    resource.value: COLORS[resource.name.lower()] for resource in ResourceType
+})
+
+class GenerationMode(Enum):
+    """Способ выполнения генерации карты."""
+    BLOCKING = auto()  # Целиком внутри update
+    THREAD = auto()    # В фоновом потоке
+    SLICED = auto()    # Порциями внутри update в пределах бюджета кадра
+
+class GenerationState(Enum):
+    """Состояние генерации карты."""
+    PENDING = auto()     # Карта запрошена, генерация еще не начата
+    GENERATING = auto()  # Карта строится (в потоке или порциями)
+    READY = auto()       # Карта готова и установлена
+
+@dataclass(frozen=True)
+class GenerationProgress:
+    """Ход генерации."""
+    stage: str        # Этап: 'cache', этапы MapBuilder, 'attempts' (пул) или 'entities'
+    attempt: int      # Номер попытки (с 1)
+    fraction: float   # Доля пройденных этапов попытки (0-1)
 
 class MapSystem:
     """Система управления картой."""
 
-    def __init__(self):
-        """Инициализация системы карты."""
-        self.grid = np.zeros((GRID_HEIGHT, GRID_WIDTH), dtype=np.int32)
+    def __init__(
+        self,
+        settings: Optional[MapGenerationSettings] = None,
+        cache: Optional[MapCache] = None,
+        mode: GenerationMode = GenerationMode.BLOCKING,
+        frame_budget: float = DEFAULT_FRAME_BUDGET,
+        prefetch: int = 0,
+        prefetch_bytes: int = DEFAULT_PREFETCH_BYTES,
+        chunks: Optional[ChunkedWorld] = None
+    ):
+        """
+        Инициализация системы карты.
+        
+        Args:
+            settings: Параметры генерации; сид карты берется из них
+            cache: Дисковый кэш карт; без него карта всегда генерируется
+            mode: Способ выполнения генерации в update
+            frame_budget: Время генерации за один update в режиме SLICED, с
+            prefetch: Сколько готовых карт держать про запас (0 - не держать)
+            prefetch_bytes: Ограничение памяти запаса карт в байтах
+            chunks: Бесконечный мир из чанков; если задан, карта не
+                строится целиком, а чанки строятся по мере обращения к ним
+                (mode, кэш карт и запас не используются, сущности
+                провинций не создаются)
+        """
+        self.settings = settings or MapGenerationSettings()
+        self.cache = cache
+        self.mode = mode
+        self.frame_budget = frame_budget
+        self.prefetch = prefetch
+        self.prefetch_bytes = prefetch_bytes
+        self.grid = np.zeros((self.settings.height, self.settings.width), dtype=np.int32)
+        # Сетка меток провинций текущей карты (-1 - вне провинций)
+        self.labels = np.full(self.grid.shape, -1, dtype=np.int32)
+        # Слой ресурсов текущей карты и счетчики ресурсов провинций
+        # (строятся при первом обращении, см. province_resources)
+        self.resources = np.zeros(self.grid.shape, dtype=np.int8)
+        self._resource_totals: Optional[np.ndarray] = None
         self.provinces = {}  
-        self.cell_to_province = {}
         self.world = None
         self.map_generated = False
+        # Сид попытки, по которой построена текущая карта
+        self.seed: Optional[int] = None
+        self.province_entities: List[int] = []
+        
+        # Номер следующей карты: n-я карта строится по сиду, выведенному из
+        # сида настроек, поэтому каждая новая карта отличается от прежней
+        self._next_map = 0
+        
+        # Состояние генерации
+        self.state = GenerationState.PENDING
+        self.progress: Optional[GenerationProgress] = None
+        # Время этапов последней генерации, с
+        self.stage_timings: Dict[str, float] = {}
+        # Причины неудачи попыток последней генерации (см. MapBuilder.failure)
+        self.attempt_failures: List[str] = []
+        # Сколько попыток начато при последней генерации (0 - карта из кэша)
+        self.attempts = 0
+        self._worker: Optional[threading.Thread] = None
+        self._worker_result: Optional[Tuple[int, MapBuilder]] = None
+        self._worker_error: Optional[BaseException] = None
+        self._sliced_run: Optional[StagedRun[None]] = None
         
-        # Создаем менеджер провинций
-        self.province_manager = ProvinceManager()
+        # Запас готовых карт: (ключ настроек, карта) в порядке номеров
+        self._pool: Deque[Tuple[str, CachedMap]] = deque()
+        self._prefetch_worker: Optional[threading.Thread] = None
+        self._prefetch_run: Optional[StagedRun[Tuple[int, MapBuilder]]] = None
+        self._prefetch_key: Optional[str] = None
+        self._prefetch_result: Optional[Tuple[int, MapBuilder]] = None
+        self._prefetch_error: Optional[BaseException] = None
         
-        # Создаем поверхность для карты
+        # Создаем менеджер провинций (None - строится по меткам при обращении)
+        self._province_manager: Optional[ProvinceManager] = ProvinceManager(
+            seed=self.settings.seed
+        )
+        
+        # Пул процессов для параллельных попыток (создается лениво)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Менеджер событий отмены попыток (запускается вместе с пулом)
+        self._manager: Optional[SyncManager] = None
+        # Пул процессов карты высот при noise_workers > 1: общий для всех
+        # попыток и карт (создается лениво, из потоков генерации и запаса)
+        self._noise_executor: Optional[ProcessPoolExecutor] = None
+        self._noise_workers = 0
+        self._noise_lock = threading.Lock()
+        
+        # Поверхность размером с экран и камера - окно просмотра мира на ней
         self.surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.camera = Camera(
+            self.settings.width, self.settings.height,
+            SCREEN_WIDTH, SCREEN_HEIGHT, TILE_SIZE
+        )
+        
+        # Мир из чанков
+        self.chunks = chunks
+        if self.chunks is not None:
+            self.camera.set_world_size(None, None)
+
+    @property
+    def province_manager(self) -> ProvinceManager:
+        """
+        Менеджер провинций текущей карты.
+        
+        Для карты, открытой из файлов, строится по сетке меток при первом
+        обращении - это проход по всей карте.
+        """
+        if self._province_manager is None:
+            self._province_manager = ProvinceManager(seed=self.seed)
+            self._province_manager.load_labels(self.labels)
+        return self._province_manager
+
+    @province_manager.setter
+    def province_manager(self, province_manager: ProvinceManager) -> None:
+        self._province_manager = province_manager
 
     def update(self, world: GameWorld) -> None:
         """
         Обновление состояния карты.
         
+        Запрошенная карта берется из запаса, если он не пуст. Иначе в
+        режимах THREAD и SLICED генерация идет между вызовами, а готовая
+        карта устанавливается за один вызов; до этого остается прежняя
+        карта. Когда карта не строится, запас пополняется в фоне.
+        
         Args:
             world: Игровой мир
         """
         self.world = world
         
-        if not self.map_generated:
-            self.generate_map(world)
-            self.map_generated = True
+        if self.chunks is not None:
+            self._update_chunks()
+            return
+        
+        if self._worker is not None and not self._worker.is_alive():
+            self._finish_worker(world)
+        
+        if self._sliced_run is not None:
+            self._advance_sliced()
+        elif not self.map_generated and not self._is_generating():
+            if self.mode is GenerationMode.BLOCKING:
+                self.generate_map(world)
+            elif not self._take_prefetched(world):
+                if self.mode is GenerationMode.THREAD:
+                    self._start_worker()
+                else:
+                    self._start_sliced(world)
+        
+        self._update_prefetch()
+
+    def request_map(self) -> None:
+        """Запрашивает новую карту; она будет построена в update."""
+        self.map_generated = False
+        if not self._is_generating():
+            self.state = GenerationState.PENDING
+
+    def set_settings(self, settings: MapGenerationSettings) -> None:
+        """
+        Заменяет настройки генерации.
+        
+        Запас карт сбрасывается, нумерация карт начинается заново.
+        Текущая карта остается до следующего запроса.
+        """
+        self.settings = settings
+        self._next_map = 0
+        self._pool.clear()
+
+    def has_map(self) -> bool:
+        """Проверяет, установлена ли хотя бы одна карта."""
+        return self.seed is not None
+
+    def prefetched_count(self) -> int:
+        """Количество готовых карт в запасе для текущих настроек."""
+        key = self._settings_key()
+        return sum(1 for entry_key, _ in self._pool if entry_key == key)
 
     def generate_map(self, world: GameWorld) -> None:
-        """Генерирует новую карту."""
+        """
+        Генерирует новую карту (или берет готовую из запаса).
+        
+        При settings.parallel_attempts > 1 попытки с производными сидами
+        запускаются в пуле процессов, и берется первая прошедшая проверки.
+        Сид победившей попытки сохраняется в self.seed: карта
+        воспроизводится через settings.for_seed(seed).
+        
+        Если задан кэш, карта сначала ищется в нем, а сгенерированная
+        карта сохраняется в кэш.
+        """
+        if self.chunks is not None:
+            self._update_chunks()
+            return
+        
         try:
-            for attempt in range(5):
-                print(f"Попытка генерации {attempt + 1}")
-                
-                if self._generate_from_provinces():
-                    if self._create_province_entities(world):
-                        self.map_generated = True
-                        print("Карта успешно сгенерирована")
-                        return
-                
-                print(f"Попытка {attempt + 1} не удалась")
-                
-            raise RuntimeError("Не удалось сгенерировать карту")
+            if not self._take_prefetched(world):
+                self._install_map(world, self._find_map(self._allocate_map()))
         except Exception as e:
             print(f"Ошибка при генерации карты: {e}")
             raise
 
+    def save_to(self, directory: str) -> None:
+        """
+        Сохраняет текущую карту в каталог (см. world.map_storage).
+        
+        Args:
+            directory: Каталог карты
+        """
+        if not self.has_map():
+            raise RuntimeError("Карта еще не построена")
+        save_map(directory, self.seed, self.grid, self.labels, self.resources)
 
+    def load_from(self, directory: str, world: Optional[GameWorld] = None) -> None:
+        """
+        Устанавливает карту, сохраненную save_to, без чтения ее слоев.
+        
+        Сетки рельефа и меток становятся отображениями файлов в память:
+        отрисовка и выбор клеток читают только видимые окна, поэтому время
+        загрузки не зависит от размера карты. Менеджер провинций строится
+        при первом обращении к нему.
+        
+        Args:
+            directory: Каталог карты
+            world: Игровой мир; если задан, сущности провинций пересоздаются
+                (это требует прохода по всем провинциям)
+        """
+        stored = load_map(directory)
+        if world is not None:
+            self._remove_province_entities(world)
+        self.grid = stored.grid
+        self.labels = stored.labels
+        self.resources = stored.resources
+        if self.resources is None:
+            self.resources = np.zeros(stored.shape, dtype=np.int8)
+        self._resource_totals = None
+        self._province_manager = None
+        self.seed = stored.seed
+        height, width = stored.shape
+        self.camera.set_world_size(width, height)
+        self.map_generated = True
+        self.state = GenerationState.READY
+        self.progress = None
+        if world is not None:
+            self._create_province_entities(world)
+        print(f"Карта загружена из {directory} (сид {self.seed})")
 
-    def _generate_provinces(self) -> bool:
-        """Генерирует провинции на карте."""
-        # Находим клетки суши
-        land_cells = {(x, y) for y in range(GRID_HEIGHT) for x in range(GRID_WIDTH) 
-                     if self.grid[y, x] == 1}
+    def generation_steps(self, world: GameWorld) -> Steps[None]:
+        """
+        Вся генерация карты по этапам (см. world.pipeline).
         
-        if not land_cells:
-            return False
+        Этапы: 'cache', этапы MapBuilder для каждой попытки и 'entities' -
+        установка карты и создание сущностей провинций одной порцией.
+        Попытки выполняются по очереди в текущем потоке, parallel_attempts
+        не учитывается.
+        
+        Args:
+            world: Игровой мир
+        """
+        result = yield from self._search_steps(self._allocate_map(), parallel=False)
+        self._install_map(world, result)
+        yield 'entities'
+
+    def _update_chunks(self) -> None:
+        """Переключает мир чанков на новую карту и подгружает видимые чанки."""
+        if not self.map_generated:
+            self.chunks.reset(self._allocate_map())
+            self.seed = self.chunks.settings.seed
+            self.map_generated = True
+            self.state = GenerationState.READY
+            self.camera.center_on((0, 0))
+            print(f"Мир из чанков готов (сид {self.seed})")
+        
+        for _ in self.chunks.chunks_in(*self.camera.visible_cells()):
+            pass
+
+    def _is_generating(self) -> bool:
+        """Проверяет, строится ли сейчас запрошенная карта."""
+        return self._worker is not None or self._sliced_run is not None
+
+    def _allocate_map(self) -> MapGenerationSettings:
+        """Выдает настройки следующей по номеру карты."""
+        index = self._next_map
+        self._next_map += 1
+        if index == 0:
+            return self.settings
+        return self.settings.for_seed(derive_seed(self.settings.seed, 'map', index))
+
+    def _settings_key(self) -> str:
+        """Ключ текущих настроек (по нему отбрасываются устаревшие карты запаса)."""
+        return map_cache_key(self.settings)
+
+    def _find_map(self, settings: MapGenerationSettings) -> Tuple[int, MapBuilder]:
+        """
+        Находит карту в кэше или генерирует ее.
+        
+        Не трогает текущую карту и игровой мир, поэтому может выполняться
+        в фоновом потоке.
+        
+        Args:
+            settings: Настройки карты
         
-        # Настраиваем количество и размеры провинций
-        total_land = len(land_cells)
-        min_provinces = max(3, total_land // 25)  # ~25 клеток на провинцию
-        max_provinces = min(8, total_land // 15)  # ~15 клеток на провинцию
-        min_size = max(4, total_land // (max_provinces * 2))
-        max_size = min(25, total_land // min_provinces)
-        
-        # Обновляем конфигурацию
-        self.province_manager.config.update(
-            min_provinces=min_provinces,
-            max_provinces=max_provinces,
-            min_size=min_size,
-            max_size=max_size
+        Returns:
+            Tuple[int, MapBuilder]: Сид попытки и построенная карта
+        """
+        run = StagedRun(
+            self._search_steps(settings, parallel=settings.parallel_attempts > 1)
         )
+        try:
+            while not run.advance(0.0):
+                self._report(run.stage)
+        finally:
+            self.stage_timings = run.timings
+        return run.result
+
+    def _search_steps(
+        self,
+        settings: MapGenerationSettings,
+        parallel: bool,
+        foreground: bool = True
+    ) -> Steps[Tuple[int, MapBuilder]]:
+        """
+        Этапы поиска карты: кэш, затем попытки генерации.
+        
+        Args:
+            settings: Настройки карты
+            parallel: Выполнять попытки в пуле процессов
+            foreground: Запрошенная карта (публикует ход генерации);
+                False - пополнение запаса
+        """
+        if foreground:
+            self.attempts = 0
+            self.attempt_failures = []
+        
+        key = None
+        if self.cache is not None:
+            key = map_cache_key(settings)
+            result = self._load_cached(key)
+            yield 'cache'
+            if result is not None:
+                return result
+        
+        if parallel:
+            result = self._run_parallel_attempts(settings)
+            yield 'attempts'
+        else:
+            result = yield from self._attempt_steps(settings, foreground)
+        
+        if result is None:
+            raise RuntimeError("Не удалось сгенерировать карту")
         
-        # Генерируем провинции
-        return self._create_provinces(land_cells)
+        if key is not None:
+            seed, builder = result
+            self.cache.store(key, self._pack(seed, builder))
+            yield 'cache'
+        return result
 
-    def _create_provinces(self, land_cells: Set[Tuple[int, int]]) -> bool:
-        """Создает провинции из доступных клеток."""
-        unassigned_cells = land_cells.copy()
-        center_x = sum(x for x, _ in land_cells) / len(land_cells)
-        center_y = sum(y for _, y in land_cells) / len(land_cells)
+    def _install_map(self, world: GameWorld, result: Tuple[int, MapBuilder]) -> None:
+        """Заменяет текущую карту и сущности провинций найденной картой."""
+        seed, builder = result
+        self._remove_province_entities(world)
+        self.grid = builder.grid
+        self.labels = builder.get_labels()
+        self.resources = builder.resources
+        self._resource_totals = None
+        self.province_manager = builder.province_manager
+        self.camera.set_world_size(builder.width, builder.height)
+        self._create_province_entities(world)
+        self.seed = seed
+        self.map_generated = True
+        self.state = GenerationState.READY
+        self.progress = None
+        print(f"Карта успешно сгенерирована (сид {self.seed})")
+
+    def _start_worker(self) -> None:
+        """Запускает поиск карты в фоновом потоке."""
+        self._worker_result = None
+        self._worker_error = None
+        self.state = GenerationState.GENERATING
+        self._worker = threading.Thread(
+            target=self._run_worker,
+            args=(self._allocate_map(),),
+            name='map-generation',
+            daemon=True
+        )
+        self._worker.start()
+
+    def _run_worker(self, settings: MapGenerationSettings) -> None:
+        """Тело фонового потока: результат забирает основной поток."""
+        try:
+            self._worker_result = self._find_map(settings)
+        except BaseException as e:
+            self._worker_error = e
+
+    def _finish_worker(self, world: GameWorld) -> None:
+        """Устанавливает результат завершившегося фонового потока."""
+        self._worker = None
+        if self._worker_error is not None:
+            error, self._worker_error = self._worker_error, None
+            self.state = GenerationState.PENDING
+            self.progress = None
+            print(f"Ошибка при генерации карты: {error}")
+            raise error
         
-        while unassigned_cells:
-            start = self._find_best_start_point(unassigned_cells, (center_x, center_y))
-            if not start:
-                break
-                
-            # Создаем новую провинцию
-            province_id = self.province_manager.create_province()
-            target_size = self.province_manager.get_ideal_province_size()
-            
-            # Выращиваем провинцию из стартовой точки
-            cells = self._grow_province_from_center(start, target_size, unassigned_cells)
-            
-            # Добавляем клетки в провинцию
-            for cell in cells:
-                if self.province_manager.add_cell_to_province(province_id, cell):
-                    unassigned_cells.remove(cell)
+        result, self._worker_result = self._worker_result, None
+        self._install_map(world, result)
+
+    def _start_sliced(self, world: GameWorld) -> None:
+        """Начинает генерацию порциями и выполняет первую порцию."""
+        self.state = GenerationState.GENERATING
+        self._sliced_run = StagedRun(self.generation_steps(world))
+        self._advance_sliced()
+
+    def _advance_sliced(self) -> None:
+        """Выполняет порции генерации в пределах бюджета кадра."""
+        run = self._sliced_run
+        try:
+            done = run.advance(self.frame_budget)
+        except Exception as e:
+            self._sliced_run = None
+            self.state = GenerationState.PENDING
+            self.progress = None
+            print(f"Ошибка при генерации карты: {e}")
+            raise
         
-        # Проверяем результат
-        if not unassigned_cells and self._verify_provinces():
+        self.stage_timings = run.timings
+        if done:
+            self._sliced_run = None
+        else:
+            self._report(run.stage)
+
+    def _take_prefetched(self, world: GameWorld) -> bool:
+        """
+        Устанавливает карту из запаса.
+        
+        Returns:
+            bool: True если в запасе нашлась карта для текущих настроек
+        """
+        key = self._settings_key()
+        while self._pool:
+            entry_key, cached = self._pool.popleft()
+            if entry_key != key:
+                continue
+            builder = MapBuilder.from_labels(
+                cached.grid, cached.labels, cached.seed, cached.resources
+            )
+            self._install_map(world, (cached.seed, builder))
             return True
-            
         return False
 
-    def _find_best_start_point(
-        self, 
-        cells: Set[Tuple[int, int]], 
-        center: Tuple[float, float]
-    ) -> Optional[Tuple[int, int]]:
-        """Находит лучшую стартовую точку для новой провинции."""
-        if not cells:
+    def _update_prefetch(self) -> None:
+        """Забирает готовую карту запаса и запускает построение следующей."""
+        if self._prefetch_worker is not None and not self._prefetch_worker.is_alive():
+            self._prefetch_worker = None
+            self._finish_prefetch()
+        
+        if self._prefetch_run is not None:
+            # Порции запаса выполняются только в свободных от генерации кадрах
+            if self._is_generating():
+                return
+            try:
+                done = self._prefetch_run.advance(self.frame_budget)
+            except Exception as e:
+                done = True
+                self._prefetch_error = e
+            if done:
+                self._prefetch_result = self._prefetch_run.result
+                self._prefetch_run = None
+                self._finish_prefetch()
+            return
+        
+        if self._prefetch_worker is not None or not self._needs_prefetch():
+            return
+        
+        settings = self._allocate_map()
+        self._prefetch_key = self._settings_key()
+        self._prefetch_result = None
+        self._prefetch_error = None
+        steps = self._search_steps(settings, parallel=False, foreground=False)
+        if self.mode is GenerationMode.SLICED:
+            self._prefetch_run = StagedRun(steps)
+        else:
+            self._prefetch_worker = threading.Thread(
+                target=self._run_prefetch,
+                args=(steps,),
+                name='map-prefetch',
+                daemon=True
+            )
+            self._prefetch_worker.start()
+
+    def _needs_prefetch(self) -> bool:
+        """Проверяет, нужно ли и можно ли пополнить запас сейчас."""
+        if self.prefetch <= 0 or not self.map_generated or self._is_generating():
+            return False
+        if self.chunks is not None:
+            return False
+        
+        key = self._settings_key()
+        self._pool = deque(entry for entry in self._pool if entry[0] == key)
+        if len(self._pool) >= self.prefetch:
+            return False
+        
+        used = sum(cached.nbytes for _, cached in self._pool)
+        map_bytes = self.settings.width * self.settings.height * PREFETCH_CELL_BYTES
+        return used + map_bytes <= self.prefetch_bytes
+
+    def _run_prefetch(self, steps: Steps[Tuple[int, MapBuilder]]) -> None:
+        """Тело потока пополнения запаса."""
+        try:
+            self._prefetch_result = run_steps(steps)
+        except BaseException as e:
+            self._prefetch_error = e
+
+    def _finish_prefetch(self) -> None:
+        """Кладет построенную карту в запас, если настройки не менялись."""
+        if self._prefetch_error is not None:
+            error, self._prefetch_error = self._prefetch_error, None
+            print(f"Не удалось подготовить карту про запас: {error}")
+            return
+        
+        result, self._prefetch_result = self._prefetch_result, None
+        if result is None or self._prefetch_key != self._settings_key():
+            return
+        seed, builder = result
+        self._pool.append((self._prefetch_key, self._pack(seed, builder)))
+
+    @staticmethod
+    def _pack(seed: int, builder: MapBuilder) -> CachedMap:
+        """Сжимает построенную карту до сеток рельефа и меток."""
+        return CachedMap(
+            seed, builder.grid.astype(np.int8), builder.get_labels(), builder.resources
+        )
+
+    def _report(self, stage: Optional[str]) -> None:
+        """Публикует ход генерации (присваивание атомарно для других потоков)."""
+        if stage is None:
+            return
+        fraction = 0.0
+        if stage in STAGES:
+            fraction = STAGES.index(stage) / len(STAGES)
+        self.progress = GenerationProgress(stage, self.attempts, fraction)
+
+    def _load_cached(self, key: str) -> Optional[Tuple[int, MapBuilder]]:
+        """Загружает карту из кэша."""
+        cached = self.cache.load(key)
+        if cached is None:
             return None
-            
-        best_point = None
-        best_score = float('-inf')
-        cx, cy = center
         
-        for x, y in cells:
-            # Расстояние до центра (ближе = лучше)
-            dist = -((x - cx) ** 2 + (y - cy) ** 2) ** 0.5
-            
-            # Количество соседей
-            neighbors = sum(1 for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]
-                          if (x + dx, y + dy) in cells)
-            
-            score = dist + neighbors * 2
-            
-            if score > best_score:
-                best_score = score
-                best_point = (x, y)
-                
-        return best_point
+        print(f"Карта загружена из кэша (сид {cached.seed})")
+        return cached.seed, MapBuilder.from_labels(
+            cached.grid, cached.labels, cached.seed, cached.resources
+        )
 
-    def _grow_province_from_center(
+    def _attempt_steps(
         self,
-        start: Tuple[int, int],
-        target_size: int,
-        available_cells: Set[Tuple[int, int]]
-    ) -> Set[Tuple[int, int]]:
-        """Выращивает провинцию из начальной точки."""
-        province = {start}
-        frontier = {start}
-        
-        while len(province) < target_size and frontier:
-            best_cell = None
-            best_score = float('-inf')
-            
-            for cell in frontier:
-                x, y = cell
-                for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-                    neighbor = (x + dx, y + dy)
-                    if neighbor not in available_cells or neighbor in province:
-                        continue
-                        
-                    # Считаем соседей
-                    neighbors = sum(
-                        1 for nx, ny in [(neighbor[0] + dx, neighbor[1] + dy) 
-                                       for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]]
-                        if (nx, ny) in province
-                    )
-                    
-                    # Оцениваем компактность
-                    cx = sum(x for x, _ in province) / len(province)
-                    cy = sum(y for _, y in province) / len(province)
-                    distance = ((neighbor[0] - cx) ** 2 + (neighbor[1] - cy) ** 2) ** 0.5
-                    
-                    score = neighbors - (distance * 0.5)
-                    
-                    if score > best_score:
-                        best_score = score
-                        best_cell = neighbor
-            
-            if best_cell is None:
-                break
-                
-            province.add(best_cell)
-            frontier.add(best_cell)
-            
-            # Обновляем фронтир
-            frontier = {cell for cell in frontier 
-                      if any((cell[0] + dx, cell[1] + dy) not in province
-                            for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)])}
-        
-        return province
-
-    def _verify_provinces(self) -> bool:
-        """Проверяет корректность всех провинций."""
-        for province in self.province_manager.provinces.values():
-            # Проверка размера
-            if not (self.province_manager.config.min_size <= 
-                   len(province.cells) <= 
-                   self.province_manager.config.max_size):
-                return False
+        settings: MapGenerationSettings,
+        foreground: bool = True
+    ) -> Steps[Optional[Tuple[int, MapBuilder]]]:
+        """Выполняет попытки генерации по очереди в текущем процессе."""
+        noise_executor = self._get_noise_executor(settings.noise_workers)
+        for attempt in range(settings.max_attempts):
+            if foreground:
+                print(f"Попытка генерации {attempt + 1}")
+                self.attempts = attempt + 1
             
-            # Проверка связности
-            if len(self._get_connected_cells(
-                next(iter(province.cells)),
-                province.cells
-            )) != len(province.cells):
-                return False
+            attempt_settings = self._attempt_settings(settings, attempt)
+            builder = MapBuilder(attempt_settings.width, attempt_settings.height)
+            if (yield from builder.steps(attempt_settings, noise_executor)):
+                return attempt_settings.seed, builder
             
-            # Проверка соседей
-            if not all(
-                any((x + dx, y + dy) in province.cells
-                    for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)])
-                for x, y in province.cells
-            ):
-                return False
-        
-        return True
+            if foreground:
+                self.attempt_failures.append(builder.failure)
+                print(f"Попытка {attempt + 1} не удалась")
+        return None
 
-    def _get_connected_cells(
+    def _run_parallel_attempts(
         self,
-        start: Tuple[int, int],
-        cells: Set[Tuple[int, int]]
-    ) -> Set[Tuple[int, int]]:
-        """Находит все связанные клетки."""
-        if not cells:
-            return set()
-            
-        visited = {start}
-        queue = deque([start])
-        
-        while queue:
-            x, y = queue.popleft()
-            for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-                neighbor = (x + dx, y + dy)
-                if neighbor in cells and neighbor not in visited:
-                    visited.add(neighbor)
-                    queue.append(neighbor)
-                    
-        return visited
+        settings: MapGenerationSettings
+    ) -> Optional[Tuple[int, MapBuilder]]:
+        """
+        Выполняет попытки генерации в пуле процессов.
+        
+        В работе одновременно держится parallel_attempts попыток; при
+        неудаче на место завершившейся запускается следующая. Первая
+        успешная попытка побеждает: ожидающие в очереди отменяются, а
+        уже запущенные прерываются на ближайшей границе порций этапов
+        через общее событие отмены (у каждого поиска свое событие).
+        """
+        executor = self._get_executor()
+        cancel = self._manager.Event()
+        attempts = iter(range(settings.max_attempts))
+        running: Dict[Future, Tuple[int, int]] = {}
+        
+        def submit_next() -> None:
+            attempt = next(attempts, None)
+            if attempt is None:
+                return
+            attempt_settings = self._attempt_settings(settings, attempt)
+            future = executor.submit(build_map, attempt_settings, cancel)
+            running[future] = (attempt, attempt_settings.seed)
+            self.attempts = attempt + 1
+        
+        for _ in range(settings.parallel_attempts):
+            submit_next()
+        
+        try:
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    attempt, seed = running.pop(future)
+                    builder = future.result()
+                    if builder.failure is None:
+                        print(f"Попытка {attempt + 1} успешна")
+                        return seed, builder
+                    self.attempt_failures.append(builder.failure)
+                    print(f"Попытка {attempt + 1} не удалась")
+                    submit_next()
+            return None
+        finally:
+            # Уже запущенные попытки останавливаются по событию, их
+            # результат отбрасывается
+            cancel.set()
+            for future in running:
+                future.cancel()
+
+    @staticmethod
+    def _attempt_settings(
+        settings: MapGenerationSettings,
+        attempt: int
+    ) -> MapGenerationSettings:
+        """
+        Возвращает настройки попытки генерации.
+        
+        Первая попытка использует сид карты, следующие - производные сиды,
+        чтобы повторная попытка давала другой остров.
+        """
+        if attempt == 0:
+            return settings
+        return settings.for_seed(
+            derive_seed(settings.seed, 'attempt', attempt)
+        )
 
     def _create_province_entities(self, world: GameWorld) -> bool:
         """Создает сущности для провинций."""
@@ -262,20 +717,20 @@ class MapSystem:
             
         provinces = self.province_manager.get_provinces()
         
-        for province in provinces:
-            if not province.cells:
+        for province in provinces.values():
+            if not province.size:
                 continue
                 
             # Вычисляем размеры и позицию
-            min_x = min(x for x, _ in province.cells)
-            min_y = min(y for _, y in province.cells)
-            max_x = max(x for x, _ in province.cells)
-            max_y = max(y for _, y in province.cells)
+            xs, ys = province.cell_arrays()
+            min_x, max_x = int(xs.min()), int(xs.max())
+            min_y, max_y = int(ys.min()), int(ys.max())
             width = max_x - min_x + 1
             height = max_y - min_y + 1
             
             # Создаем сущность
             entity_id = world.create_entity()
+            self.province_entities.append(entity_id)
             
             # Добавляем компоненты
             world.add_component(
@@ -286,63 +741,201 @@ class MapSystem:
             world.add_component(
                 entity_id,
                 RenderableComponent(
+                    ShapeType.RECTANGLE,
                     color=COLORS['province_neutral'],
-                    width=width,
-                    height=height,
-                    border_width=2,
-                    border_color=COLORS['province_border'],
+                    size=(width, height),
                     layer=RENDER_LAYERS['provinces']
                 )
             )
             
-            province_info = ProvinceInfoComponent(f"Province {province.id}")
-            province_info.cells = set(province.cells)
+            province_info = ProvinceInfoComponent(f"Province {province.id}", province=province)
             world.add_component(entity_id, province_info)
+            world.add_component(
+                entity_id,
+                ResourceComponent(self.province_resources(province.id))
+            )
             
         return True
 
-    def render(self, world: GameWorld) -> None:
-        """Отрисовывает карту."""
+    def province_resources(self, province_id: int) -> Dict[ResourceType, int]:
+        """
+        Возвращает количество клеток каждого ресурса в провинции.
+        
+        Счетчики всех провинций считаются одним bincount по сетке меток
+        при первом обращении после смены карты.
+        """
+        if self._resource_totals is None:
+            count = int(self.labels.max()) + 1 if self.labels.size else 0
+            self._resource_totals = resource_totals(self.labels, self.resources, count)
+        if not 0 <= province_id < len(self._resource_totals):
+            return {}
+        return totals_by_type(self._resource_totals[province_id])
+
+    def _remove_province_entities(self, world: GameWorld) -> None:
+        """Удаляет сущности провинций предыдущей карты."""
+        for entity_id in self.province_entities:
+            world.remove_entity(entity_id)
+        self.province_entities = []
+
+    def render(self, world: Optional[GameWorld] = None) -> None:
+        """
+        Отрисовывает видимую через камеру часть карты.
+        
+        Обходятся только клетки окна просмотра, поэтому время отрисовки
+        не зависит от размера мира.
+        """
         # Заливаем фон водой
         self.surface.fill(COLORS['water'])
         
-        # Отрисовка клеток
-        for y in range(GRID_HEIGHT):
-            for x in range(GRID_WIDTH):
-                rect = pygame.Rect(
-                    x * TILE_SIZE,
-                    y * TILE_SIZE,
-                    TILE_SIZE,
-                    TILE_SIZE
-                )
-                
-                if self.grid[y, x] == 1:
-                    pygame.draw.rect(self.surface, COLORS['province_neutral'], rect)
-                pygame.draw.rect(self.surface, COLORS['grid'], rect, 1)
-        
-        # Отрисовка границ провинций
-        for province_id, province in self.province_manager.provinces.items():
-            for x, y in province.cells:
-                for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-                    nx, ny = x + dx, y + dy
-                    if (nx, ny) not in province.cells:
-                        start_pos = (x * TILE_SIZE, y * TILE_SIZE)
-                        if dx == 1:  # Правая граница
-                            end_pos = (start_pos[0] + TILE_SIZE, start_pos[1])
-                        elif dx == -1:  # Левая граница
-                            end_pos = (start_pos[0], start_pos[1] + TILE_SIZE)
-                        elif dy == 1:  # Нижняя граница
-                            end_pos = (start_pos[0] + TILE_SIZE, start_pos[1] + TILE_SIZE)
-                        else:  # Верхняя граница
-                            end_pos = (start_pos[0], start_pos[1])
-                            
-                        pygame.draw.line(
-                            self.surface,
-                            COLORS['province_border'],
-                            start_pos,
-                            end_pos,
-                            2
-                        )
+        x0, y0, x1, y1 = self.camera.visible_cells()
+        if x0 >= x1 or y0 >= y1:
+            return
+        tile = self.camera.tile_size
+        
+        grid, resources, window = self._view(x0, y0, x1, y1)
+        
+        # Отрисовка клеток суши цветом их ресурса
+        land = grid == 1
+        for code, color in LAND_COLORS.items():
+            for y, x in zip(*np.nonzero(land & (resources == code))):
+                left, top = self.camera.cell_to_screen((x0 + int(x), y0 + int(y)))
+                self.surface.fill(color, (left, top, tile, tile))
+        
+        # Отрисовка сетки
+        left, top = self.camera.cell_to_screen((x0, y0))
+        right, bottom = self.camera.cell_to_screen((x1, y1))
+        for x in range(x0, x1 + 1):
+            sx = self.camera.cell_to_screen((x, y0))[0]
+            pygame.draw.line(self.surface, COLORS['grid_lines'], (sx, top), (sx, bottom))
+        for y in range(y0, y1 + 1):
+            sy = self.camera.cell_to_screen((x0, y))[1]
+            pygame.draw.line(self.surface, COLORS['grid_lines'], (left, sy), (right, sy))
+        
+        # Отрисовка границ провинций: ребро между клетками с разными метками,
+        # если хотя бы одна из них принадлежит провинции
+        inner_rows = window[1:-1]
+        inner_cols = window[:, 1:-1]
+        vertical = (inner_rows[:, :-1] != inner_rows[:, 1:]) & \
+                   ((inner_rows[:, :-1] >= 0) | (inner_rows[:, 1:] >= 0))
+        horizontal = (inner_cols[:-1] != inner_cols[1:]) & \
+                     ((inner_cols[:-1] >= 0) | (inner_cols[1:] >= 0))
+        
+        for row, col in zip(*np.nonzero(vertical)):
+            start_pos = self.camera.cell_to_screen((x0 + int(col), y0 + int(row)))
+            end_pos = (start_pos[0], start_pos[1] + tile)
+            pygame.draw.line(self.surface, COLORS['province_border'], start_pos, end_pos, 2)
+        for row, col in zip(*np.nonzero(horizontal)):
+            start_pos = self.camera.cell_to_screen((x0 + int(col), y0 + int(row)))
+            end_pos = (start_pos[0] + tile, start_pos[1])
+            pygame.draw.line(self.surface, COLORS['province_border'], start_pos, end_pos, 2)
+
+    def _view(
+        self,
+        x0: int,
+        y0: int,
+        x1: int,
+        y1: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Возвращает рельеф и ресурсы окна и метки окна с полем в одну клетку.
+        
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: Рельеф и ресурсы
+                [y0, y1) x [x0, x1) и метки [y0 - 1, y1] x [x0 - 1, x1]
+        """
+        if self.chunks is not None:
+            # Ресурсы чанков хранятся по провинциям, а не по клеткам
+            grid, labels = self.chunks.window(x0 - 1, y0 - 1, x1 + 1, y1 + 1)
+            grid = grid[1:-1, 1:-1]
+            return grid, np.zeros_like(grid), labels
+        return (
+            self.grid[y0:y1, x0:x1],
+            self.resources[y0:y1, x0:x1],
+            self._label_window(x0, y0, x1, y1)
+        )
+
+    def _label_window(self, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+        """
+        Вырезает метки провинций окна с полем в одну клетку.
+        
+        Returns:
+            np.ndarray: Метки клеток [y0 - 1, y1] x [x0 - 1, x1];
+                клетки вне мира получают метку -1
+        """
+        height, width = self.labels.shape
+        window = np.full((y1 - y0 + 2, x1 - x0 + 2), -1, dtype=np.int32)
+        top, bottom = max(y0 - 1, 0), min(y1 + 1, height)
+        left, right = max(x0 - 1, 0), min(x1 + 1, width)
+        window[top - y0 + 1:bottom - y0 + 1, left - x0 + 1:right - x0 + 1] = \
+            self.labels[top:bottom, left:right]
+        return window
+
+    def cell_at(self, position: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        """Возвращает клетку мира под точкой экрана (None вне мира)."""
+        return self.camera.screen_to_cell(position)
+
+    def province_at(self, position: Tuple[int, int]) -> Optional[Union[int, ProvinceKey]]:
+        """
+        Возвращает провинцию под точкой экрана.
+        
+        Returns:
+            Optional[Union[int, ProvinceKey]]: id провинции; в мире из
+                чанков - (чанк, номер провинции в чанке)
+        """
+        cell = self.cell_at(position)
+        if cell is None:
+            return None
+        if self.chunks is not None:
+            return self.chunks.province_at(cell)
+        label = int(self.labels[cell[1], cell[0]])
+        return label if label >= 0 else None
+
+    def close(self) -> None:
+        """Останавливает пулы процессов и сбрасывает загруженные чанки на диск."""
+        if self.chunks is not None:
+            self.chunks.flush()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+        with self._noise_lock:
+            if self._noise_executor is not None:
+                self._noise_executor.shutdown(wait=False, cancel_futures=True)
+                self._noise_executor = None
+
+    def _get_noise_executor(self, workers: int) -> Optional[ProcessPoolExecutor]:
+        """
+        Лениво создает пул процессов карты высот.
+        
+        Пул пересоздается, только если изменилось число процессов.
+        
+        Returns:
+            Optional[ProcessPoolExecutor]: Пул или None при workers <= 1
+                (карта высот считается в текущем процессе)
+        """
+        if workers <= 1:
+            return None
+        with self._noise_lock:
+            if self._noise_executor is not None and self._noise_workers != workers:
+                self._noise_executor.shutdown(wait=False)
+                self._noise_executor = None
+            if self._noise_executor is None:
+                self._noise_executor = create_noise_executor(workers)
+                self._noise_workers = workers
+            return self._noise_executor
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Лениво создает пул процессов для попыток генерации и менеджер событий."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.settings.parallel_attempts
+            )
+        if self._manager is None:
+            self._manager = SyncManager()
+            self._manager.start()
+        return self._executor
 
     def get_surface(self) -> pygame.Surface:
         """Получает поверхность с отрисованной картой."""
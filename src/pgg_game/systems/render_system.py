@@ -1,5 +1,5 @@
 import pygame
-from typing import List, Dict, Set
+from typing import List, Dict, Set, Tuple
 from ..components.transform import TransformComponent
 from ..components.renderable import RenderableComponent
 from ..world.game_world import GameWorld
@@ -13,19 +13,13 @@ class RenderSystem:
         
     def update(self, world: GameWorld) -> None:
         """Отрисовывает все видимые сущности."""
-        # Получаем все отрисовываемые сущности
-        entities = world.get_entities_with_components(
-            TransformComponent,
-            RenderableComponent
-        )
-        
-        # Группируем сущности по слоям
-        layers: Dict[int, List[int]] = {}
-        for entity in entities:
-            renderable = world.get_component(entity, RenderableComponent)
+        # Группируем отрисовываемые сущности по слоям
+        layers: Dict[int, List[Tuple[int, TransformComponent, RenderableComponent]]] = {}
+        for row in world.query(TransformComponent, RenderableComponent):
+            renderable = row[2]
             if renderable.layer not in layers:
                 layers[renderable.layer] = []
-            layers[renderable.layer].append(entity)
+            layers[renderable.layer].append(row)
         
         # Отрисовываем каждый слой
         for layer_num in sorted(layers.keys()):
@@ -35,7 +29,12 @@ class RenderSystem:
             # Отображаем слой
             self.screen.blit(self._layer_cache[layer_num], (0, 0))
     
-    def _render_layer(self, world: GameWorld, entities: List[int], layer: int) -> None:
+    def _render_layer(
+        self,
+        world: GameWorld,
+        entities: List[Tuple[int, TransformComponent, RenderableComponent]],
+        layer: int
+    ) -> None:
         """Отрисовывает все сущности одного слоя."""
         # Создаем поверхность для слоя если её нет
         if layer not in self._layer_cache:
@@ -48,10 +47,7 @@ class RenderSystem:
         surface.fill((0, 0, 0, 0))  # Очищаем слой
         
         # Отрисовываем каждую сущность
-        for entity in entities:
-            transform = world.get_component(entity, TransformComponent)
-            renderable = world.get_component(entity, RenderableComponent)
-            
+        for _, transform, renderable in entities:
             # Создаем поверхность с фигурой
             entity_surface = renderable.get_surface(transform.width, transform.height)
             
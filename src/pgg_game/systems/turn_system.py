@@ -126,7 +126,7 @@ class TurnSystem:
             ProvinceInfoComponent
         )
         
-        if position in province.cells:
+        if province.contains(position):
             # Создаем ратушу
             building_entity = self.world.create_entity()
             self.world.add_component(
@@ -71,7 +71,7 @@ class ProvincePanel(Panel):
         if province:
             self.labels['name'].text = f"Провинция: {province.name}"
             self.labels['owner'].text = f"Владелец: {owner.name if owner else 'Нейтральная'}"
-            self.labels['size'].text = f"Размер: {len(province.cells)} клеток"
+            self.labels['size'].text = f"Размер: {province.size} клеток"
 
 class GameUI:
     """Основной класс игрового интерфейса."""
@@ -0,0 +1,115 @@
+"""
+Камера: окно просмотра мира на экране.
+
+Мир измеряется в клетках и не зависит от разрешения экрана. Камера хранит
+смещение окна в пикселях мира и переводит координаты экрана в координаты
+клеток и обратно. Мир без размера (None) не ограничивает окно - так
+камера ходит по бесконечному миру из чанков.
+"""
+from typing import Optional, Tuple
+
+class Camera:
+    """Прямоугольное окно просмотра мира."""
+    
+    def __init__(
+        self,
+        world_width: Optional[int],
+        world_height: Optional[int],
+        view_width: int,
+        view_height: int,
+        tile_size: int
+    ):
+        """
+        Args:
+            world_width: Ширина мира в клетках (None - мир без границ)
+            world_height: Высота мира в клетках (None - мир без границ)
+            view_width: Ширина окна просмотра в пикселях
+            view_height: Высота окна просмотра в пикселях
+            tile_size: Размер клетки на экране в пикселях
+        """
+        self.view_width = view_width
+        self.view_height = view_height
+        self.tile_size = tile_size
+        self.world_width = world_width
+        self.world_height = world_height
+        # Левый верхний угол окна в пикселях мира
+        self.x = 0.0
+        self.y = 0.0
+    
+    def set_world_size(
+        self,
+        world_width: Optional[int],
+        world_height: Optional[int]
+    ) -> None:
+        """Задает размер мира и возвращает окно в его границы."""
+        self.world_width = world_width
+        self.world_height = world_height
+        self._clamp()
+    
+    def move(self, dx: float, dy: float) -> None:
+        """Сдвигает окно на (dx, dy) пикселей в пределах мира."""
+        self.x += dx
+        self.y += dy
+        self._clamp()
+    
+    def center_on(self, cell: Tuple[int, int]) -> None:
+        """Ставит центр окна на клетку."""
+        x, y = cell
+        self.x = (x + 0.5) * self.tile_size - self.view_width / 2
+        self.y = (y + 0.5) * self.tile_size - self.view_height / 2
+        self._clamp()
+    
+    def screen_to_cell(self, position: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        """
+        Переводит точку экрана в клетку мира.
+        
+        Args:
+            position: Координаты на экране в пикселях
+        
+        Returns:
+            Optional[Tuple[int, int]]: Клетка (x, y) или None вне мира
+        """
+        px, py = position
+        x = int((px + self.x) // self.tile_size)
+        y = int((py + self.y) // self.tile_size)
+        if self.world_width is None or (
+            0 <= x < self.world_width and 0 <= y < self.world_height
+        ):
+            return x, y
+        return None
+    
+    def cell_to_screen(self, cell: Tuple[int, int]) -> Tuple[int, int]:
+        """Возвращает левый верхний угол клетки на экране в пикселях."""
+        x, y = cell
+        return (
+            int(round(x * self.tile_size - self.x)),
+            int(round(y * self.tile_size - self.y))
+        )
+    
+    def visible_cells(self) -> Tuple[int, int, int, int]:
+        """
+        Возвращает видимый прямоугольник клеток.
+        
+        Returns:
+            Tuple[int, int, int, int]: (x0, y0, x1, y1), правая и нижняя
+                границы не включаются
+        """
+        x0 = int(self.x // self.tile_size)
+        y0 = int(self.y // self.tile_size)
+        x1 = int((self.x + self.view_width) // self.tile_size) + 1
+        y1 = int((self.y + self.view_height) // self.tile_size) + 1
+        if self.world_width is None:
+            return x0, y0, x1, y1
+        return (
+            max(x0, 0), max(y0, 0),
+            min(x1, self.world_width), min(y1, self.world_height)
+        )
+    
+    def _clamp(self) -> None:
+        """Не дает окну выйти за пределы мира (маленький мир - у левого края)."""
+        if self.world_width is None:
+            return
+        max_x = max(self.world_width * self.tile_size - self.view_width, 0)
+        max_y = max(self.world_height * self.tile_size - self.view_height, 0)
+        self.x = min(max(self.x, 0.0), float(max_x))
+        self.y = min(max(self.y, 0.0), float(max_y))
@@ -0,0 +1,365 @@
+"""
+Бесконечный мир из чанков, которые строятся по требованию.
+
+Шум - чистая функция координат, поэтому любой квадрат мира можно построить
+отдельно, и соседние чанки стыкуются без швов. Чанк содержит рельеф,
+провинции и ресурсы провинций; провинции не пересекают границы чанков.
+Загруженные чанки хранятся в LRU-кэше с ограничением памяти, а вытесненные
+сбрасываются на диск и при следующем обращении читаются, а не строятся
+заново.
+"""
+import os
+import tempfile
+import zipfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+from .connectivity import label_components
+from .map_cache import map_cache_key
+from .map_generator_settings import MapGenerationSettings
+from .noise_generator import HEIGHTMAP_CELL_STEP, create_noise_generator
+from .province_partitioner import NO_PROVINCE, ProvincePartitioner
+from .seeding import make_np_rng
+from .terrain_generator import TerrainGenerator
+
+# Сторона чанка по умолчанию, клеток
+DEFAULT_CHUNK_SIZE = 64
+# Ограничение памяти загруженных чанков по умолчанию, байт
+DEFAULT_CHUNK_BYTES = 32 * 1024 * 1024
+# Каталог чанков, вытесненных из памяти
+DEFAULT_CHUNK_DIR = os.path.join('.cache', 'chunks')
+
+# Размах шума, который приводится к высотам [0, 1]: примерно столько
+# занимает шум на карте-острове, где высоты нормируются по самой карте
+HEIGHT_NOISE_RANGE = 0.3
+
+# Расширение файлов вытесненных чанков
+CHUNK_SUFFIX = '.npz'
+
+# Координаты чанка (cx, cy): чанк покрывает клетки
+# [cx * size, (cx + 1) * size) x [cy * size, (cy + 1) * size)
+ChunkKey = Tuple[int, int]
+# Провинция мира: чанк и номер провинции в нем
+ProvinceKey = Tuple[ChunkKey, int]
+
+@dataclass
+class Chunk:
+    """Квадрат мира."""
+    key: ChunkKey
+    grid: np.ndarray       # Рельеф int8 (1 - суша, 0 - вода)
+    labels: np.ndarray     # Номера провинций int32 (NO_PROVINCE - вне провинций)
+    resources: np.ndarray  # Битовые маски ресурсов провинций (uint8, по номеру)
+    stored: bool = False   # Актуальная копия уже лежит на диске
+    
+    @property
+    def nbytes(self) -> int:
+        """Объем данных чанка в памяти, байт."""
+        return self.grid.nbytes + self.labels.nbytes + self.resources.nbytes
+    
+    @property
+    def province_count(self) -> int:
+        """Количество провинций в чанке."""
+        return int(self.resources.size)
+
+class ChunkGenerator:
+    """Строит чанки мира по настройкам генерации."""
+    
+    def __init__(self, settings: MapGenerationSettings, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Args:
+            settings: Настройки генерации (размер мира и ограничения
+                острова не используются)
+            chunk_size: Сторона чанка в клетках
+        """
+        self.settings = settings
+        self.chunk_size = chunk_size
+        self.noise = create_noise_generator(settings.noise_config)
+        # Порядок ресурсов задает биты масок ресурсов
+        self.resource_names = tuple(settings.resource_clusters)
+    
+    def generate(self, key: ChunkKey) -> Chunk:
+        """Строит чанк с рельефом, провинциями и ресурсами."""
+        grid = self._terrain(key)
+        labels, count = self._provinces(key, grid)
+        resources = self._resources(key, labels, count)
+        return Chunk(key, grid.astype(np.int8), labels, resources)
+    
+    def _terrain(self, key: ChunkKey) -> np.ndarray:
+        """
+        Строит маску суши чанка.
+        
+        Высоты не нормируются по карте и не спадают к краям: порог
+        применяется к шуму, приведенному из [-HEIGHT_NOISE_RANGE,
+        HEIGHT_NOISE_RANGE] в [0, 1]. Сглаживание
+        считается на квадрате с полем в smoothing_passes клеток - каждый
+        проход портит по клетке у края, - поэтому результат совпадает на
+        стыках соседних чанков.
+        """
+        size = self.chunk_size
+        margin = self.settings.smoothing_passes
+        cx, cy = key
+        xs = np.arange(cx * size - margin, (cx + 1) * size + margin, dtype=np.float64)
+        ys = np.arange(cy * size - margin, (cy + 1) * size + margin, dtype=np.float64)
+        heights = self.noise.noise2d_grid(xs * HEIGHTMAP_CELL_STEP, ys * HEIGHTMAP_CELL_STEP)
+        
+        heights = (heights / HEIGHT_NOISE_RANGE + 1.0) / 2.0
+        land = heights > self.settings.water_level
+        land = TerrainGenerator.smooth(land, margin)
+        return land[margin:margin + size, margin:margin + size]
+    
+    def _provinces(self, key: ChunkKey, land: np.ndarray) -> Tuple[np.ndarray, int]:
+        """
+        Разбивает сушу чанка на провинции.
+        
+        Если сушу нельзя разбить на провинции допустимого размера (мелкие
+        острова, обрезанные границей чанка), провинцией становится каждая
+        связная область суши.
+        """
+        partitioner = ProvincePartitioner(
+            self.settings.min_province_size,
+            self.settings.max_province_size,
+            make_np_rng(self.settings.seed, 'chunk', key[0], key[1], 'provinces')
+        )
+        result = partitioner.partition(land)
+        if result is not None:
+            return result.labels, result.province_count
+        
+        components, count = label_components(land)
+        return components - 1, count
+    
+    def _resources(self, key: ChunkKey, labels: np.ndarray, count: int) -> np.ndarray:
+        """
+        Раздает ресурсы провинциям.
+        
+        Ресурс достается провинции не меньше min_size клеток с
+        вероятностью chance из settings.resource_clusters.
+        """
+        rng = make_np_rng(self.settings.seed, 'chunk', key[0], key[1], 'resources')
+        sizes = np.bincount(labels[labels >= 0], minlength=count)
+        resources = np.zeros(count, dtype=np.uint8)
+        for bit, name in enumerate(self.resource_names):
+            cluster = self.settings.resource_clusters[name]
+            rolled = rng.random(count) < cluster['chance']
+            resources[rolled & (sizes >= cluster['min_size'])] |= 1 << bit
+        return resources
+
+class ChunkedWorld:
+    """
+    Мир из чанков с LRU-кэшем в памяти и сбросом вытесненных чанков на диск.
+    
+    Чанк строится при первом обращении к любой его клетке. Когда объем
+    загруженных чанков превышает max_bytes, давно не использованные чанки
+    выгружаются: копия пишется на диск, если ее там еще нет.
+    """
+    
+    def __init__(
+        self,
+        settings: MapGenerationSettings,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_bytes: int = DEFAULT_CHUNK_BYTES,
+        directory: Optional[str] = DEFAULT_CHUNK_DIR
+    ):
+        """
+        Args:
+            settings: Настройки генерации
+            chunk_size: Сторона чанка в клетках
+            max_bytes: Ограничение памяти загруженных чанков
+            directory: Каталог вытесненных чанков; None - вытесненные чанки
+                отбрасываются и при обращении строятся заново
+        """
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.base_directory = directory
+        self._chunks: 'OrderedDict[ChunkKey, Chunk]' = OrderedDict()
+        self._bytes = 0
+        self.reset(settings)
+    
+    def reset(self, settings: MapGenerationSettings) -> None:
+        """Переключает мир на другие настройки; загруженные чанки сбрасываются."""
+        self.settings = settings
+        self.generator = ChunkGenerator(settings, self.chunk_size)
+        self._chunks.clear()
+        self._bytes = 0
+        
+        # У каждого мира свой подкаталог: чанки разных настроек не смешиваются
+        self.directory = None
+        if self.base_directory is not None:
+            name = f"{map_cache_key(settings)[:16]}-{self.chunk_size}"
+            self.directory = os.path.join(self.base_directory, name)
+    
+    @property
+    def nbytes(self) -> int:
+        """Объем загруженных чанков, байт."""
+        return self._bytes
+    
+    def loaded_count(self) -> int:
+        """Количество загруженных чанков."""
+        return len(self._chunks)
+    
+    def chunk_key(self, cell: Tuple[int, int]) -> ChunkKey:
+        """Возвращает координаты чанка, содержащего клетку."""
+        x, y = cell
+        return x // self.chunk_size, y // self.chunk_size
+    
+    def chunk(self, key: ChunkKey) -> Chunk:
+        """
+        Возвращает чанк, загружая или строя его при необходимости.
+        
+        Args:
+            key: Координаты чанка
+        
+        Returns:
+            Chunk: Чанк (последний использованный в LRU)
+        """
+        chunk = self._chunks.get(key)
+        if chunk is not None:
+            self._chunks.move_to_end(key)
+            return chunk
+        
+        chunk = self._restore(key)
+        if chunk is None:
+            chunk = self.generator.generate(key)
+        self._chunks[key] = chunk
+        self._bytes += chunk.nbytes
+        self._evict()
+        return chunk
+    
+    def chunks_in(self, x0: int, y0: int, x1: int, y1: int) -> Iterator[Chunk]:
+        """Перебирает чанки, пересекающие прямоугольник клеток [x0, x1) x [y0, y1)."""
+        if x0 >= x1 or y0 >= y1:
+            return
+        cx0, cy0 = self.chunk_key((x0, y0))
+        cx1, cy1 = self.chunk_key((x1 - 1, y1 - 1))
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                yield self.chunk((cx, cy))
+    
+    def is_land(self, cell: Tuple[int, int]) -> bool:
+        """Проверяет, является ли клетка сушей."""
+        chunk = self.chunk(self.chunk_key(cell))
+        x, y = self._local(cell)
+        return bool(chunk.grid[y, x])
+    
+    def province_at(self, cell: Tuple[int, int]) -> Optional[ProvinceKey]:
+        """Возвращает провинцию клетки или None для воды."""
+        key = self.chunk_key(cell)
+        chunk = self.chunk(key)
+        x, y = self._local(cell)
+        label = int(chunk.labels[y, x])
+        if label == NO_PROVINCE:
+            return None
+        return key, label
+    
+    def province_resources(self, province: ProvinceKey) -> Tuple[str, ...]:
+        """Возвращает ресурсы провинции."""
+        key, label = province
+        mask = int(self.chunk(key).resources[label])
+        return tuple(
+            name for bit, name in enumerate(self.generator.resource_names)
+            if mask & (1 << bit)
+        )
+    
+    def window(self, x0: int, y0: int, x1: int, y1: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Собирает рельеф и метки провинций прямоугольника из чанков.
+        
+        Метки окна уникальны в пределах окна: провинции разных чанков
+        получают разные метки, поэтому границы между ними видны.
+        
+        Args:
+            x0, y0: Левый верхний угол (включительно)
+            x1, y1: Правый нижний угол (не включается)
+        
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Рельеф int8 и метки int32 формы
+                (y1 - y0, x1 - x0); -1 - вне провинций
+        """
+        grid = np.zeros((y1 - y0, x1 - x0), dtype=np.int8)
+        labels = np.full(grid.shape, NO_PROVINCE, dtype=np.int32)
+        size = self.chunk_size
+        offset = 0
+        for chunk in self.chunks_in(x0, y0, x1, y1):
+            left, top = chunk.key[0] * size, chunk.key[1] * size
+            # Пересечение чанка с окном в координатах мира
+            ax, ay = max(left, x0), max(top, y0)
+            bx, by = min(left + size, x1), min(top + size, y1)
+            source = (slice(ay - top, by - top), slice(ax - left, bx - left))
+            target = (slice(ay - y0, by - y0), slice(ax - x0, bx - x0))
+            
+            grid[target] = chunk.grid[source]
+            chunk_labels = chunk.labels[source]
+            labels[target] = np.where(chunk_labels >= 0, chunk_labels + offset, NO_PROVINCE)
+            offset += chunk.province_count
+        return grid, labels
+    
+    def flush(self) -> None:
+        """Сбрасывает на диск все загруженные чанки, которых там еще нет."""
+        for chunk in self._chunks.values():
+            self._spill(chunk)
+    
+    def _local(self, cell: Tuple[int, int]) -> Tuple[int, int]:
+        """Координаты клетки внутри ее чанка."""
+        return cell[0] % self.chunk_size, cell[1] % self.chunk_size
+    
+    def _evict(self) -> None:
+        """Выгружает давно не использованные чанки сверх ограничения памяти."""
+        # Последний загруженный чанк остается даже при крошечном ограничении
+        while self._bytes > self.max_bytes and len(self._chunks) > 1:
+            _, chunk = self._chunks.popitem(last=False)
+            self._bytes -= chunk.nbytes
+            self._spill(chunk)
+    
+    def _path(self, key: ChunkKey) -> str:
+        """Путь к файлу вытесненного чанка."""
+        return os.path.join(self.directory, f"{key[0]}_{key[1]}{CHUNK_SUFFIX}")
+    
+    def _spill(self, chunk: Chunk) -> None:
+        """Пишет чанк на диск атомарно (временный файл и переименование)."""
+        if self.directory is None or chunk.stored:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                np.savez_compressed(
+                    file,
+                    grid=chunk.grid,
+                    labels=chunk.labels,
+                    resources=chunk.resources
+                )
+            os.replace(temp_path, self._path(chunk.key))
+        except BaseException:
+            self._discard(temp_path)
+            raise
+        chunk.stored = True
+    
+    def _restore(self, key: ChunkKey) -> Optional[Chunk]:
+        """Читает вытесненный чанк; поврежденный файл удаляется."""
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                return Chunk(
+                    key,
+                    data['grid'],
+                    data['labels'],
+                    data['resources'],
+                    stored=True
+                )
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError, KeyError, zipfile.BadZipFile):
+            self._discard(path)
+            return None
+    
+    @staticmethod
+    def _discard(path: str) -> None:
+        """Удаляет файл, если он существует."""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
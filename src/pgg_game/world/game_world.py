@@ -1,5 +1,5 @@
 """Игровой мир."""
-from typing import Dict, Any, Type, TypeVar, Optional, Set, List
+from typing import Dict, Any, Type, TypeVar, Optional, Set, List, Tuple
 from ..components.transform import TransformComponent
 
 T = TypeVar('T')
@@ -16,6 +16,13 @@ class GameWorld:
         self._entities: Dict[int, Dict[Type, Any]] = {}
         self._components: Dict[Type, Dict[int, Any]] = {}
         self._entities_with_components: Dict[Type, Set[int]] = {}
+        # Кэш запросов query: типы компонентов -> {entity_id: (entity_id,
+        # компоненты...)}; обновляется в add_component и remove_component
+        self._queries: Dict[Tuple[Type, ...], Dict[int, Tuple[Any, ...]]] = {}
+        # Тип компонента -> запросы, в которые он входит
+        self._queries_by_type: Dict[Type, List[Tuple[Type, ...]]] = {}
+        # Готовые результаты query; сбрасываются при изменении запроса
+        self._query_results: Dict[Tuple[Type, ...], Tuple[Tuple[Any, ...], ...]] = {}
     
     def create_entity(self) -> int:
         """
@@ -51,6 +58,13 @@ class GameWorld:
         self._components[component_type][entity_id] = component
         self._entities[entity_id][component_type] = component
         self._entities_with_components[component_type].add(entity_id)
+        
+        # Обновляем запросы с этим типом компонента
+        for query_types in self._queries_by_type.get(component_type, ()):
+            row = self._query_row(entity_id, query_types)
+            if row is not None:
+                self._queries[query_types][entity_id] = row
+                self._query_results.pop(query_types, None)
     
     def get_component(self, entity_id: int, component_type: Type[T]) -> Optional[T]:
         """
@@ -79,6 +93,57 @@ class GameWorld:
         """
         return list(self._entities_with_components.get(component_type, set()))
     
+    def query(self, *component_types: Type) -> Tuple[Tuple[Any, ...], ...]:
+        """
+        Находит сущности, у которых есть все указанные компоненты.
+        
+        Запрос кэшируется при первом вызове и дальше обновляется в
+        add_component и remove_component, поэтому повторный запрос ничего
+        не пересчитывает. Результат - неизменяемый снимок: во время обхода
+        компоненты можно добавлять и удалять. Снимок строится заново
+        (O(числа совпадений)) только после изменения запроса.
+        
+        Args:
+            *component_types: Типы компонентов
+        
+        Returns:
+            Tuple[Tuple[Any, ...], ...]: Кортежи (entity_id, компонент A,
+                компонент B, ...) в порядке типов запроса
+        """
+        result = self._query_results.get(component_types)
+        if result is None:
+            rows = self._queries.get(component_types)
+            if rows is None:
+                rows = self._build_query(component_types)
+            result = self._query_results[component_types] = tuple(rows.values())
+        return result
+    
+    def _build_query(self, component_types: Tuple[Type, ...]) -> Dict[int, Tuple[Any, ...]]:
+        """Строит кэш запроса по наименьшему множеству сущностей."""
+        candidates = min(
+            (self._entities_with_components.get(component_type, set())
+             for component_type in component_types),
+            key=len,
+            default=set()
+        )
+        rows = {}
+        for entity_id in candidates:
+            row = self._query_row(entity_id, component_types)
+            if row is not None:
+                rows[entity_id] = row
+        
+        self._queries[component_types] = rows
+        for component_type in set(component_types):
+            self._queries_by_type.setdefault(component_type, []).append(component_types)
+        return rows
+    
+    def _query_row(self, entity_id: int, component_types: Tuple[Type, ...]) -> Optional[Tuple[Any, ...]]:
+        """Строка запроса для сущности или None, если компонентов не хватает."""
+        components = self._entities[entity_id]
+        if not all(component_type in components for component_type in component_types):
+            return None
+        return (entity_id,) + tuple(components[component_type] for component_type in component_types)
+    
     def get_all_components(self, component_type: Type[T]) -> Dict[int, T]:
         """
         Получает все компоненты определенного типа.
@@ -109,6 +174,10 @@ class GameWorld:
             
             if component_type in self._entities_with_components:
                 self._entities_with_components[component_type].discard(entity_id)
+            
+            for query_types in self._queries_by_type.get(component_type, ()):
+                if self._queries[query_types].pop(entity_id, None) is not None:
+                    self._query_results.pop(query_types, None)
     
     def remove_entity(self, entity_id: int) -> None:
         """
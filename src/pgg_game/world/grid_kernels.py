@@ -0,0 +1,102 @@
+"""
+Ядра ограничений провинций над сеткой меток.
+
+Соседство и плюсовые пересечения считаются сдвигами сетки меток сразу для
+всех клеток, поэтому генератор может проверить целую партию клеток-
+кандидатов одной операцией. Клетки за краем сетки считаются свободными.
+"""
+from typing import Tuple
+
+import numpy as np
+
+# Метка свободной клетки
+FREE = -1
+
+# Число занятых соседей, при котором клетка образует плюсовое пересечение
+PLUS_NEIGHBORS = 4
+
+def _shifted(labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Соседи каждой клетки сверху, снизу, слева и справа (за краем - FREE)."""
+    padded = np.pad(labels, 1, constant_values=FREE)
+    return padded[:-2, 1:-1], padded[2:, 1:-1], padded[1:-1, :-2], padded[1:-1, 2:]
+
+def occupied_neighbor_count(labels: np.ndarray) -> np.ndarray:
+    """
+    Считает занятых соседей каждой клетки (окрестность фон Неймана).
+    
+    Args:
+        labels: Сетка меток (FREE - свободная клетка)
+    
+    Returns:
+        np.ndarray: Сетка количества занятых соседей (int8)
+    """
+    count = np.zeros(labels.shape, dtype=np.int8)
+    for neighbor in _shifted(labels):
+        count += neighbor != FREE
+    return count
+
+def province_neighbor_mask(labels: np.ndarray, province_id: int) -> np.ndarray:
+    """
+    Находит клетки, у которых есть сосед из провинции.
+    
+    Args:
+        labels: Сетка меток
+        province_id: id провинции
+    
+    Returns:
+        np.ndarray: Булева маска клеток, прилегающих к провинции
+    """
+    mask = np.zeros(labels.shape, dtype=bool)
+    for neighbor in _shifted(labels):
+        mask |= neighbor == province_id
+    return mask
+
+def addable_mask(labels: np.ndarray, province_id: int, empty: bool = False) -> np.ndarray:
+    """
+    Находит клетки, которые можно добавить в провинцию по отдельности.
+    
+    Клетка подходит, если она свободна, прилегает к провинции (для пустой
+    провинции не требуется) и не окружена занятыми клетками со всех
+    четырех сторон. Ограничение размера провинции здесь не учитывается,
+    а после добавления клетки маска соседей меняется.
+    
+    Args:
+        labels: Сетка меток
+        province_id: id провинции
+        empty: Провинция еще не содержит клеток
+    
+    Returns:
+        np.ndarray: Булева маска подходящих клеток
+    """
+    mask = (labels == FREE) & (occupied_neighbor_count(labels) < PLUS_NEIGHBORS)
+    if not empty:
+        mask &= province_neighbor_mask(labels, province_id)
+    return mask
+
+def province_contacts(labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Находит пары соседних провинций и длины их общих границ.
+    
+    Каждая клетка сравнивается с соседями справа и снизу, поэтому каждое
+    общее ребро двух провинций учитывается ровно один раз.
+    
+    Args:
+        labels: Сетка меток
+    
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Массив формы (n, 2) уникальных пар
+            (меньший id, больший id) по возрастанию и число общих ребер
+            клеток каждой пары
+    """
+    # Пара кодируется одним числом: уникальные пары одномерного массива
+    # находятся сортировкой без сравнения строк. Направления обходятся
+    # по срезам сетки без копий, копируются только клетки на границах
+    stride = int(labels.max()) + 1 if labels.size else 1
+    codes = []
+    for first, second in ((labels[:, :-1], labels[:, 1:]), (labels[:-1, :], labels[1:, :])):
+        contact = (first != second) & (first != FREE) & (second != FREE)
+        first, second = first[contact], second[contact]
+        codes.append(np.minimum(first, second).astype(np.int64) * stride + np.maximum(first, second))
+    codes, lengths = np.unique(np.concatenate(codes), return_counts=True)
+    pairs = np.stack(np.divmod(codes, stride), axis=1).astype(labels.dtype)
+    return pairs, lengths
@@ -0,0 +1,372 @@
+"""
+Построение одной попытки карты: рельеф и провинции.
+
+Попытка не зависит от pygame и от игрового мира, поэтому ее можно
+выполнить в другом процессе и передать результат обратно целиком.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from threading import Event
+from typing import Dict, Optional, Set, Tuple
+
+import numpy as np
+
+from .connectivity import disconnected_labels_steps
+from .map_generator_settings import MapGenerationSettings
+from .pipeline import StagedRun, Steps, grid_bands, run_steps
+from .province_growth import ProvinceGrower, StartPointQueue
+from .province_manager import ProvinceManager
+from .province_partitioner import PartitionMethod, PartitionResult, ProvincePartitioner
+from .resource_placer import ResourcePlacer
+from .seeding import make_np_rng
+from .terrain_generator import TerrainGenerator
+
+# Версия генератора: увеличивается при любом изменении результата генерации
+# по тем же настройкам (от нее зависят ключи кэша карт)
+GENERATOR_VERSION = 5
+
+# Этапы попытки генерации в порядке выполнения
+STAGES = ('terrain', 'smoothing', 'partition', 'validation', 'resources')
+
+# Причины неудачи попытки (MapBuilder.failure)
+FAILURE_ISLAND_SIZE = 'island_size'              # Размер острова вне пределов
+FAILURE_PARTITION = 'partition'                  # Сушу не удалось разбить
+FAILURE_PROVINCE_SIZE = 'province_size'          # Провинция вне пределов размера
+FAILURE_PROVINCE_COUNT = 'province_count'        # Число провинций вне пределов
+FAILURE_COVERAGE = 'province_coverage'           # Клетка суши вне провинций
+FAILURE_CONNECTIVITY = 'province_connectivity'   # Провинция несвязна
+FAILURE_ISOLATED_CELL = 'province_isolated_cell' # Клетка без соседей в провинции
+FAILURE_CANCELLED = 'cancelled'                  # Попытка отменена (карта уже найдена)
+
+class MapBuilder:
+    """Строит сетку острова и провинции для одной попытки генерации."""
+    
+    def __init__(self, width: int, height: int):
+        """
+        Args:
+            width: Ширина карты в клетках
+            height: Высота карты в клетках
+        """
+        self.width = width
+        self.height = height
+        self.grid = np.zeros((height, width), dtype=np.int32)
+        # Слой ресурсов (см. resource_placer)
+        self.resources = np.zeros((height, width), dtype=np.int8)
+        self.province_manager = ProvinceManager()
+        # Время этапов последнего вызова generate, с
+        self.timings: Dict[str, float] = {}
+        # Причина неудачи последней попытки (None - карта прошла проверки)
+        self.failure: Optional[str] = None
+    
+    @classmethod
+    def from_labels(
+        cls,
+        grid: np.ndarray,
+        labels: np.ndarray,
+        seed: int,
+        resources: Optional[np.ndarray] = None
+    ) -> 'MapBuilder':
+        """
+        Восстанавливает готовую карту по сеткам рельефа и меток провинций.
+        
+        Args:
+            grid: Сетка рельефа (1 - суша, 0 - вода)
+            labels: Сетка меток провинций (-1 - вне провинций)
+            seed: Сид попытки, по которой построена карта
+            resources: Слой ресурсов; по умолчанию карта без ресурсов
+        """
+        height, width = grid.shape
+        builder = cls(width, height)
+        builder.grid = grid.astype(np.int32)
+        if resources is not None:
+            builder.resources = resources.astype(np.int8)
+        builder.province_manager = ProvinceManager(seed=seed)
+        builder.province_manager.load_labels(labels)
+        return builder
+    
+    def get_labels(self) -> np.ndarray:
+        """Возвращает сетку меток провинций."""
+        return self.province_manager.get_labels(self.grid.shape)
+    
+    def generate(self, settings: MapGenerationSettings, cancel: Optional[Event] = None) -> bool:
+        """
+        Выполняет одну попытку генерации целиком и замеряет время этапов.
+        
+        Args:
+            settings: Настройки попытки
+            cancel: Событие отмены (или его прокси из multiprocessing.Manager);
+                проверяется между порциями этапов, установленное событие
+                прерывает попытку с причиной FAILURE_CANCELLED
+        
+        Returns:
+            bool: True если карта прошла все проверки
+        """
+        run = StagedRun(self.steps(settings))
+        while not run.advance(0):
+            if cancel is not None and cancel.is_set():
+                run.steps.close()
+                self.failure = FAILURE_CANCELLED
+                break
+        self.timings = run.timings
+        return bool(run.result)
+    
+    def steps(
+        self,
+        settings: MapGenerationSettings,
+        noise_executor: Optional[ProcessPoolExecutor] = None
+    ) -> Steps[bool]:
+        """
+        Выполняет попытку генерации по этапам (см. pipeline и STAGES).
+        
+        Args:
+            settings: Настройки попытки
+            noise_executor: Общий пул процессов для карты высот при
+                settings.noise_workers > 1 (см. TerrainGenerator)
+        
+        Returns:
+            Steps[bool]: Генератор этапов; возвращает True если карта
+                прошла все проверки
+        """
+        self.failure = None
+        self.province_manager = ProvinceManager(
+            seed=settings.seed,
+            shape=(self.height, self.width)
+        )
+        terrain = TerrainGenerator(settings, noise_executor=noise_executor)
+        yield 'terrain'
+        self.grid = yield from terrain.steps(self.width, self.height)
+        
+        land_size = int(self.grid.sum())
+        if not settings.min_island_size <= land_size <= settings.max_island_size:
+            self.failure = FAILURE_ISLAND_SIZE
+            return False
+        
+        if not (yield from self._generate_provinces(settings)):
+            self.failure = FAILURE_PARTITION
+            return False
+        if not (yield from self._verify_steps()):
+            return False
+        
+        self.resources = yield from ResourcePlacer(settings).steps(self.grid == 1)
+        return True
+    
+    def _generate_provinces(self, settings: MapGenerationSettings) -> Steps[bool]:
+        """Генерирует провинции на карте (этап 'partition')."""
+        total_land = int(self.grid.sum())
+        if not total_land:
+            return False
+        
+        # Настраиваем количество и размеры провинций: до max_province_size
+        # клеток на провинцию при не более чем max_provinces провинциях
+        largest = settings.max_province_size
+        min_provinces = max(3, total_land // largest)
+        max_provinces = min(settings.max_provinces, total_land // settings.min_province_size)
+        if not max_provinces:
+            return False
+        min_size = max(4, total_land // (max_provinces * 2))
+        max_size = min(largest, total_land // min_provinces)
+        
+        # Обновляем конфигурацию
+        self.province_manager.config.update(
+            min_provinces=min_provinces,
+            max_provinces=max_provinces,
+            min_size=min_size,
+            max_size=max_size
+        )
+        
+        # Генерируем провинции
+        if settings.province_method is PartitionMethod.GROWTH:
+            ys, xs = np.nonzero(self.grid == 1)
+            land_cells = set(zip(xs.tolist(), ys.tolist()))
+            yield from self._create_provinces(land_cells, self._province_count())
+            return (yield from self._repair_provinces(settings))
+        
+        return (yield from self._partition_provinces(settings))
+    
+    def _province_count(self) -> int:
+        """Число провинций - по целевому размеру в пределах конфигурации."""
+        config = self.province_manager.config
+        ideal_size = self.province_manager.get_ideal_province_size()
+        count = round(int(self.grid.sum()) / ideal_size)
+        return min(max(count, config.min_provinces), config.max_provinces)
+    
+    def _partitioner(self, settings: MapGenerationSettings) -> ProvincePartitioner:
+        """Создает разбиватель суши по конфигурации провинций."""
+        config = self.province_manager.config
+        return ProvincePartitioner(
+            config.min_size,
+            config.max_size,
+            make_np_rng(settings.seed, 'provinces')
+        )
+    
+    def _partition_provinces(self, settings: MapGenerationSettings) -> Steps[bool]:
+        """Разбивает сушу на провинции по сетке меток (см. ProvincePartitioner.steps)."""
+        partitioner = self._partitioner(settings)
+        result = yield from partitioner.steps(
+            self.grid == 1,
+            self._province_count(),
+            self.province_manager.config.max_provinces
+        )
+        return (yield from self._load_partition(result))
+    
+    def _repair_provinces(self, settings: MapGenerationSettings) -> Steps[bool]:
+        """
+        Доводит выращенные провинции до ограничений конфигурации.
+        
+        Поочередный рост оставляет карманы суши и маленькие провинции у
+        краев; они исправляются так же, как после разбиения по сетке
+        меток (см. ProvincePartitioner.repair_steps).
+        """
+        partitioner = self._partitioner(settings)
+        result = yield from partitioner.repair_steps(
+            self.grid == 1,
+            self.get_labels(),
+            self.province_manager.config.max_provinces
+        )
+        return (yield from self._load_partition(result))
+    
+    def _load_partition(self, result: Optional[PartitionResult]) -> Steps[bool]:
+        """Заменяет провинции результатом разбиения (этап 'partition')."""
+        if result is None:
+            return False
+        
+        manager = ProvinceManager(seed=self.province_manager.seed, shape=self.grid.shape)
+        manager.config = self.province_manager.config
+        yield from manager.load_labels_steps(result.labels, 'partition')
+        self.province_manager = manager
+        return True
+    
+    def _create_provinces(
+        self,
+        land_cells: Set[Tuple[int, int]],
+        count: Optional[int] = None
+    ) -> Steps[bool]:
+        """
+        Создает провинции из доступных клеток, по порции на провинцию.
+        
+        Args:
+            land_cells: Клетки суши
+            count: Наибольшее число провинций; по умолчанию - пока
+                остаются свободные клетки
+        
+        Returns:
+            Steps[bool]: Генератор этапов; True если распределена вся суша
+        """
+        unassigned_cells = land_cells.copy()
+        center_x = sum(x for x, _ in land_cells) / len(land_cells)
+        center_y = sum(y for _, y in land_cells) / len(land_cells)
+        
+        # Оценки стартовых точек считаются один раз и обновляются
+        # только вокруг назначенных клеток
+        available = np.zeros(self.grid.shape, dtype=bool)
+        for x, y in land_cells:
+            available[y, x] = True
+        start_points = StartPointQueue(available, (center_x, center_y))
+        
+        # Провинции растут до равной доли суши
+        if count is None:
+            target_size = self.province_manager.get_ideal_province_size()
+        else:
+            target_size = min(-(-len(land_cells) // count), self.province_manager.config.max_size)
+        
+        while unassigned_cells and (count is None or len(self.province_manager.provinces) < count):
+            start = self._find_best_start_point(start_points)
+            if not start:
+                break
+            
+            # Создаем новую провинцию
+            province_id = self.province_manager.create_province()
+            
+            # Выращиваем провинцию из стартовой точки
+            cells = ProvinceGrower(start, unassigned_cells).grow(target_size)
+            
+            # Добавляем клетки в провинцию
+            added = []
+            for cell in cells:
+                if self.province_manager.add_cell_to_province(province_id, cell):
+                    unassigned_cells.remove(cell)
+                    added.append(cell)
+            start_points.remove(added)
+            
+            # Оставшиеся клетки нельзя распределить
+            if not added:
+                self.province_manager.remove_province(province_id)
+                break
+            yield 'partition'
+        
+        return not unassigned_cells
+    
+    def _find_best_start_point(
+        self,
+        start_points: StartPointQueue
+    ) -> Optional[Tuple[int, int]]:
+        """
+        Находит лучшую стартовую точку для новой провинции.
+        
+        Лучшая точка - свободная клетка с наибольшей оценкой: ближе к
+        центру суши и с большим числом свободных соседей.
+        
+        Args:
+            start_points: Очередь оценок свободных клеток
+        
+        Returns:
+            Optional[Tuple[int, int]]: Клетка (x, y) или None
+        """
+        return start_points.peek()
+    
+    def _verify_provinces(self) -> bool:
+        """Проверяет корректность всех провинций."""
+        return run_steps(self._verify_steps())
+    
+    def _verify_steps(self) -> Steps[bool]:
+        """
+        Проверяет все провинции по полосам сетки меток (этап 'validation').
+        
+        Размеры и число провинций считаются bincount, связность - одной разметкой областей
+        (см. connectivity.disconnected_labels). Клетка без соседей своей
+        провинции бывает только в несвязной провинции или в провинции
+        из одной клетки.
+        """
+        config = self.province_manager.config
+        labels = self.get_labels()
+        count = int(labels.max()) + 1
+        sizes = np.zeros(count, dtype=np.int64)
+        for rows in grid_bands(labels.shape):
+            band = labels[rows]
+            if ((self.grid[rows] == 1) != (band >= 0)).any():
+                self.failure = FAILURE_COVERAGE
+                return False
+            sizes += np.bincount(band[band >= 0], minlength=count)
+            yield 'validation'
+        sizes = sizes[sizes > 0]
+        
+        if ((sizes < config.min_size) | (sizes > config.max_size)).any():
+            self.failure = FAILURE_PROVINCE_SIZE
+            return False
+        if not config.min_provinces <= sizes.size <= config.max_provinces:
+            self.failure = FAILURE_PROVINCE_COUNT
+            return False
+        if (yield from disconnected_labels_steps(labels, 'validation')).size:
+            self.failure = FAILURE_CONNECTIVITY
+            return False
+        if (sizes == 1).any():
+            self.failure = FAILURE_ISOLATED_CELL
+            return False
+        
+        return True
+
+def build_map(settings: MapGenerationSettings, cancel: Optional[Event] = None) -> MapBuilder:
+    """
+    Выполняет попытку генерации и возвращает построитель с ее результатом.
+    
+    Функция модульного уровня, чтобы ее можно было отправить в пул процессов.
+    
+    Args:
+        settings: Настройки попытки (размер карты берется из них)
+        cancel: Общее событие отмены попыток (см. MapBuilder.generate)
+    
+    Returns:
+        MapBuilder: Построитель; карта прошла проверки, если failure равно None
+    """
+    builder = MapBuilder(settings.width, settings.height)
+    builder.generate(settings, cancel)
+    return builder
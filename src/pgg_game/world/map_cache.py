@@ -0,0 +1,195 @@
+"""
+Дисковый кэш сгенерированных карт.
+
+Ключ карты - хэш всех входов генерации: настроек, конфигурации шума,
+размера сетки и версии генератора. По ключу хранится сжатый .npz с сеткой
+рельефа, сеткой меток провинций, слоем ресурсов и сидом попытки, по которой построена
+карта. Размер каталога ограничен: при переполнении удаляются файлы,
+к которым дольше всего не обращались.
+"""
+import dataclasses
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+from enum import Enum
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .map_builder import GENERATOR_VERSION
+from .map_generator_settings import MapGenerationSettings
+
+# Каталог кэша по умолчанию и ограничение его размера
+DEFAULT_CACHE_DIR = os.path.join('.cache', 'maps')
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+# Расширение файлов кэша
+CACHE_SUFFIX = '.npz'
+
+# Поля настроек, которые влияют только на способ поиска карты, а не на нее
+_EXECUTION_FIELDS = ('parallel_attempts', 'noise_workers')
+
+def _canonical(value: Any) -> Any:
+    """Приводит значение настроек к виду, пригодному для JSON."""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    return value
+
+def map_cache_key(settings: MapGenerationSettings) -> str:
+    """
+    Вычисляет ключ карты (размер мира входит в настройки).
+    
+    Args:
+        settings: Настройки генерации
+    
+    Returns:
+        str: Шестнадцатеричный SHA-256 входов генерации
+    """
+    fields = {
+        field.name: getattr(settings, field.name)
+        for field in dataclasses.fields(settings)
+        if field.name not in _EXECUTION_FIELDS
+    }
+    fields['noise_config'] = dataclasses.asdict(settings.noise_config)
+    payload = {
+        'settings': _canonical(fields),
+        'version': GENERATOR_VERSION
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+@dataclasses.dataclass
+class CachedMap:
+    """Карта, загруженная из кэша."""
+    seed: int              # Сид попытки, по которой построена карта
+    grid: np.ndarray       # Сетка рельефа (1 - суша, 0 - вода)
+    labels: np.ndarray     # Сетка меток провинций (-1 - вне провинций)
+    resources: np.ndarray  # Слой ресурсов (см. resource_placer)
+    
+    @property
+    def nbytes(self) -> int:
+        """Объем данных карты в памяти, байт."""
+        return self.grid.nbytes + self.labels.nbytes + self.resources.nbytes
+
+class MapCache:
+    """Кэш карт в каталоге с ограничением размера (LRU по времени доступа)."""
+    
+    def __init__(
+        self,
+        directory: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_CACHE_BYTES
+    ):
+        """
+        Args:
+            directory: Каталог кэша; создается при первой записи
+            max_bytes: Максимальный суммарный размер файлов кэша
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+    
+    def load(self, key: str) -> Optional[CachedMap]:
+        """
+        Загружает карту по ключу.
+        
+        Поврежденный файл удаляется и считается промахом.
+        
+        Returns:
+            Optional[CachedMap]: Карта или None, если ее нет в кэше
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                cached = CachedMap(
+                    seed=int(data['seed']),
+                    grid=data['grid'],
+                    labels=data['labels'],
+                    resources=data['resources']
+                )
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError, KeyError, zipfile.BadZipFile):
+            self._discard(path)
+            return None
+        
+        # Отмечаем обращение для вытеснения по давности
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return cached
+    
+    def store(self, key: str, cached: CachedMap) -> None:
+        """
+        Сохраняет карту атомарно: запись во временный файл и переименование.
+        
+        Args:
+            key: Ключ карты
+            cached: Сохраняемая карта
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                np.savez_compressed(
+                    file,
+                    seed=np.int64(cached.seed),
+                    grid=cached.grid.astype(np.int8),
+                    labels=cached.labels.astype(np.int32),
+                    resources=cached.resources.astype(np.int8)
+                )
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            self._discard(temp_path)
+            raise
+        
+        self._evict()
+    
+    def clear(self) -> None:
+        """Удаляет все файлы кэша."""
+        for path in self._entries():
+            self._discard(path)
+    
+    def _path(self, key: str) -> str:
+        """Путь к файлу карты."""
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+    
+    def _entries(self) -> Dict[str, os.stat_result]:
+        """Файлы кэша и их метаданные."""
+        entries = {}
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if not name.endswith(CACHE_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                entries[path] = os.stat(path)
+            except FileNotFoundError:
+                continue
+        return entries
+    
+    def _evict(self) -> None:
+        """Удаляет давно не использованные файлы сверх ограничения размера."""
+        entries = self._entries()
+        total = sum(stat.st_size for stat in entries.values())
+        for path in sorted(entries, key=lambda path: entries[path].st_mtime):
+            if total <= self.max_bytes:
+                break
+            total -= entries[path].st_size
+            self._discard(path)
+    
+    @staticmethod
+    def _discard(path: str) -> None:
+        """Удаляет файл, если он существует."""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
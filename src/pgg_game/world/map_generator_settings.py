@@ -1,38 +1,107 @@
 """Настройки генерации карты."""
-from dataclasses import dataclass
+import math
+from dataclasses import dataclass, replace
 from typing import Dict, Optional
+from ..config import WORLD_WIDTH, WORLD_HEIGHT
 from ..world.noise_generator import NoiseConfig
+from ..world.province_partitioner import PartitionMethod
+from ..world.seeding import derive_seed, random_seed
+
+# Размеры острова и провинций по умолчанию для мира WORLD_WIDTH x WORLD_HEIGHT
+# и меньших миров
+BASE_LIMITS = {
+    'min_island_size': 100,
+    'max_island_size': 200,
+    'min_province_size': 15,
+    'max_province_size': 25,
+    'max_provinces': 8,
+}
+
+# На больших картах пределы острова - доли площади: суша там занимает
+# 25-30% карты (на карте по умолчанию меньше из-за отступа от края)
+MIN_LAND_SHARE = 0.1
+MAX_LAND_SHARE = 0.4
+
+def default_limits(width: int, height: int) -> Dict[str, int]:
+    """
+    Пределы острова и провинций по умолчанию для мира width x height.
+    
+    Мир не больше мира по умолчанию получает BASE_LIMITS. На большем
+    мире размеры провинций растут как корень из отношения площадей, пределы
+    острова - как доли площади, а max_provinces не ограничивает разбиение
+    самого большого острова на самые маленькие провинции (при
+    ограничении карманы суши остаются без семян). Ни одно значение не
+    меньше BASE_LIMITS.
+    
+    Args:
+        width: Ширина мира в клетках
+        height: Высота мира в клетках
+    
+    Returns:
+        Dict[str, int]: Значения полей MapGenerationSettings
+    """
+    area = width * height
+    ratio = area / (WORLD_WIDTH * WORLD_HEIGHT)
+    if ratio <= 1:
+        return dict(BASE_LIMITS)
+    
+    scale = math.sqrt(ratio)
+    limits = {
+        'min_island_size': round(area * MIN_LAND_SHARE),
+        'max_island_size': round(area * MAX_LAND_SHARE),
+        'min_province_size': round(BASE_LIMITS['min_province_size'] * scale),
+        'max_province_size': round(BASE_LIMITS['max_province_size'] * scale),
+    }
+    limits['max_provinces'] = limits['max_island_size'] // limits['min_province_size']
+    return {name: max(value, BASE_LIMITS[name]) for name, value in limits.items()}
 
 @dataclass
 class MapGenerationSettings:
     """Основные параметры генерации карты."""
+    # Сид карты: из него выводятся сиды всех генераторов
+    seed: Optional[int] = None
+    
+    # Размер мира в клетках
+    width: int = WORLD_WIDTH
+    height: int = WORLD_HEIGHT
+    
     # Настройки шума
     noise_config: Optional[NoiseConfig] = None
     
-    # Параметры острова
-    min_island_size: int = 100  # Минимальный размер острова в клетках
-    max_island_size: int = 200  # Максимальный размер острова
+    # Параметры острова (None - по площади мира, см. default_limits)
+    min_island_size: Optional[int] = None  # Минимальный размер острова в клетках
+    max_island_size: Optional[int] = None  # Максимальный размер острова
     edge_buffer: int = 3       # Отступ от края карты
     water_level: float = 0.4   # Уровень воды (0-1)
     
-    # Параметры провинций
-    min_province_size: int = 15  # Минимальный размер провинции
-    max_province_size: int = 25  # Максимальный размер провинции
+    # Параметры провинций (None - по площади мира, см. default_limits)
+    min_province_size: Optional[int] = None  # Минимальный размер провинции
+    max_province_size: Optional[int] = None  # Максимальный размер провинции
     min_provinces: int = 5      # Минимальное количество провинций 
-    max_provinces: int = 8      # Максимальное количество провинций
+    max_provinces: Optional[int] = None  # Максимальное количество провинций
+    province_method: PartitionMethod = PartitionMethod.BALANCED  # Способ разбиения
     
     # Параметры генерации
     smoothing_passes: int = 2   # Количество проходов сглаживания
     connection_passes: int = 2  # Проходы соединения областей
     max_attempts: int = 50     # Максимум попыток генерации
+    parallel_attempts: int = 1  # Попыток одновременно в пуле процессов (1 - по очереди)
+    noise_workers: int = 1      # Процессов для карты высот (1 - в текущем процессе)
     
     # Настройки ресурсов
     resource_clusters: Dict[str, Dict[str, float]] = None
 
     def __post_init__(self):
         """Инициализация значений по умолчанию."""
+        if self.seed is None:
+            self.seed = random_seed()
+            
+        for name, value in default_limits(self.width, self.height).items():
+            if getattr(self, name) is None:
+                setattr(self, name, value)
+            
         if self.noise_config is None:
-            self.noise_config = NoiseConfig()
+            self.noise_config = NoiseConfig(seed=derive_seed(self.seed, 'noise'))
             
         if self.resource_clusters is None:
             self.resource_clusters = {
@@ -42,8 +111,21 @@ class MapGenerationSettings:
                 'FOOD': {'min_size': 1, 'chance': 1.0}
             }
 
+    def for_seed(self, seed: int) -> 'MapGenerationSettings':
+        """
+        Возвращает копию настроек с другим сидом карты.
+        
+        Сид шума выводится из нового сида, остальные параметры шума
+        сохраняются.
+        """
+        noise_config = replace(self.noise_config, seed=derive_seed(seed, 'noise'))
+        return replace(self, seed=seed, noise_config=noise_config)
+
     def validate(self) -> bool:
         """Проверяет корректность настроек."""
+        if self.width <= 0 or self.height <= 0:
+            return False
+            
         if self.min_island_size > self.max_island_size:
             return False
             
@@ -56,6 +138,12 @@ class MapGenerationSettings:
         if self.water_level < 0 or self.water_level > 1:
             return False
             
+        if self.parallel_attempts < 1:
+            return False
+            
+        if self.noise_workers < 1:
+            return False
+            
         # Проверяем, что острова могут вместить минимальное число провинций
         if self.min_island_size < (self.min_provinces * self.min_province_size):
             return False
@@ -0,0 +1,153 @@
+"""
+Хранение больших карт в файлах, отображаемых в память.
+
+Карта - каталог с несжатыми .npy-файлами слоев (рельеф, метки провинций и,
+если есть, ресурсы) и meta.json с сидом, версией формата файлов и версией
+генератора. Слои
+открываются через numpy.memmap: загрузка не читает данные, а страницы
+подгружаются, когда к ним обращаются окно просмотра или симуляция.
+"""
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .map_builder import GENERATOR_VERSION
+
+# Файл описания карты; пишется последним, поэтому без него карта неполная
+META_FILE = 'meta.json'
+
+# Версия формата файлов карты: увеличивается при изменении слоев или
+# meta.json. Версия генератора записывается только для сведения: карта
+# остается той же картой, даже если новый генератор построил бы по ее сиду
+# другую. Файлы без версии формата записаны первой версией
+STORAGE_VERSION = 1
+
+# Размер полосы (в клетках) при записи слоя
+WRITE_BLOCK_CELLS = 1 << 22
+
+# Слои карты и их типы в файлах
+LAYER_DTYPES: Dict[str, np.dtype] = {
+    'grid': np.dtype(np.int8),         # Рельеф (1 - суша, 0 - вода)
+    'labels': np.dtype(np.int32),      # Метки провинций (-1 - вне провинций)
+    'resources': np.dtype(np.int8),    # Ресурсы клеток (необязательный слой)
+}
+
+@dataclass
+class StoredMap:
+    """Карта, слои которой отображены в память."""
+    seed: int                            # Сид попытки, по которой построена карта
+    grid: np.ndarray                     # Рельеф
+    labels: np.ndarray                   # Метки провинций
+    resources: Optional[np.ndarray] = None  # Ресурсы клеток
+    
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """Форма карты (height, width)."""
+        return self.grid.shape
+
+def save_map(
+    directory: str,
+    seed: int,
+    grid: np.ndarray,
+    labels: np.ndarray,
+    resources: Optional[np.ndarray] = None
+) -> None:
+    """
+    Сохраняет карту в каталог.
+    
+    Слои пишутся по полосам строк через memmap, поэтому источник тоже
+    может быть отображен в память и не читается целиком.
+    
+    Args:
+        directory: Каталог карты; создается при необходимости
+        seed: Сид попытки, по которой построена карта
+        grid: Рельеф
+        labels: Метки провинций
+        resources: Ресурсы клеток
+    """
+    if labels.shape != grid.shape or (resources is not None and resources.shape != grid.shape):
+        raise ValueError("Слои карты должны иметь одинаковую форму")
+    
+    os.makedirs(directory, exist_ok=True)
+    # Старое описание удаляется первым: прерванная запись не даст
+    # смесь старых и новых слоев
+    _discard(os.path.join(directory, META_FILE))
+    
+    layers = {'grid': grid, 'labels': labels}
+    if resources is not None:
+        layers['resources'] = resources
+    for name, source in layers.items():
+        path = _layer_path(directory, name)
+        # Слой, открытый из этого же файла, уже записан
+        filename = getattr(source, 'filename', None)
+        if filename is not None and os.path.abspath(filename) == os.path.abspath(path):
+            source.flush()
+            continue
+        
+        target = np.lib.format.open_memmap(
+            path,
+            mode='w+',
+            dtype=LAYER_DTYPES[name],
+            shape=source.shape
+        )
+        rows = max(1, WRITE_BLOCK_CELLS // max(1, source.shape[1]))
+        for start in range(0, source.shape[0], rows):
+            target[start:start + rows] = source[start:start + rows]
+        target.flush()
+        del target
+    
+    meta = {
+        'seed': int(seed),
+        'format': STORAGE_VERSION,
+        'generator': GENERATOR_VERSION,
+        'shape': list(grid.shape),
+        'layers': sorted(layers)
+    }
+    temp_path = os.path.join(directory, META_FILE + '.tmp')
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(meta, file)
+    os.replace(temp_path, os.path.join(directory, META_FILE))
+
+def load_map(directory: str, writable: bool = False) -> StoredMap:
+    """
+    Открывает сохраненную карту без чтения слоев.
+    
+    Args:
+        directory: Каталог карты
+        writable: Открыть слои на запись (изменения попадают в файлы)
+    
+    Returns:
+        StoredMap: Карта со слоями numpy.memmap
+    
+    Raises:
+        FileNotFoundError: Карта не найдена или записана не полностью
+        ValueError: Карта записана в другом формате или повреждена
+    """
+    with open(os.path.join(directory, META_FILE), encoding='utf-8') as file:
+        meta = json.load(file)
+    if meta.get('format', 1) != STORAGE_VERSION:
+        raise ValueError(f"Карта записана в формате версии {meta.get('format')}")
+    
+    mode = 'r+' if writable else 'r'
+    shape = tuple(meta['shape'])
+    layers = {}
+    for name in meta['layers']:
+        layer = np.load(_layer_path(directory, name), mmap_mode=mode)
+        if layer.shape != shape or layer.dtype != LAYER_DTYPES[name]:
+            raise ValueError(f"Слой {name} поврежден")
+        layers[name] = layer
+    return StoredMap(seed=int(meta['seed']), **layers)
+
+def _layer_path(directory: str, name: str) -> str:
+    """Путь к файлу слоя."""
+    return os.path.join(directory, name + '.npy')
+
+def _discard(path: str) -> None:
+    """Удаляет файл, если он существует."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
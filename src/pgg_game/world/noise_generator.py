@@ -1,36 +1,97 @@
 """
 Модуль генерации шума для процедурной генерации карты.
-Использует собственную реализацию шума без внешних зависимостей.
+Использует собственную реализацию шума; пакетные версии вычислений
+построены на NumPy.
 """
 import random
 import math
-from typing import Optional, Protocol
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, wait
+from enum import Enum
+from multiprocessing import shared_memory
+from typing import Iterator, Optional, Protocol, Tuple
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .pipeline import STEP_CELLS, row_bands
+from .seeding import random_seed
+
+# Шаг между соседними клетками карты в координатах шума
+HEIGHTMAP_CELL_STEP = 1.0 / 256
+
+# Размер полосы (в точках) для пакетной генерации шума
+GRID_BLOCK_CELLS = 32768
+
+# Размер полосы (в клетках) карты высот, которую heightmap_bands отдает за
+# раз: шум в несколько октав дороже поэлементного прохода по сетке
+HEIGHTMAP_BAND_CELLS = STEP_CELLS // 2
+
+# Полоса карты высот для пула процессов: крупная, чтобы хватало тайлов
+PARALLEL_BAND_CELLS = 1 << 18
+
+# Сторона тайла (в клетках) для параллельной генерации карты высот
+PARALLEL_TILE_SIZE = 256
+
+# Константы перекоса решетки симплексного шума
+SIMPLEX_F2 = 0.5 * (math.sqrt(3.0) - 1.0)
+SIMPLEX_G2 = (3.0 - math.sqrt(3.0)) / 6.0
+# Приводит сумму вкладов трех вершин к диапазону [-1, 1]
+SIMPLEX_SCALE = 99.0
+
+class NoiseKernel(Enum):
+    """
+    Ядро базового шума для одной октавы.
+    
+    Быстрый путь для сеток - GRADIENT: его пакетная версия считает почти
+    все по осям отдельно. Симплексная решетка перекошена, поэтому пакетный
+    SIMPLEX считает каждую вершину по всей сетке и на карте высот примерно
+    в 1,2 раза медленнее.
+    """
+    GRADIENT = "gradient"  # Градиентный шум по 4 вершинам квадрата
+    SIMPLEX = "simplex"    # Симплексный шум по 3 вершинам треугольника
 
 @dataclass
 class NoiseConfig:
     """Конфигурация для генерации шума."""
-    seed: int = random.randint(0, 1000)
+    seed: int = field(default_factory=random_seed)
     octaves: int = 6
     persistence: float = 0.5
     lacunarity: float = 2.0
     scale: float = 50.0
-    
-    def __post_init__(self):
-        """Инициализация значений по умолчанию."""
-        random.seed(self.seed)
+    kernel: NoiseKernel = NoiseKernel.GRADIENT
 
 class NoiseGenerator(Protocol):
     """Интерфейс для генераторов шума."""
     def noise2d(self, x: float, y: float) -> float:
         """Генерирует 2D шум для заданных координат."""
         ...
+    
+    def noise2d_grid(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Генерирует 2D шум для сетки координат."""
+        ...
+    
+    def heightmap(self, width: int, height: int) -> np.ndarray:
+        """Генерирует карту высот заданного размера."""
+        ...
 
 class SimplexNoise:
-    """Базовая реализация шума без внешних зависимостей."""
+    """
+    Базовая реализация шума без внешних зависимостей.
+    
+    Ядро октавы выбирается через NoiseConfig.kernel: градиентный шум
+    (4 вершины, сглаживание и интерполяция) или настоящий симплексный
+    шум (3 вершины без интерполяции).
+    """
     def __init__(self, config: Optional[NoiseConfig] = None):
         self.config = config or NoiseConfig()
         self._init_gradients()
+        
+        if NoiseKernel(self.config.kernel) == NoiseKernel.SIMPLEX:
+            self._base_noise = self._generate_simplex_noise
+            self._base_noise_array = self._generate_simplex_noise_array
+        else:
+            self._base_noise = self._generate_base_noise
+            self._base_noise_array = self._generate_base_noise_array
     
     def _init_gradients(self) -> None:
         """Инициализирует градиенты для генерации шума."""
@@ -42,10 +103,27 @@ class SimplexNoise:
             for i in range(8)
         ]]
         
+        # Локальный генератор: та же перестановка, что и у глобального
+        # random.seed(seed), но без влияния на другие генераторы
         self._perm = list(range(256))
-        random.seed(self.config.seed)
-        random.shuffle(self._perm)
+        random.Random(self.config.seed).shuffle(self._perm)
         self._perm += self._perm
+        
+        # Таблицы градиентов для пакетных вычислений:
+        # table[iy & 255, ix & 255] - градиент, который выбирает _gradient
+        perm = np.array(self._perm, dtype=np.int64)
+        gradients = np.array(self._gradients, dtype=np.float64)
+        lattice = np.arange(256)
+        idx = perm[(lattice[np.newaxis, :] + perm[lattice][:, np.newaxis]) & 255] & 7
+        self._grad_x_table = gradients[idx, 0]
+        self._grad_y_table = gradients[idx, 1]
+        
+        # Те же таблицы 257 x 257 с повтором первой строки и столбца,
+        # построчно: у вершин симплекса (i, j), (i + 1, j), (i, j + 1) и
+        # (i + 1, j + 1) индексы cell, cell + 1, cell + 257 и cell + 258
+        wrap = np.arange(257) & 255
+        self._grad_x_wrapped = self._grad_x_table[np.ix_(wrap, wrap)].ravel()
+        self._grad_y_wrapped = self._grad_y_table[np.ix_(wrap, wrap)].ravel()
     
     def noise2d(self, x: float, y: float) -> float:
         """Генерирует 2D шум."""
@@ -59,7 +137,7 @@ class SimplexNoise:
             nx = x * frequency * self.config.scale
             ny = y * frequency * self.config.scale
             
-            noise_val = self._generate_base_noise(nx, ny)
+            noise_val = self._base_noise(nx, ny)
             
             value += noise_val * amplitude
             max_value += amplitude
@@ -73,6 +151,74 @@ class SimplexNoise:
         
         return value
     
+    def noise2d_grid(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """
+        Генерирует 2D шум для всей сетки координат.
+        
+        Значения совпадают с noise2d в каждой точке сетки.
+        
+        Args:
+            xs: Координаты по X (одномерный массив)
+            ys: Координаты по Y (одномерный массив)
+        
+        Returns:
+            np.ndarray: Массив формы (len(ys), len(xs))
+        """
+        x = np.asarray(xs, dtype=np.float64).ravel()
+        y = np.asarray(ys, dtype=np.float64).ravel()
+        
+        result = np.empty((y.shape[0], x.shape[0]), dtype=np.float64)
+        
+        # Считаем полосами строк, чтобы временные массивы помещались в кэш
+        block_rows = max(1, GRID_BLOCK_CELLS // max(1, x.shape[0]))
+        for start in range(0, y.shape[0], block_rows):
+            stop = start + block_rows
+            result[start:stop] = self._octaves_array(x, y[start:stop])
+        
+        return result
+    
+    def heightmap(self, width: int, height: int) -> np.ndarray:
+        """
+        Генерирует карту высот для сетки клеток.
+        
+        Клетка (x, y) соответствует точке шума
+        (x * HEIGHTMAP_CELL_STEP, y * HEIGHTMAP_CELL_STEP).
+        
+        Args:
+            width: Ширина карты в клетках
+            height: Высота карты в клетках
+        
+        Returns:
+            np.ndarray: Массив высот формы (height, width)
+        """
+        xs = np.arange(width, dtype=np.float64) * HEIGHTMAP_CELL_STEP
+        ys = np.arange(height, dtype=np.float64) * HEIGHTMAP_CELL_STEP
+        return self.noise2d_grid(xs, ys)
+    
+    def _octaves_array(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Суммирует октавы шума для полосы сетки (пакетная версия noise2d)."""
+        value = np.zeros((y.shape[0], x.shape[0]), dtype=np.float64)
+        amplitude = 1.0
+        frequency = 1.0
+        max_value = 0.0
+        
+        for _ in range(self.config.octaves):
+            nx = x * frequency * self.config.scale
+            ny = y * frequency * self.config.scale
+            
+            noise_val = self._base_noise_array(nx, ny)
+            noise_val *= amplitude
+            value += noise_val
+            max_value += amplitude
+            
+            amplitude *= self.config.persistence
+            frequency *= self.config.lacunarity
+        
+        if max_value > 0:
+            value /= max_value
+        
+        return value
+    
     def _generate_base_noise(self, x: float, y: float) -> float:
         """Генерирует базовое значение шума для одной октавы."""
         x0 = math.floor(x)
@@ -95,6 +241,170 @@ class SimplexNoise:
             dy
         )
     
+    def _generate_base_noise_array(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Пакетная версия _generate_base_noise.
+        
+        Всё, что зависит только от одной оси, считается один раз на ось,
+        а сетка получается broadcast-ом.
+        
+        Args:
+            x: Координаты по X (одномерный массив, столбцы сетки)
+            y: Координаты по Y (одномерный массив, строки сетки)
+        
+        Returns:
+            np.ndarray: Значения шума формы (len(y), len(x))
+        """
+        x0 = np.floor(x)
+        y0 = np.floor(y)
+        
+        dx = self._smooth(x - x0)
+        dy = self._smooth(y - y0)
+        
+        ix = x0.astype(np.int64)
+        iy = y0.astype(np.int64)
+        
+        # Строки таблиц градиентов для y0 и y0 + 1
+        row0_x = self._grad_x_table.take(iy & 255, axis=0)
+        row0_y = self._grad_y_table.take(iy & 255, axis=0)
+        row1_x = self._grad_x_table.take((iy + 1) & 255, axis=0)
+        row1_y = self._grad_y_table.take((iy + 1) & 255, axis=0)
+        
+        col0 = ix & 255
+        col1 = (ix + 1) & 255
+        
+        dx0 = dx[np.newaxis, :]
+        dx1 = dx0 - 1
+        dy0 = dy[:, np.newaxis]
+        dy1 = dy0 - 1
+        
+        v00 = dx0 * row0_x.take(col0, axis=1) + dy0 * row0_y.take(col0, axis=1)
+        v10 = dx1 * row0_x.take(col1, axis=1) + dy0 * row0_y.take(col1, axis=1)
+        v01 = dx0 * row1_x.take(col0, axis=1) + dy1 * row1_y.take(col0, axis=1)
+        v11 = dx1 * row1_x.take(col1, axis=1) + dy1 * row1_y.take(col1, axis=1)
+        
+        return self._lerp(
+            self._lerp(v00, v10, dx0),
+            self._lerp(v01, v11, dx0),
+            dy0
+        )
+    
+    def _generate_simplex_noise(self, x: float, y: float) -> float:
+        """Генерирует значение симплексного шума для одной октавы."""
+        # Перекос в пространство треугольной решетки
+        s = (x + y) * SIMPLEX_F2
+        i = math.floor(x + s)
+        j = math.floor(y + s)
+        
+        t = (i + j) * SIMPLEX_G2
+        x0 = x - (i - t)
+        y0 = y - (j - t)
+        
+        # Выбираем треугольник, в котором лежит точка
+        if x0 > y0:
+            i1, j1 = 1, 0
+        else:
+            i1, j1 = 0, 1
+        
+        x1 = x0 - i1 + SIMPLEX_G2
+        y1 = y0 - j1 + SIMPLEX_G2
+        x2 = x0 - 1.0 + 2.0 * SIMPLEX_G2
+        y2 = y0 - 1.0 + 2.0 * SIMPLEX_G2
+        
+        n0 = self._simplex_corner(i, j, x0, y0)
+        n1 = self._simplex_corner(i + i1, j + j1, x1, y1)
+        n2 = self._simplex_corner(i + 1, j + 1, x2, y2)
+        
+        return SIMPLEX_SCALE * (n0 + n1 + n2)
+    
+    def _simplex_corner(self, ix: int, iy: int, dx: float, dy: float) -> float:
+        """Вычисляет вклад одной вершины симплекса."""
+        t = 0.5 - dx * dx - dy * dy
+        if t < 0:
+            return 0.0
+        t2 = t * t
+        return t2 * t2 * self._gradient(ix, iy, dx, dy)
+    
+    def _generate_simplex_noise_array(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Пакетная версия _generate_simplex_noise.
+        
+        Args:
+            x: Координаты по X (одномерный массив, столбцы сетки)
+            y: Координаты по Y (одномерный массив, строки сетки)
+        
+        Returns:
+            np.ndarray: Значения шума формы (len(y), len(x))
+        """
+        x = x[np.newaxis, :]
+        y = y[:, np.newaxis]
+        
+        s = (x + y) * SIMPLEX_F2
+        i = np.floor(x + s)
+        j = np.floor(y + s)
+        
+        t = (i + j) * SIMPLEX_G2
+        x0 = x - (i - t)
+        y0 = y - (j - t)
+        
+        # Индекс первой вершины в таблицах _grad_*_wrapped
+        cell = j.astype(np.int64) & 255
+        cell *= 257
+        cell += i.astype(np.int64) & 255
+        
+        # Вторая вершина: (i + 1, j) под диагональю, (i, j + 1) над ней
+        upper = x0 > y0
+        x1 = x0 - upper
+        x1 += SIMPLEX_G2
+        y1 = y0 - ~upper
+        y1 += SIMPLEX_G2
+        cell1 = np.where(upper, 1, 257)
+        cell1 += cell
+        
+        n = self._simplex_corner_array(cell, x0, y0)
+        n += self._simplex_corner_array(cell1, x1, y1)
+        del x1, y1, cell1
+        
+        # Третья вершина (i + 1, j + 1); x0, y0 и cell больше не нужны
+        x0 += 2.0 * SIMPLEX_G2 - 1.0
+        y0 += 2.0 * SIMPLEX_G2 - 1.0
+        cell += 258
+        n += self._simplex_corner_array(cell, x0, y0)
+        
+        n *= SIMPLEX_SCALE
+        return n
+    
+    def _simplex_corner_array(
+        self,
+        cell: np.ndarray,
+        dx: np.ndarray,
+        dy: np.ndarray
+    ) -> np.ndarray:
+        """
+        Пакетная версия _simplex_corner.
+        
+        Args:
+            cell: Индексы вершины в таблицах _grad_*_wrapped
+            dx: Смещения точек от вершины по X
+            dy: Смещения точек от вершины по Y
+        """
+        t = dx * dx
+        t += dy * dy
+        np.subtract(0.5, t, out=t)
+        # Вершины дальше радиуса влияния дают нулевой вклад
+        np.maximum(t, 0.0, out=t)
+        t *= t
+        t *= t
+        
+        grad = self._grad_x_wrapped.take(cell)
+        grad *= dx
+        grad_y = self._grad_y_wrapped.take(cell)
+        grad_y *= dy
+        grad += grad_y
+        
+        grad *= t
+        return grad
+    
     def _gradient(self, ix: int, iy: int, dx: float, dy: float) -> float:
         """Вычисляет влияние градиента в точке."""
         idx = self._perm[(ix + self._perm[iy & 255]) & 255] & 7
@@ -111,14 +421,195 @@ class SimplexNoise:
         """Линейная интерполяция."""
         return a + t * (b - a)
 
-def create_noise_generator(config: Optional[NoiseConfig] = None) -> NoiseGenerator:
+# Генератор шума рабочего процесса для конфигурации последнего тайла:
+# пул бывает общим для генераторов с разными конфигурациями
+_worker_noise: Optional[SimplexNoise] = None
+
+def _worker_generator(config: NoiseConfig) -> SimplexNoise:
+    """Возвращает генератор шума рабочего процесса для конфигурации."""
+    global _worker_noise
+    if _worker_noise is None or _worker_noise.config != config:
+        _worker_noise = SimplexNoise(config)
+    return _worker_noise
+
+def _fill_tile(
+    config: NoiseConfig,
+    shm_name: str,
+    shape: Tuple[int, int],
+    row: int,
+    col: int,
+    xs: np.ndarray,
+    ys: np.ndarray
+) -> None:
+    """Считает тайл шума и пишет его прямо в общий буфер."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        out[row:row + ys.shape[0], col:col + xs.shape[0]] = \
+            _worker_generator(config).noise2d_grid(xs, ys)
+        del out
+    finally:
+        shm.close()
+
+class ParallelNoise:
+    """
+    Генератор шума, считающий сетку тайлами в пуле процессов.
+    
+    Шум - чистая функция (seed, x, y), поэтому тайлы независимы, а результат
+    побитно совпадает с однопроцессным SimplexNoise. Тайлы пишутся в общий
+    буфер shared memory и не сериализуются обратно. Конфигурация шума
+    передается с каждым тайлом, поэтому один пул процессов (см.
+    create_noise_executor) служит генераторам разных карт.
+    """
+    def __init__(
+        self,
+        config: Optional[NoiseConfig] = None,
+        workers: int = 2,
+        tile_size: int = PARALLEL_TILE_SIZE,
+        executor: Optional[ProcessPoolExecutor] = None
+    ):
+        """
+        Args:
+            config: Конфигурация генерации шума
+            workers: Количество рабочих процессов
+            tile_size: Сторона тайла в клетках
+            executor: Общий пул процессов; его останавливает вызывающий
+                код. Без него генератор лениво создает свой пул
+        """
+        self.config = config or NoiseConfig()
+        self.workers = workers
+        self.tile_size = tile_size
+        self._noise = SimplexNoise(self.config)
+        self._executor = executor
+        self._owns_executor = executor is None
+    
+    def noise2d(self, x: float, y: float) -> float:
+        """Генерирует 2D шум в одной точке (в текущем процессе)."""
+        return self._noise.noise2d(x, y)
+    
+    def noise2d_grid(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """
+        Генерирует 2D шум для сетки координат в пуле процессов.
+        
+        Args:
+            xs: Координаты по X (одномерный массив)
+            ys: Координаты по Y (одномерный массив)
+        
+        Returns:
+            np.ndarray: Массив формы (len(ys), len(xs))
+        """
+        x = np.asarray(xs, dtype=np.float64).ravel()
+        y = np.asarray(ys, dtype=np.float64).ravel()
+        shape = (y.shape[0], x.shape[0])
+        
+        # Маленькие сетки дешевле посчитать на месте
+        if shape[0] * shape[1] <= self.tile_size * self.tile_size:
+            return self._noise.noise2d_grid(x, y)
+        
+        shm = shared_memory.SharedMemory(
+            create=True,
+            size=shape[0] * shape[1] * np.dtype(np.float64).itemsize
+        )
+        try:
+            executor = self._get_executor()
+            futures = [
+                executor.submit(
+                    _fill_tile, self.config, shm.name, shape, row, col,
+                    x[col:col + self.tile_size],
+                    y[row:row + self.tile_size]
+                )
+                for row in range(0, shape[0], self.tile_size)
+                for col in range(0, shape[1], self.tile_size)
+            ]
+            wait(futures)
+            for future in futures:
+                future.result()
+            
+            return np.ndarray(shape, dtype=np.float64, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+    
+    def heightmap(self, width: int, height: int) -> np.ndarray:
+        """Генерирует карту высот (см. SimplexNoise.heightmap)."""
+        xs = np.arange(width, dtype=np.float64) * HEIGHTMAP_CELL_STEP
+        ys = np.arange(height, dtype=np.float64) * HEIGHTMAP_CELL_STEP
+        return self.noise2d_grid(xs, ys)
+    
+    def close(self) -> None:
+        """Останавливает свой пул процессов (общий пул не трогает)."""
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Лениво создает свой пул процессов."""
+        if self._executor is None:
+            self._executor = create_noise_executor(self.workers)
+        return self._executor
+    
+    def __enter__(self) -> 'ParallelNoise':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+def heightmap_bands(
+    noise: NoiseGenerator,
+    width: int,
+    height: int,
+    band_cells: int = HEIGHTMAP_BAND_CELLS
+) -> Iterator[Tuple[slice, np.ndarray]]:
+    """
+    Генерирует карту высот полосами строк (см. row_bands).
+    
+    Полосы вместе совпадают с noise.heightmap(width, height); между ними
+    вызывающий код может прерваться (см. pipeline).
+    
+    Args:
+        noise: Генератор шума
+        width: Ширина карты в клетках
+        height: Высота карты в клетках
+        band_cells: Наибольшее число клеток в полосе
+    
+    Yields:
+        Tuple[slice, np.ndarray]: Строки полосы и высоты формы (строки, width)
+    """
+    xs = np.arange(width, dtype=np.float64) * HEIGHTMAP_CELL_STEP
+    ys = np.arange(height, dtype=np.float64) * HEIGHTMAP_CELL_STEP
+    for rows in row_bands(width, height, band_cells):
+        yield rows, noise.noise2d_grid(xs, ys[rows])
+
+def create_noise_generator(
+    config: Optional[NoiseConfig] = None,
+    workers: int = 1,
+    executor: Optional[ProcessPoolExecutor] = None
+) -> NoiseGenerator:
     """
     Создает генератор шума.
     
     Args:
         config: Конфигурация генерации шума
+        workers: Количество процессов для генерации сетки; при значении
+            больше 1 карта высот считается тайлами в пуле процессов
+        executor: Общий пул процессов для тайлов (см. create_noise_executor);
+            без него генератор создает свой пул
     
     Returns:
         NoiseGenerator: Генератор шума
     """
-    return SimplexNoise(config)
\ No newline at end of file
+    if workers > 1:
+        return ParallelNoise(config, workers=workers, executor=executor)
+    return SimplexNoise(config)
+
+def create_noise_executor(workers: int) -> ProcessPoolExecutor:
+    """
+    Создает пул процессов для тайлов ParallelNoise.
+    
+    Пул не привязан к конфигурации шума, поэтому его можно передавать
+    генераторам всех попыток и карт, а не запускать процессы заново.
+    
+    Args:
+        workers: Количество рабочих процессов
+    """
+    return ProcessPoolExecutor(max_workers=workers)
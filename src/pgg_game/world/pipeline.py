@@ -0,0 +1,115 @@
+"""
+Пошаговое выполнение конвейеров генерации.
+
+Этап конвейера - генератор, который после каждой порции работы отдает
+(yield) имя этапа, к которому относится эта порция, и возвращает
+результат через return. Конвейеры соединяются через yield from, поэтому
+один генератор описывает всю генерацию, а вызывающий код решает, сколько
+порций выполнить за раз: все сразу, по одной или в пределах бюджета кадра.
+"""
+import time
+from typing import Dict, Generator, Generic, Iterator, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+# Генератор этапов: отдает имена этапов, возвращает результат
+Steps = Generator[str, None, T]
+
+# Объем порции поэлементной работы над сеткой, клеток: порции этапов
+# генерации режутся по числу клеток, а не по строкам, чтобы время порции
+# не росло с размером карты
+STEP_CELLS = 1 << 14
+
+class StagedRun(Generic[T]):
+    """
+    Выполнение конвейера порциями с замером времени этапов.
+    
+    Время порции приписывается этапу, имя которого она отдала.
+    """
+    
+    def __init__(self, steps: Steps[T]):
+        """
+        Args:
+            steps: Генератор этапов
+        """
+        self.steps = steps
+        self.stage: Optional[str] = None  # Этап последней порции
+        self.timings: Dict[str, float] = {}  # Этап -> суммарное время, с
+        self.done = False
+        self.result: Optional[T] = None
+    
+    def advance(self, budget: Optional[float] = None) -> bool:
+        """
+        Выполняет порции, пока не исчерпан бюджет времени.
+        
+        Хотя бы одна порция выполняется всегда, поэтому при нулевом бюджете
+        метод делает ровно один шаг.
+        
+        Args:
+            budget: Бюджет в секундах; None - выполнить до конца
+        
+        Returns:
+            bool: True если конвейер завершен
+        """
+        start = time.perf_counter()
+        deadline = None if budget is None else start + budget
+        while not self.done:
+            try:
+                stage = next(self.steps)
+            except StopIteration as stop:
+                self.done = True
+                self.result = stop.value
+                stage = self.stage
+            
+            end = time.perf_counter()
+            if stage is not None:
+                self.timings[stage] = self.timings.get(stage, 0.0) + end - start
+                self.stage = stage
+            start = end
+            
+            if deadline is not None and end >= deadline:
+                break
+        return self.done
+    
+    def run(self) -> T:
+        """Выполняет конвейер до конца и возвращает результат."""
+        self.advance()
+        return self.result
+
+def row_bands(width: int, height: int, band_cells: int = STEP_CELLS) -> Iterator[slice]:
+    """
+    Делит строки сетки на полосы не больше band_cells клеток.
+    
+    Args:
+        width: Ширина сетки в клетках
+        height: Высота сетки в клетках
+        band_cells: Наибольшее число клеток в полосе (не меньше одной строки)
+    
+    Yields:
+        slice: Строки полосы
+    """
+    band_rows = max(1, band_cells // max(1, width))
+    for start in range(0, height, band_rows):
+        yield slice(start, min(start + band_rows, height))
+
+def grid_bands(shape: Tuple[int, ...], band_cells: int = STEP_CELLS) -> Iterator[slice]:
+    """Делит строки сетки формы shape (height, width) на полосы (см. row_bands)."""
+    return row_bands(shape[1], shape[0], band_cells)
+
+def chunks(size: int, chunk: int = STEP_CELLS) -> Iterator[slice]:
+    """
+    Делит диапазон [0, size) на отрезки не больше chunk элементов.
+    
+    Args:
+        size: Длина диапазона
+        chunk: Наибольшая длина отрезка
+    
+    Yields:
+        slice: Отрезки по порядку
+    """
+    for start in range(0, size, chunk):
+        yield slice(start, min(start + chunk, size))
+
+def run_steps(steps: Steps[T]) -> T:
+    """Выполняет генератор этапов до конца и возвращает его результат."""
+    return StagedRun(steps).run()
@@ -0,0 +1,212 @@
+"""
+Граф соседства провинций.
+
+Граф хранится в формате CSR: соседи провинции p - indices[indptr[p]:
+indptr[p + 1]] (по возрастанию id), а lengths в тех же позициях - длина
+общей границы (число общих ребер клеток). Граф строится одним проходом по
+сетке меток (см. grid_kernels.province_contacts) и обновляется по мере
+изменения границ: длины существующих ребер меняются на месте, новые ребра
+копятся в словаре и вливаются в CSR при уплотнении.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .grid_kernels import province_contacts
+
+# Уплотнение запускается, когда отложенных и обнулившихся ребер больше
+# четверти ребер CSR (но не меньше этого числа)
+COMPACT_MIN_EDITS = 64
+
+class ProvinceGraph:
+    """Взвешенный граф соседства провинций в формате CSR."""
+    
+    def __init__(self, count: int = 0):
+        """
+        Args:
+            count: Количество провинций (id 0..count - 1) в пустом графе
+        """
+        self.indptr = np.zeros(count + 1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.lengths = np.zeros(0, dtype=np.int32)
+        # Ребра, которых нет в CSR: (меньший id, больший id) -> длина границы
+        self._pending: Dict[Tuple[int, int], int] = {}
+        # Ребра CSR с нулевой длиной (удаляются при уплотнении)
+        self._stale = 0
+    
+    @classmethod
+    def from_labels(cls, labels: np.ndarray, count: Optional[int] = None) -> 'ProvinceGraph':
+        """
+        Строит граф по сетке меток одним векторизованным проходом.
+        
+        Args:
+            labels: Сетка меток (отрицательные - клетки вне провинций)
+            count: Количество провинций; по умолчанию - наибольшая метка + 1
+        
+        Returns:
+            ProvinceGraph: Граф соседства
+        """
+        if count is None:
+            count = int(labels.max()) + 1 if labels.size else 0
+        pairs, lengths = province_contacts(labels)
+        return cls.from_contacts(pairs, lengths, count)
+    
+    @classmethod
+    def from_contacts(
+        cls,
+        pairs: np.ndarray,
+        lengths: np.ndarray,
+        count: int
+    ) -> 'ProvinceGraph':
+        """
+        Строит граф по уникальным парам соседних провинций.
+        
+        Args:
+            pairs: Массив (n, 2) пар (меньший id, больший id)
+            lengths: Длины общих границ пар
+            count: Количество провинций
+        
+        Returns:
+            ProvinceGraph: Граф соседства
+        """
+        graph = cls(count)
+        rows = np.concatenate([pairs[:, 0], pairs[:, 1]]).astype(np.int64)
+        cols = np.concatenate([pairs[:, 1], pairs[:, 0]])
+        weights = np.concatenate([lengths, lengths])
+        order = np.lexsort((cols, rows))
+        graph.indices = cols[order].astype(np.int32)
+        graph.lengths = weights[order].astype(np.int32)
+        graph.indptr[1:] = np.cumsum(np.bincount(rows, minlength=count))
+        return graph
+    
+    @property
+    def count(self) -> int:
+        """Количество провинций в CSR (id за его пределами - в отложенных ребрах)."""
+        return self.indptr.size - 1
+    
+    def neighbors(self, province_id: int) -> List[int]:
+        """Возвращает соседей провинции по возрастанию id."""
+        result = []
+        if 0 <= province_id < self.count:
+            start, end = self.indptr[province_id], self.indptr[province_id + 1]
+            result = self.indices[start:end][self.lengths[start:end] > 0].tolist()
+        if self._pending:
+            result.extend(
+                second if first == province_id else first
+                for first, second in self._pending
+                if province_id in (first, second)
+            )
+            result.sort()
+        return result
+    
+    def border_length(self, first: int, second: int) -> int:
+        """Возвращает длину общей границы двух провинций (0 - не соседи)."""
+        position = self._position(first, second)
+        if position is not None:
+            return int(self.lengths[position])
+        return self._pending.get(_edge(first, second), 0)
+    
+    def add_contact(self, first: int, second: int, delta: int) -> int:
+        """
+        Меняет длину общей границы двух провинций.
+        
+        Args:
+            first: id первой провинции
+            second: id второй провинции
+            delta: Изменение длины (число общих ребер клеток)
+        
+        Returns:
+            int: Новая длина границы
+        """
+        forward = self._position(first, second)
+        if forward is not None:
+            backward = self._position(second, first)
+            length = int(self.lengths[forward]) + delta
+            self.lengths[forward] = self.lengths[backward] = length
+            if not length:
+                self._stale += 1
+            elif length == delta:
+                self._stale -= 1
+        else:
+            edge = _edge(first, second)
+            length = self._pending.get(edge, 0) + delta
+            if length:
+                self._pending[edge] = length
+            else:
+                self._pending.pop(edge, None)
+        
+        if len(self._pending) + self._stale > max(COMPACT_MIN_EDITS, self.indices.size // 4):
+            self.compact()
+        return length
+    
+    def remove_province(self, province_id: int) -> List[int]:
+        """
+        Удаляет все ребра провинции.
+        
+        Returns:
+            List[int]: Бывшие соседи провинции
+        """
+        neighbors = self.neighbors(province_id)
+        for neighbor in neighbors:
+            self.add_contact(province_id, neighbor, -self.border_length(province_id, neighbor))
+        return neighbors
+    
+    def compact(self, count: int = 0) -> None:
+        """
+        Вливает отложенные ребра в CSR и удаляет ребра нулевой длины.
+        
+        Args:
+            count: Наименьшее количество провинций (строк CSR)
+        """
+        pairs, lengths = self.edges()
+        count = max(count, self.count)
+        if pairs.size:
+            count = max(count, int(pairs.max()) + 1)
+        compacted = self.from_contacts(pairs, lengths, count)
+        self.indptr, self.indices, self.lengths = compacted.indptr, compacted.indices, compacted.lengths
+        self._pending = {}
+        self._stale = 0
+    
+    def csr(self, count: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Возвращает уплотненные массивы (indptr, indices, lengths).
+        
+        Args:
+            count: Наименьшее количество провинций (строк CSR)
+        """
+        if self._pending or self._stale or count > self.count:
+            self.compact(count)
+        return self.indptr, self.indices, self.lengths
+    
+    def edges(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Возвращает все ребра графа.
+        
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Массив (n, 2) пар (меньший id,
+                больший id) по возрастанию и длины их общих границ
+        """
+        rows = np.repeat(np.arange(self.count, dtype=np.int32), np.diff(self.indptr))
+        keep = (rows < self.indices) & (self.lengths > 0)
+        pairs = np.stack([rows[keep], self.indices[keep]], axis=1)
+        lengths = self.lengths[keep]
+        if self._pending:
+            pairs = np.concatenate([pairs, np.array(list(self._pending), dtype=np.int32)])
+            lengths = np.concatenate([lengths, np.array(list(self._pending.values()), dtype=np.int32)])
+            order = np.lexsort((pairs[:, 1], pairs[:, 0]))
+            pairs, lengths = pairs[order], lengths[order]
+        return pairs, lengths
+    
+    def _position(self, first: int, second: int) -> Optional[int]:
+        """Позиция ребра first -> second в CSR или None."""
+        if not 0 <= first < self.count:
+            return None
+        start, end = self.indptr[first:first + 2].tolist()
+        position = start + int(self.indices[start:end].searchsorted(second))
+        if position < end and self.indices[position] == second:
+            return position
+        return None
+
+def _edge(first: int, second: int) -> Tuple[int, int]:
+    """Ключ ребра: пара id по возрастанию."""
+    return (first, second) if first < second else (second, first)
@@ -0,0 +1,210 @@
+"""
+Структуры данных для поочередного роста провинций.
+
+Оценки клеток хранятся в очередях с приоритетом с ленивым удалением:
+устаревшие записи не удаляются из кучи, а пропускаются при извлечении.
+После изменения провинции пересчитываются только оценки затронутых
+клеток, а не всех свободных клеток карты.
+"""
+import heapq
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Соседи клетки (окрестность фон Неймана)
+DIRECTIONS = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+# Вес количества свободных соседей в оценке стартовой точки
+START_NEIGHBOR_WEIGHT = 2
+
+class StartPointQueue:
+    """
+    Очередь стартовых точек новых провинций.
+    
+    Оценка клетки - количество свободных соседей, умноженное на
+    START_NEIGHBOR_WEIGHT, минус расстояние до центра суши. Лучшая
+    клетка находится за O(log n).
+    """
+    
+    def __init__(self, available: np.ndarray, center: Tuple[float, float]):
+        """
+        Args:
+            available: Маска свободных клеток формы (height, width)
+            center: Центр суши (x, y)
+        """
+        self.available = np.array(available, dtype=bool)
+        height, width = self.available.shape
+        
+        cx, cy = center
+        xs = np.arange(width, dtype=np.float64) - cx
+        ys = np.arange(height, dtype=np.float64) - cy
+        distance = np.sqrt(xs[np.newaxis, :] ** 2 + ys[:, np.newaxis] ** 2)
+        
+        padded = np.pad(self.available, 1)
+        neighbors = (
+            padded[:-2, 1:-1].astype(np.int64) + padded[2:, 1:-1] +
+            padded[1:-1, :-2] + padded[1:-1, 2:]
+        )
+        self.scores = neighbors * START_NEIGHBOR_WEIGHT - distance
+        
+        ys, xs = np.nonzero(self.available)
+        self._heap: List[Tuple[float, int, int]] = list(zip(
+            (-self.scores[ys, xs]).tolist(), ys.tolist(), xs.tolist()
+        ))
+        heapq.heapify(self._heap)
+    
+    def __len__(self) -> int:
+        """Количество свободных клеток."""
+        return int(self.available.sum())
+    
+    def peek(self) -> Optional[Tuple[int, int]]:
+        """
+        Возвращает лучшую свободную клетку, не удаляя ее.
+        
+        Returns:
+            Optional[Tuple[int, int]]: Клетка (x, y) или None, если
+                свободных клеток нет
+        """
+        heap = self._heap
+        while heap:
+            score, y, x = heap[0]
+            if self.available[y, x] and -score == self.scores[y, x]:
+                return x, y
+            heapq.heappop(heap)
+        return None
+    
+    def remove(self, cells: Iterable[Tuple[int, int]]) -> None:
+        """
+        Помечает клетки занятыми и обновляет оценки их соседей.
+        
+        Args:
+            cells: Клетки (x, y), назначенные провинции
+        """
+        height, width = self.available.shape
+        for x, y in cells:
+            if not self.available[y, x]:
+                continue
+            self.available[y, x] = False
+            
+            for dx, dy in DIRECTIONS:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < width and 0 <= ny < height and self.available[ny, nx]:
+                    self.scores[ny, nx] -= START_NEIGHBOR_WEIGHT
+                    heapq.heappush(self._heap, (-float(self.scores[ny, nx]), ny, nx))
+
+class ProvinceGrower:
+    """
+    Выращивает одну провинцию из стартовой клетки.
+    
+    На каждом шаге добавляется клетка-кандидат с наибольшей оценкой
+    `соседи - расстояние * 0.5`, где соседи - количество ее соседей в
+    провинции, а расстояние - до центроида провинции. Центроид хранится
+    накопленными суммами, кандидаты - в куче с ленивой инвалидацией.
+    
+    Сдвиг центроида меняет оценки всех кандидатов, поэтому ключ записи -
+    верхняя граница оценки: при сдвиге центроида на d расстояние до него
+    меняется не больше чем на d. Накопленный сдвиг `drift` общий для всех
+    записей, поэтому в куче хранится `оценка - drift * 0.5` на момент
+    оценки. Запись, посчитанная при текущем drift, точна и не меньше
+    границ остальных записей; устаревшая запись пересчитывается.
+    """
+    
+    def __init__(
+        self,
+        start: Tuple[int, int],
+        available: Set[Tuple[int, int]]
+    ):
+        """
+        Args:
+            start: Стартовая клетка (x, y)
+            available: Клетки, в которые провинция может расти
+        """
+        self.available = available
+        self.cells: Set[Tuple[int, int]] = set()
+        self.order: List[Tuple[int, int]] = []
+        self.sum_x = 0
+        self.sum_y = 0
+        self.drift = 0.0
+        
+        # Куча записей (-ключ, drift оценки, версия, клетка); устаревшие
+        # версии клеток пропускаются при извлечении
+        self._heap: List[Tuple[float, float, int, Tuple[int, int]]] = []
+        self._version: Dict[Tuple[int, int], int] = {}
+        self._neighbors: Dict[Tuple[int, int], int] = {}
+        
+        self.add(start)
+    
+    @property
+    def centroid(self) -> Tuple[float, float]:
+        """Центроид провинции."""
+        count = len(self.cells)
+        return self.sum_x / count, self.sum_y / count
+    
+    def score(self, cell: Tuple[int, int]) -> float:
+        """Оценка клетки-кандидата при текущем центроиде."""
+        cx, cy = self.centroid
+        distance = ((cell[0] - cx) ** 2 + (cell[1] - cy) ** 2) ** 0.5
+        return self._neighbors[cell] - distance * 0.5
+    
+    def add(self, cell: Tuple[int, int]) -> None:
+        """Добавляет клетку в провинцию и обновляет кандидатов."""
+        old_centroid = self.centroid if self.cells else None
+        
+        self.cells.add(cell)
+        self.order.append(cell)
+        self.sum_x += cell[0]
+        self.sum_y += cell[1]
+        self._neighbors.pop(cell, None)
+        
+        if old_centroid is not None:
+            cx, cy = self.centroid
+            self.drift += ((cx - old_centroid[0]) ** 2 + (cy - old_centroid[1]) ** 2) ** 0.5
+        
+        # У соседей новой клетки выросло число соседей в провинции
+        x, y = cell
+        for dx, dy in DIRECTIONS:
+            neighbor = (x + dx, y + dy)
+            if neighbor in self.available and neighbor not in self.cells:
+                self._neighbors[neighbor] = self._neighbors.get(neighbor, 0) + 1
+                self._push(neighbor)
+    
+    def pop_best(self) -> Optional[Tuple[int, int]]:
+        """
+        Извлекает кандидата с наибольшей оценкой.
+        
+        Клетка удаляется из очереди, но не добавляется в провинцию.
+        
+        Returns:
+            Optional[Tuple[int, int]]: Клетка (x, y) или None, если
+                кандидатов нет
+        """
+        heap = self._heap
+        while heap:
+            _, drift, version, cell = heapq.heappop(heap)
+            if cell in self.cells or version != self._version[cell]:
+                continue
+            if drift == self.drift:
+                return cell
+            self._push(cell)
+        return None
+    
+    def grow(self, target_size: int) -> List[Tuple[int, int]]:
+        """
+        Выращивает провинцию до целевого размера.
+        
+        Returns:
+            List[Tuple[int, int]]: Клетки в порядке роста (каждая клетка
+                прилегает к одной из предыдущих)
+        """
+        while len(self.cells) < target_size:
+            cell = self.pop_best()
+            if cell is None:
+                break
+            self.add(cell)
+        return self.order
+    
+    def _push(self, cell: Tuple[int, int]) -> None:
+        """Добавляет в кучу свежую запись кандидата."""
+        version = self._version.get(cell, 0) + 1
+        self._version[cell] = version
+        key = self.score(cell) - self.drift * 0.5
+        heapq.heappush(self._heap, (-key, self.drift, version, cell))
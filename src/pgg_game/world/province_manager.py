@@ -1,7 +1,27 @@
 """Менеджер провинций."""
-from typing import Dict, Set, Tuple, Optional
+from typing import Dict, Iterable, List, Set, Tuple, Optional
 from dataclasses import dataclass
-from collections import deque
+
+import numpy as np
+
+from ..components.province import Province, cell_keys
+from .connectivity import disconnected_labels, label_components
+from .grid_kernels import FREE, PLUS_NEIGHBORS, addable_mask
+from .pipeline import STEP_CELLS, Steps, run_steps
+from .province_graph import ProvinceGraph
+from .seeding import make_rng, random_seed
+
+# Передача не больше стольких клеток обновляет провинции по одной клетке
+# (с пошаговым обновлением границ), больше - одной операцией над ключами
+INCREMENTAL_TRANSFER_CELLS = 16
+
+# Порция load_labels_steps создает провинции, пока их не больше стольких
+# и пока в них не больше LOAD_CELLS_PER_STEP клеток
+LOAD_PROVINCES_PER_STEP = 16
+LOAD_CELLS_PER_STEP = STEP_CELLS // 2
+
+# Восемь соседей клетки по кругу; на четных местах - соседи по стороне
+RING_OFFSETS = [(0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1)]
 
 @dataclass
 class ProvinceConfig:
@@ -10,24 +30,88 @@ class ProvinceConfig:
     max_size: int = 8
     min_provinces: int = 5
     max_provinces: int = 7
+    
+    def update(self, **values: int) -> None:
+        """Обновляет параметры конфигурации."""
+        for name, value in values.items():
+            if not hasattr(self, name):
+                raise AttributeError(f"Неизвестный параметр провинций: {name}")
+            setattr(self, name, value)
 
 class ProvinceManager:
     """Класс для управления провинциями."""
     
-    def __init__(self):
-        """Инициализация менеджера."""
-        self.provinces: Dict[int, Set[Tuple[int, int]]] = {}  # id -> клетки
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        shape: Tuple[int, int] = (0, 0)
+    ):
+        """
+        Инициализация менеджера.
+        
+        Args:
+            seed: Сид карты; цвета провинций выводятся из него
+            shape: Размер карты (height, width); сетка меток расширяется,
+                если клетка оказывается за ее краем
+        """
+        self.seed = random_seed() if seed is None else seed
+        self.provinces: Dict[int, Province] = {}  # id -> провинция
         self.next_id: int = 0
         self.config = ProvinceConfig()
-        self.cell_to_province: Dict[Tuple[int, int], int] = {}  # клетка -> id провинции
+        # Сетка меток: id провинции клетки или FREE. Единственный источник
+        # принадлежности клеток; по ней проверяются соседство и плюсовые
+        # пересечения, а провинции хранят только отсортированные ключи клеток
+        self.labels = np.full(shape, FREE, dtype=np.int32)
+        # Словарь клетка -> id провинции для старого кода (см. cell_to_province)
+        self._cell_to_province: Optional[Dict[Tuple[int, int], int]] = None
+        # Граф соседства провинций с длинами общих границ; neighbors
+        # провинций - его копия в виде множеств
+        self.graph = ProvinceGraph()
+    
+    @property
+    def cell_to_province(self) -> Dict[Tuple[int, int], int]:
+        """
+        Словарь клетка -> id провинции (совместимость со старым кодом).
+        
+        Строится по сетке меток при первом обращении и сбрасывается при
+        изменении провинций; для поиска по клетке используйте province_at.
+        """
+        if self._cell_to_province is None:
+            ys, xs = np.nonzero(self.labels != FREE)
+            owners = self.labels[ys, xs]
+            self._cell_to_province = dict(zip(zip(xs.tolist(), ys.tolist()), owners.tolist()))
+        return self._cell_to_province
+    
+    def province_at(self, cell: Tuple[int, int]) -> Optional[int]:
+        """Возвращает id провинции клетки или None."""
+        x, y = cell
+        height, width = self.labels.shape
+        if not (0 <= x < width and 0 <= y < height):
+            return None
+        label = int(self.labels[y, x])
+        return None if label == FREE else label
     
     def create_province(self) -> int:
         """Создает новую провинцию."""
         province_id = self.next_id
         self.next_id += 1
-        self.provinces[province_id] = set()
+        self.provinces[province_id] = Province(
+            province_id, 0, 0,
+            rng=make_rng(self.seed, 'province', province_id)
+        )
         return province_id
     
+    def remove_province(self, province_id: int) -> None:
+        """Удаляет провинцию и освобождает ее клетки."""
+        province = self.provinces.pop(province_id, None)
+        if province is None:
+            return
+        xs, ys = province.cell_arrays()
+        self.labels[ys, xs] = FREE
+        self._cell_to_province = None
+        for neighbor_id in self.graph.remove_province(province_id):
+            self.provinces[neighbor_id].neighbors.discard(province_id)
+    
     def add_cell_to_province(self, province_id: int, cell: Tuple[int, int]) -> bool:
         """
         Добавляет клетку в провинцию.
@@ -41,55 +125,409 @@ class ProvinceManager:
         """
         if province_id not in self.provinces:
             return False
-            
-        if cell in self.cell_to_province:
+        
+        x, y = cell
+        if x < 0 or y < 0:
+            return False
+        self._ensure_cell(cell)
+        
+        if self.labels[y, x] != FREE:
             return False
             
         province = self.provinces[province_id]
         
         # Проверяем размер
-        if len(province) >= self.config.max_size:
+        if province.size >= self.config.max_size:
             return False
             
         # Проверяем связность
-        if province and not self._is_adjacent(cell, province):
+        if province.size and not self._is_adjacent(cell, province_id):
             return False
             
         # Проверяем плюсовые пересечения
-        if not self._check_plus_intersection(cell, province):
+        if not self._check_plus_intersection(cell):
             return False
+        
+        # Первая клетка провинции становится ее центром
+        if not province.size:
+            province.center_x, province.center_y = cell
             
-        province.add(cell)
-        self.cell_to_province[cell] = province_id
+        province.add_cell(cell)
+        self.labels[y, x] = province_id
+        self._cell_to_province = None
+        self._update_contacts(cell, FREE, province_id)
         return True
     
-    def get_provinces(self) -> Dict[int, Set[Tuple[int, int]]]:
+    def addable_cells(
+        self,
+        province_id: int,
+        cells: Optional[Iterable[Tuple[int, int]]] = None
+    ) -> np.ndarray:
+        """
+        Проверяет партию клеток по ограничениям add_cell_to_province.
+        
+        Каждая клетка проверяется так, будто добавляется первой из
+        партии: свободна, прилегает к провинции и не образует плюсового
+        пересечения. Размер провинции не учитывается.
+        
+        Args:
+            province_id: ID провинции
+            cells: Клетки (x, y); по умолчанию - вся сетка
+        
+        Returns:
+            np.ndarray: Булева маска сетки или флаги клеток в порядке cells
+        """
+        province = self.provinces.get(province_id)
+        if province is None:
+            mask = np.zeros(self.labels.shape, dtype=bool)
+        else:
+            mask = addable_mask(self.labels, province_id, empty=not province.size)
+        if cells is None:
+            return mask
+        
+        points = np.array(list(cells), dtype=np.intp).reshape(-1, 2)
+        xs, ys = points[:, 0], points[:, 1]
+        height, width = mask.shape
+        inside = (xs >= 0) & (ys >= 0) & (xs < width) & (ys < height)
+        result = np.zeros(len(points), dtype=bool)
+        result[inside] = mask[ys[inside], xs[inside]]
+        # Клетки за краем сетки свободны; подходят они только для пустой
+        # провинции, так как соседей у них в сетке нет
+        if province is not None and not province.size:
+            result[~inside & (xs >= 0) & (ys >= 0)] = True
+        return result
+    
+    def load_labels(self, labels: np.ndarray) -> None:
+        """
+        Создает провинции по сетке меток.
+        
+        Центром провинции становится ее клетка, ближайшая к центроиду.
+        
+        Args:
+            labels: Сетка меток формы (height, width); отрицательные
+                метки - клетки вне провинций
+        """
+        run_steps(self.load_labels_steps(labels))
+    
+    def load_labels_steps(self, labels: np.ndarray, stage: str = '') -> Steps[None]:
+        """
+        Создает провинции по сетке меток порциями этапа stage (см. load_labels).
+        
+        Порция ограничена LOAD_PROVINCES_PER_STEP провинциями и
+        LOAD_CELLS_PER_STEP клетками (провинция не делится).
+        """
+        ys, xs = np.nonzero(labels >= 0)
+        owners = labels[ys, xs]
+        if self.labels.shape != labels.shape:
+            self.labels = np.full(labels.shape, FREE, dtype=np.int32)
+        yield stage
+        order = np.argsort(owners, kind='stable')
+        ys, xs, owners = ys[order], xs[order], owners[order]
+        bounds = np.flatnonzero(np.diff(owners)) + 1
+        yield stage
+        
+        provinces = cells = 0
+        for group_xs, group_ys in zip(np.split(xs, bounds), np.split(ys, bounds)):
+            if provinces >= LOAD_PROVINCES_PER_STEP or cells >= LOAD_CELLS_PER_STEP:
+                yield stage
+                provinces = cells = 0
+            provinces += 1
+            cells += group_xs.size
+            province_id = self.create_province()
+            province = self.provinces[province_id]
+            
+            province.center_x, province.center_y = _centroid_cell(group_xs, group_ys)
+            
+            province.set_keys(cell_keys(group_xs, group_ys))
+            self.labels[group_ys, group_xs] = province_id
+        self._cell_to_province = None
+        yield stage
+        self.graph = ProvinceGraph.from_labels(self.labels, self.next_id)
+        yield stage
+        self._link_neighbors()
+    
+    def transfer_cells(
+        self,
+        source_id: int,
+        target_id: int,
+        cells: Iterable[Tuple[int, int]]
+    ) -> List[int]:
+        """
+        Передает клетки из одной провинции в другую (завоевание, уступка).
+        
+        Связность исходной провинции проверяется локально: клетку можно
+        убрать, если ее оставшиеся соседи связаны внутри окрестности 3x3.
+        Полная проверка (split_if_disconnected) нужна, только если
+        локальная не прошла. Ограничения размера и плюсовых пересечений
+        здесь не действуют. Исходная провинция, отдавшая все клетки,
+        удаляется.
+        
+        Args:
+            source_id: ID провинции, теряющей клетки
+            target_id: ID провинции, получающей клетки
+            cells: Клетки исходной провинции; каждая должна быть связана с
+                целевой провинцией через другие передаваемые клетки
+        
+        Returns:
+            List[int]: id провинций, отделившихся от исходной (пусто, если
+                она осталась связной)
+        
+        Raises:
+            ValueError: Провинции не существуют, клетки не принадлежат
+                исходной провинции или не примыкают к целевой
+        """
+        cells = list(dict.fromkeys(cells))
+        if source_id not in self.provinces or target_id not in self.provinces:
+            raise ValueError("Неизвестная провинция")
+        if source_id == target_id or not cells:
+            return []
+        if any(self.province_at(cell) != source_id for cell in cells):
+            raise ValueError(f"Клетки не принадлежат провинции {source_id}")
+        source = self.provinces[source_id]
+        target = self.provinces[target_id]
+        target_empty = not target.size
+        if not self._joins_province(cells, target_id, empty=target_empty):
+            raise ValueError(f"Клетки не примыкают к провинции {target_id}")
+        
+        may_split = False
+        for cell in cells:
+            may_split = may_split or not self._is_simple_cell(cell, source_id)
+            self.labels[cell[1], cell[0]] = target_id
+            self._update_contacts(cell, source_id, target_id)
+        if len(cells) <= INCREMENTAL_TRANSFER_CELLS:
+            for cell in cells:
+                source.remove_cell(cell)
+                target.add_cell(cell)
+        else:
+            source.remove_cells(cells)
+            target.add_cells(cells)
+        self._cell_to_province = None
+        
+        if target_empty:
+            target.center_x, target.center_y = cells[0]
+        if not source.size:
+            self.remove_province(source_id)
+            return []
+        if not source.contains((source.center_x, source.center_y)):
+            source.center_x, source.center_y = _centroid_cell(*source.cell_arrays())
+        if may_split:
+            return self.split_if_disconnected(source_id)
+        return []
+    
+    def split_if_disconnected(self, province_id: int) -> List[int]:
+        """
+        Разделяет провинцию на связные части.
+        
+        Наибольшая часть (при равенстве - первая в построчном порядке)
+        остается провинцией, остальные становятся новыми провинциями.
+        
+        Args:
+            province_id: ID провинции
+        
+        Returns:
+            List[int]: id новых провинций (пусто, если провинция связна)
+        """
+        province = self.provinces.get(province_id)
+        if province is None or not province.size:
+            return []
+        
+        xs, ys = province.cell_arrays()
+        min_x, min_y = int(xs.min()), int(ys.min())
+        mask = np.zeros((int(ys.max()) - min_y + 1, int(xs.max()) - min_x + 1), dtype=bool)
+        mask[ys - min_y, xs - min_x] = True
+        components, count = label_components(mask)
+        if count == 1:
+            return []
+        
+        parts = components[ys - min_y, xs - min_x]
+        sizes = np.bincount(parts, minlength=count + 1)
+        sizes[0] = -1
+        kept = int(np.argmax(sizes))
+        created = []
+        for part in range(1, count + 1):
+            if part == kept:
+                continue
+            part_xs, part_ys = xs[parts == part], ys[parts == part]
+            part_cells = list(zip(part_xs.tolist(), part_ys.tolist()))
+            new_id = self.create_province()
+            piece = self.provinces[new_id]
+            for cell in part_cells:
+                self.labels[cell[1], cell[0]] = new_id
+                self._update_contacts(cell, province_id, new_id)
+            piece.set_keys(cell_keys(part_xs, part_ys))
+            piece.center_x, piece.center_y = _centroid_cell(part_xs, part_ys)
+            province.remove_cells(part_cells)
+            created.append(new_id)
+        
+        self._cell_to_province = None
+        if not province.contains((province.center_x, province.center_y)):
+            province.center_x, province.center_y = _centroid_cell(*province.cell_arrays())
+        return created
+    
+    def get_labels(self, shape: Tuple[int, int]) -> np.ndarray:
+        """
+        Строит сетку меток провинций (обратная операция к load_labels).
+        
+        Args:
+            shape: Форма сетки (height, width)
+        
+        Returns:
+            np.ndarray: Сетка int32 с id провинций, -1 - клетки вне провинций
+        """
+        labels = np.full(shape, FREE, dtype=np.int32)
+        height = min(shape[0], self.labels.shape[0])
+        width = min(shape[1], self.labels.shape[1])
+        labels[:height, :width] = self.labels[:height, :width]
+        return labels
+    
+    def build_graph(self) -> ProvinceGraph:
+        """
+        Строит граф соседства провинций одним проходом по сетке меток.
+        
+        Returns:
+            ProvinceGraph: Граф (также доступен как self.graph)
+        """
+        self.graph = ProvinceGraph.from_labels(self.labels, self.next_id)
+        self._link_neighbors()
+        return self.graph
+    
+    def _link_neighbors(self) -> None:
+        """Заполняет соседей провинций по ребрам графа self.graph."""
+        for province in self.provinces.values():
+            province.neighbors.clear()
+        for first, second in self.graph.edges()[0].tolist():
+            self.provinces[first].neighbors.add(second)
+            self.provinces[second].neighbors.add(first)
+    
+    def adjacency(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Возвращает граф соседства в формате CSR.
+        
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: indptr, indices
+                (соседи провинции p - indices[indptr[p]:indptr[p + 1]]) и
+                lengths (длины общих границ в тех же позициях)
+        """
+        return self.graph.csr(self.next_id)
+    
+    def border_length(self, first: int, second: int) -> int:
+        """Возвращает длину общей границы двух провинций (0 - не соседи)."""
+        return self.graph.border_length(first, second)
+    
+    def get_provinces(self) -> Dict[int, Province]:
         """Возвращает все провинции."""
         return self.provinces
     
-    def _is_adjacent(self, cell: Tuple[int, int], 
-                    province: Set[Tuple[int, int]]) -> bool:
-        """Проверяет, прилегает ли клетка к провинции."""
+    def get_ideal_province_size(self) -> int:
+        """Возвращает целевой размер новой провинции."""
+        return (self.config.min_size + self.config.max_size) // 2
+    
+    def _neighbor_labels(self, cell: Tuple[int, int]) -> List[int]:
+        """Метки четырех соседей клетки (за краем сетки - FREE)."""
         x, y = cell
-        for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-            if (x + dx, y + dy) in province:
-                return True
-        return False
+        height, width = self.labels.shape
+        return [
+            int(self.labels[ny, nx]) if 0 <= nx < width and 0 <= ny < height else FREE
+            for nx, ny in ((x, y + 1), (x + 1, y), (x, y - 1), (x - 1, y))
+        ]
+    
+    def _is_adjacent(self, cell: Tuple[int, int], province_id: int) -> bool:
+        """Проверяет, прилегает ли клетка к провинции."""
+        return province_id in self._neighbor_labels(cell)
     
-    def _check_plus_intersection(self, cell: Tuple[int, int], 
-                               province: Set[Tuple[int, int]]) -> bool:
+    def _check_plus_intersection(self, cell: Tuple[int, int]) -> bool:
         """
         Проверяет, не образует ли добавление клетки плюсовое пересечение.
+        
+        То же условие, что и occupied_neighbor_count(labels) < PLUS_NEIGHBORS
+        в grid_kernels, но только для одной клетки.
+        """
+        occupied = sum(1 for label in self._neighbor_labels(cell) if label != FREE)
+        return occupied < PLUS_NEIGHBORS
+    
+    def _is_simple_cell(self, cell: Tuple[int, int], province_id: int) -> bool:
+        """
+        Проверяет, что удаление клетки не разрывает провинцию локально.
+        
+        Клетки провинции в кольце из восьми соседей разбиваются на дуги;
+        если соседи по стороне лежат не более чем на одной дуге, любой путь
+        через клетку можно обойти по кольцу. Иначе провинция может
+        распасться, и нужна полная проверка.
         """
         x, y = cell
-        directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+        height, width = self.labels.shape
+        ring = [
+            0 <= nx < width and 0 <= ny < height and self.labels[ny, nx] == province_id
+            for nx, ny in ((x + dx, y + dy) for dx, dy in RING_OFFSETS)
+        ]
+        arcs = 0
+        for index in range(0, 8, 2):
+            # Сосед по стороне начинает дугу, если предыдущие клетки кольца
+            # (угол и сосед по стороне перед ним) не в провинции
+            if ring[index] and not (ring[index - 1] and ring[index - 2]):
+                arcs += 1
+        return arcs <= 1
+    
+    def _joins_province(self, cells: List[Tuple[int, int]], province_id: int, empty: bool) -> bool:
+        """Проверяет, что каждая связная группа клеток примыкает к провинции."""
+        adjacent = [self._is_adjacent(cell, province_id) for cell in cells]
+        if all(adjacent) and not empty:
+            return True
+        
+        points = np.array(cells, dtype=np.intp)
+        origin = points.min(axis=0)
+        local = points - origin
+        mask = np.zeros(tuple(local.max(axis=0)[::-1] + 1), dtype=bool)
+        mask[local[:, 1], local[:, 0]] = True
+        components, count = label_components(mask)
+        if empty:
+            return count == 1
         
-        # Проверяем количество занятых направлений
-        occupied = sum(1 for dx, dy in directions 
-                      if (x + dx, y + dy) in province or
-                         (x + dx, y + dy) in self.cell_to_province)
-                         
-        return occupied < 4  # Плюсовое пересечение = 4 соседа
+        groups = components[local[:, 1], local[:, 0]]
+        return np.unique(groups[adjacent]).size == count
+    
+    def _update_contacts(self, cell: Tuple[int, int], old_id: int, new_id: int) -> None:
+        """
+        Обновляет граф соседства после смены метки клетки.
+        
+        Меняются только ребра клетки с ее четырьмя соседями.
+        
+        Args:
+            cell: Клетка, метка которой уже записана в сетку
+            old_id: Прежняя метка клетки (FREE - клетка была свободна)
+            new_id: Новая метка клетки (FREE - клетка освобождена)
+        """
+        # Изменения длин границ, сложенные по парам провинций
+        changes: Dict[Tuple[int, int], int] = {}
+        for label in self._neighbor_labels(cell):
+            if label == FREE:
+                continue
+            if old_id != FREE and label != old_id:
+                pair = (min(old_id, label), max(old_id, label))
+                changes[pair] = changes.get(pair, 0) - 1
+            if new_id != FREE and label != new_id:
+                pair = (min(new_id, label), max(new_id, label))
+                changes[pair] = changes.get(pair, 0) + 1
+        
+        for (first, second), delta in changes.items():
+            if not delta:
+                continue
+            if self.graph.add_contact(first, second, delta):
+                self.provinces[first].neighbors.add(second)
+                self.provinces[second].neighbors.add(first)
+            else:
+                self.provinces[first].neighbors.discard(second)
+                self.provinces[second].neighbors.discard(first)
+    
+    def _ensure_cell(self, cell: Tuple[int, int]) -> None:
+        """Расширяет сетку меток так, чтобы клетка оказалась внутри."""
+        x, y = cell
+        height, width = self.labels.shape
+        if x < width and y < height:
+            return
+        grown = np.full((max(height, y + 1), max(width, x + 1)), FREE, dtype=np.int32)
+        grown[:height, :width] = self.labels
+        self.labels = grown
     
     def verify_province(self, province_id: int) -> bool:
         """Проверяет корректность провинции."""
@@ -99,30 +537,38 @@ class ProvinceManager:
         province = self.provinces[province_id]
         
         # Проверка размера
-        if not (self.config.min_size <= len(province) <= self.config.max_size):
+        if not (self.config.min_size <= province.size <= self.config.max_size):
             return False
             
         # Проверка связности
-        if not self._verify_connectivity(province):
+        if not self._verify_connectivity(*province.cell_arrays()):
             return False
             
         return True
     
-    def _verify_connectivity(self, cells: Set[Tuple[int, int]]) -> bool:
-        """Проверяет связность клеток."""
-        if not cells:
+    def disconnected_provinces(self) -> List[int]:
+        """
+        Находит все несвязные провинции за один проход по сетке меток.
+        
+        Returns:
+            List[int]: id провинций, клетки которых не 4-связны
+        """
+        return disconnected_labels(self.labels).tolist()
+    
+    def _verify_connectivity(self, xs: np.ndarray, ys: np.ndarray) -> bool:
+        """Проверяет связность клеток с координатами xs, ys."""
+        if not xs.size:
             return True
-            
-        start = next(iter(cells))
-        visited = {start}
-        queue = deque([start])
-        
-        while queue:
-            x, y = queue.popleft()
-            for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-                neighbor = (x + dx, y + dy)
-                if neighbor in cells and neighbor not in visited:
-                    visited.add(neighbor)
-                    queue.append(neighbor)
-                    
-        return len(visited) == len(cells)
\ No newline at end of file
+        
+        # Маска клеток в их ограничивающем прямоугольнике
+        xs = xs - xs.min()
+        ys = ys - ys.min()
+        mask = np.zeros((int(ys.max()) + 1, int(xs.max()) + 1), dtype=bool)
+        mask[ys, xs] = True
+        return label_components(mask)[1] == 1
+
+def _centroid_cell(xs: np.ndarray, ys: np.ndarray) -> Tuple[int, int]:
+    """Клетка, ближайшая к центроиду клеток xs, ys."""
+    distance = (xs - xs.mean()) ** 2 + (ys - ys.mean()) ** 2
+    center = int(np.argmin(distance))
+    return int(xs[center]), int(ys[center])
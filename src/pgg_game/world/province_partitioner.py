@@ -0,0 +1,796 @@
+"""
+Разбиение суши на провинции по сетке меток.
+
+Провинции растут одновременно из набора семян (многоисточниковый BFS)
+раундами: за раунд каждая клетка фронта присоединяется к самой маленькой
+соседней провинции, а каждая провинция принимает не больше клеток, чем
+позволяет ее лимит размера. Семена уточняются релаксацией Ллойда, а
+слишком маленькие провинции и нераспределенные карманы суши исправляются
+несколькими проходами роста. Все шаги - операции над массивами, поэтому
+разбиение масштабируется на тысячи провинций. Разбиение выполняется по
+этапам (см. pipeline): порция - раунд роста, проход релаксации или проход
+исправления.
+"""
+from dataclasses import dataclass
+from enum import Enum
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .connectivity import label_components_steps
+from .pipeline import STEP_CELLS, Steps, chunks, run_steps
+
+# Метка клетки, не принадлежащей ни одной провинции
+NO_PROVINCE = -1
+
+# Количество проходов исправления маленьких провинций и карманов суши
+REPAIR_PASSES = 16
+
+# Сколько колец соседних провинций освобождается вокруг проблемного места
+RELEASE_RINGS = 2
+
+# Число значений второго ключа сортировки (соседей клетки в провинции: 0-4)
+RANK_LEVELS = 5
+
+# Сколько маленьких провинций сливается за порцию этапа
+MERGES_PER_STEP = 64
+
+class PartitionMethod(Enum):
+    """Способ разбиения суши на провинции."""
+    GROWTH = "growth"      # Поочередный рост провинций по множествам клеток
+    BALANCED = "balanced"  # Одновременный рост по сетке меток
+
+@dataclass
+class PartitionResult:
+    """Результат разбиения."""
+    labels: np.ndarray  # Сетка меток int32 (NO_PROVINCE - вне провинций)
+    sizes: np.ndarray   # Количество клеток в каждой провинции
+    
+    @property
+    def province_count(self) -> int:
+        """Количество провинций."""
+        return int(self.sizes.size)
+
+class ProvincePartitioner:
+    """Разбивает маску суши на связные провинции заданного размера."""
+    
+    def __init__(
+        self,
+        min_size: int,
+        max_size: int,
+        rng: np.random.Generator,
+        relaxation_passes: int = 2
+    ):
+        """
+        Args:
+            min_size: Минимальный размер провинции
+            max_size: Максимальный размер провинции
+            rng: Генератор случайных чисел для выбора семян
+            relaxation_passes: Количество проходов релаксации Ллойда
+        """
+        self.min_size = min_size
+        self.max_size = max_size
+        self.rng = rng
+        self.relaxation_passes = relaxation_passes
+    
+    @property
+    def ideal_size(self) -> float:
+        """Целевой размер провинции."""
+        return (self.min_size + self.max_size) / 2
+    
+    def partition(
+        self,
+        land: np.ndarray,
+        province_count: Optional[int] = None,
+        max_count: Optional[int] = None
+    ) -> Optional[PartitionResult]:
+        """
+        Разбивает сушу на провинции (все этапы сразу, см. steps).
+        
+        Args:
+            land: Маска суши формы (height, width)
+            province_count: Желаемое число провинций
+            max_count: Наибольшее число провинций
+        
+        Returns:
+            Optional[PartitionResult]: Разбиение или None
+        """
+        return run_steps(self.steps(land, province_count, max_count))
+    
+    def steps(
+        self,
+        land: np.ndarray,
+        province_count: Optional[int] = None,
+        max_count: Optional[int] = None
+    ) -> Steps[Optional[PartitionResult]]:
+        """
+        Разбивает сушу на провинции по этапам (этап 'partition').
+        
+        Разбиение покрывает всю сушу, каждая провинция 4-связна, размеры
+        лежат в [min_size, max_size], а провинций не больше max_count.
+        Если так разбить сушу не удалось, результат - None.
+        
+        Args:
+            land: Маска суши формы (height, width)
+            province_count: Желаемое число провинций; по умолчанию
+                выводится из среднего размера провинции
+            max_count: Наибольшее число провинций; по умолчанию - сколько
+                провинций min_size помещается на суше
+        
+        Returns:
+            Steps[Optional[PartitionResult]]: Генератор этапов, возвращающий
+                разбиение или None, если суши нет или ее нельзя разбить на
+                провинции допустимого размера
+        """
+        land = np.asarray(land, dtype=bool)
+        total = int(land.sum())
+        if total == 0:
+            return None
+        
+        if max_count is None:
+            max_count = total // self.min_size
+        count = self._province_count(total, province_count)
+        if count is None or count > max_count:
+            return None
+        
+        # Работаем с сеткой с рамкой в одну клетку: у каждой клетки
+        # суши есть все четыре соседа, а индексы соседей - сдвиги.
+        # Маска без рамки дальше не нужна и не держится до конца разбиения
+        grid = _Grid(np.pad(land, 1))
+        del land
+        yield from grid.fill_priority(self.rng)
+        
+        seeds = self.rng.choice(np.flatnonzero(grid.land), size=count, replace=False)
+        labels = grid.seed_labels(seeds)
+        yield 'partition'
+        yield from self._grow(grid, labels, min(-(-total // count), self.max_size))
+        yield from self._grow(grid, labels, self.max_size)
+        
+        for _ in range(self.relaxation_passes):
+            seeds = yield from self._relaxed_seeds(labels, grid.width)
+            labels = grid.seed_labels(seeds)
+            yield 'partition'
+            yield from self._grow(grid, labels, min(-(-total // count), self.max_size))
+            yield from self._grow(grid, labels, self.max_size)
+            yield 'partition'
+        
+        return (yield from self._finish(grid, labels, max_count))
+    
+    def repair(
+        self,
+        land: np.ndarray,
+        labels: np.ndarray,
+        max_count: Optional[int] = None
+    ) -> Optional[PartitionResult]:
+        """
+        Доводит готовое разбиение до гарантий steps (все этапы сразу).
+        
+        Args:
+            land: Маска суши формы (height, width)
+            labels: Сетка меток той же формы (отрицательные - вне провинций)
+            max_count: Наибольшее число провинций
+        
+        Returns:
+            Optional[PartitionResult]: Разбиение или None
+        """
+        return run_steps(self.repair_steps(land, labels, max_count))
+    
+    def repair_steps(
+        self,
+        land: np.ndarray,
+        labels: np.ndarray,
+        max_count: Optional[int] = None
+    ) -> Steps[Optional[PartitionResult]]:
+        """
+        Доводит готовое разбиение до гарантий steps (этап 'partition').
+        
+        Нераспределенная суша делится на новые провинции или достается
+        соседям, маленькие провинции исправляются так же, как после роста
+        в steps. Провинции исходного разбиения должны быть связными.
+        
+        Args:
+            land: Маска суши формы (height, width)
+            labels: Сетка меток той же формы (отрицательные - вне провинций)
+            max_count: Наибольшее число провинций; по умолчанию - сколько
+                провинций min_size помещается на суше
+        
+        Returns:
+            Steps[Optional[PartitionResult]]: Генератор этапов, возвращающий
+                разбиение или None
+        """
+        land = np.asarray(land, dtype=bool)
+        total = int(land.sum())
+        if total == 0:
+            return None
+        if max_count is None:
+            max_count = total // self.min_size
+        
+        grid = _Grid(np.pad(land, 1))
+        labels = np.where(land & (labels >= 0), labels, NO_PROVINCE).astype(np.int32)
+        labels = np.pad(labels, 1, constant_values=NO_PROVINCE).ravel()
+        del land
+        yield from grid.fill_priority(self.rng)
+        return (yield from self._finish(grid, labels, max_count))
+    
+    def _finish(self, grid: '_Grid', labels: np.ndarray, max_count: int) -> Steps[Optional[PartitionResult]]:
+        """
+        Распределяет остатки суши, исправляет маленькие провинции и проверяет результат.
+        
+        Args:
+            grid: Сетка с рамкой
+            labels: Плоский массив меток (изменяется на месте)
+            max_count: Наибольшее число провинций
+        """
+        yield from self._split_leftovers(grid, labels, max_count)
+        for _ in range(REPAIR_PASSES):
+            small = yield from self._rebalance(grid, labels)
+            if not small and not self._has_leftovers(grid, labels):
+                break
+            yield 'partition'
+            yield from self._release_small(grid, labels)
+            yield from self._split_leftovers(grid, labels, max_count)
+        
+        # Карманы без семян остаются свободными: присоединять их сверх
+        # max_size нельзя, поэтому такое разбиение не удалось
+        if self._has_leftovers(grid, labels):
+            return None
+        yield 'partition'
+        
+        labels = yield from self._merge_small(labels.reshape(grid.shape))
+        labels, sizes = self._compact(labels)
+        yield 'partition'
+        
+        if ((sizes < self.min_size) | (sizes > self.max_size)).any() or sizes.size > max_count:
+            return None
+        return PartitionResult(labels.reshape(grid.shape)[1:-1, 1:-1].copy(), sizes)
+    
+    def _province_count(self, total: int, requested: Optional[int]) -> Optional[int]:
+        """Выбирает число провинций, совместимое с ограничениями размера."""
+        low = -(-total // self.max_size)
+        high = total // self.min_size
+        if low > high:
+            return None
+        
+        if requested is None:
+            requested = round(total / self.ideal_size)
+        return int(min(max(requested, low, 1), high, total))
+    
+    def _grow(self, grid: '_Grid', labels: np.ndarray, cap) -> Steps[None]:
+        """
+        Выращивает провинции в свободную сушу, пока это возможно.
+        
+        Раунд роста делится на порции этапа 'partition' по STEP_CELLS
+        клеток фронта.
+        
+        Args:
+            grid: Сетка с рамкой
+            labels: Плоский массив меток (изменяется на месте)
+            cap: Лимит размера провинции - число или массив по провинциям
+        """
+        count = int(labels.max()) + 1
+        sizes = np.bincount(labels[labels >= 0], minlength=count)
+        caps = np.broadcast_to(np.asarray(cap, dtype=np.int64), (count,))
+        # Первый фронт - только свободные клетки рядом с провинциями:
+        # остальные раунд все равно отбросил бы, а на большой карте их
+        # миллионы
+        frontier = np.flatnonzero(
+            grid.land & (labels == NO_PROVINCE) & grid.near(labels >= 0)
+        )
+        yield 'partition'
+        while frontier.size:
+            frontier = yield from self._grow_round(grid, labels, sizes, frontier, caps)
+    
+    @classmethod
+    def _grow_round(
+        cls,
+        grid: '_Grid',
+        labels: np.ndarray,
+        sizes: np.ndarray,
+        frontier: np.ndarray,
+        caps: np.ndarray
+    ) -> Steps[np.ndarray]:
+        """
+        Выполняет один раунд роста.
+        
+        Returns:
+            Steps[np.ndarray]: Генератор этапов, возвращающий клетки фронта
+                для следующего раунда
+        """
+        # Выбор провинций не меняет метки, поэтому считается порциями
+        best = np.empty(frontier.size, dtype=np.int32)
+        contact = np.empty(frontier.size, dtype=np.int8)
+        for part in chunks(frontier.size):
+            best[part], contact[part] = cls._best_neighbors(
+                grid, labels, sizes, frontier[part], caps
+            )
+            yield 'partition'
+        
+        open_cells = best >= 0
+        frontier, best, contact = frontier[open_cells], best[open_cells], contact[open_cells]
+        if not frontier.size:
+            return frontier
+        
+        # Сначала клетки, сильнее всего прилегающие к провинции: так
+        # провинции остаются компактными и не оставляют карманов.
+        # Провинция принимает не больше клеток, чем осталось до лимита
+        order = np.argsort(_sort_key(best, grid.priority[frontier], contact))
+        frontier, best = frontier[order], best[order]
+        accepted = _group_rank(best) < (caps[best] - sizes[best])
+        
+        added = frontier[accepted]
+        if not added.size:
+            # Ни одна провинция не выросла - ждать больше нечего
+            return added
+        labels[added] = best[accepted]
+        sizes += np.bincount(best[accepted], minlength=sizes.size)
+        yield 'partition'
+        
+        # Следующий фронт: отклоненные клетки и свободные соседи новых
+        neighbors = (added[:, np.newaxis] + grid.offsets).ravel()
+        candidates = np.concatenate([frontier[~accepted], neighbors])
+        candidates = candidates[
+            grid.land[candidates] & (labels[candidates] == NO_PROVINCE)
+        ]
+        return _unique(candidates)
+    
+    @staticmethod
+    def _best_neighbors(
+        grid: '_Grid',
+        labels: np.ndarray,
+        sizes: np.ndarray,
+        cells: np.ndarray,
+        caps: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Выбирает для клеток самую маленькую соседнюю провинцию, у которой еще есть место.
+        
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Провинция (NO_PROVINCE - нет
+                подходящей) и число соседей клетки в этой провинции
+        """
+        best = np.full(cells.size, NO_PROVINCE, dtype=np.int32)
+        best_size = np.full(cells.size, np.iinfo(np.int64).max)
+        for offset in grid.offsets:
+            neighbor = labels[cells + offset]
+            province = np.maximum(neighbor, 0)
+            neighbor_size = np.where(neighbor >= 0, sizes[province], best_size)
+            better = (neighbor_size < caps[province]) & (neighbor_size < best_size)
+            best[better] = neighbor[better]
+            best_size[better] = neighbor_size[better]
+        
+        contact = np.zeros(cells.size, dtype=np.int8)
+        for offset in grid.offsets:
+            contact += labels[cells + offset] == best
+        return best, contact
+    
+    @staticmethod
+    def _relaxed_seeds(labels: np.ndarray, width: int) -> Steps[np.ndarray]:
+        """
+        Сдвигает семена в центроиды провинций (релаксация Ллойда).
+        
+        Новое семя - клетка провинции, ближайшая к ее центроиду, поэтому
+        оно всегда лежит на суше внутри своей провинции.
+        
+        Returns:
+            Steps[np.ndarray]: Генератор этапов, возвращающий семена в
+                порядке номеров провинций
+        """
+        cells = np.flatnonzero(labels >= 0)
+        # intp и float64 - типы, которые bincount иначе копировал бы сам
+        owner = labels[cells].astype(np.intp)
+        
+        count = int(owner.max()) + 1
+        sizes = np.bincount(owner, minlength=count)
+        present = sizes > 0
+        yield 'partition'
+        
+        # Квадрат расстояния до центроида по одной оси за раз: массивов
+        # размером с сушу одновременно живет как можно меньше
+        distance = np.zeros(cells.size)
+        for axis in (np.remainder, np.floor_divide):
+            coordinate = axis(cells, width, dtype=np.float64)
+            center = np.bincount(owner, weights=coordinate, minlength=count)
+            center[present] /= sizes[present]
+            coordinate -= center[owner]
+            coordinate *= coordinate
+            distance += coordinate
+            yield 'partition'
+        
+        # Первая (в построчном порядке) клетка с наименьшим расстоянием в
+        # каждой провинции - групповые минимумы без сортировки
+        nearest = np.full(count, np.inf)
+        np.minimum.at(nearest, owner, distance)
+        hit = distance == nearest[owner]
+        first = np.full(count, labels.size, dtype=np.intp)
+        np.minimum.at(first, owner[hit], cells[hit])
+        return first[present]
+    
+    def _split_leftovers(self, grid: '_Grid', labels: np.ndarray, limit: int) -> Steps[None]:
+        """
+        Разбивает нераспределенные области суши на новые провинции.
+        
+        Каждая область получает собственные семена (по числу провинций,
+        которые в нее помещаются) и заполняется ростом. Всего провинций
+        остается не больше limit: семена сначала получают области без
+        соседних провинций, затем крупные области; области без семян
+        добираются соседними провинциями только до max_size.
+        
+        Args:
+            grid: Сетка с рамкой
+            labels: Плоский массив меток (изменяется на месте)
+            limit: Наибольшее число провинций
+        """
+        cells, region, region_count = yield from self._leftover_regions(grid, labels)
+        if not region_count:
+            return
+        
+        region_size = np.bincount(region, minlength=region_count)
+        seed_count = np.clip(
+            np.rint(region_size / self.ideal_size),
+            -(-region_size // self.max_size),
+            None
+        ).astype(np.int64)
+        seed_count = np.clip(seed_count, 1, np.maximum(region_size // self.min_size, 1))
+        seed_count = self._limit_seeds(labels, grid, cells, region, region_size, seed_count, limit)
+        
+        # Семена - клетки области с наименьшим случайным приоритетом
+        order = np.argsort(_sort_key(region, grid.priority[cells]))
+        cells, region = cells[order], region[order]
+        seeds = cells[_group_rank(region) < seed_count[region]]
+        yield 'partition'
+        
+        next_id = int(labels.max()) + 1
+        labels[seeds] = np.arange(next_id, next_id + seeds.size, dtype=np.int32)
+        
+        # Сначала делим область поровну между ее семенами, не давая расти
+        # старым провинциям, затем добираем остатки до max_size
+        caps = np.bincount(labels[labels >= 0], minlength=next_id + seeds.size)
+        share = -(-region_size // np.maximum(seed_count, 1))
+        caps[next_id:] = np.minimum(np.repeat(share, seed_count), self.max_size)
+        yield from self._grow(grid, labels, caps)
+        yield from self._grow(grid, labels, self.max_size)
+    
+    @staticmethod
+    def _leftover_regions(
+        grid: '_Grid',
+        labels: np.ndarray
+    ) -> Steps[Tuple[np.ndarray, np.ndarray, int]]:
+        """
+        Находит связные области свободной суши.
+        
+        Сетка номеров областей нужна только здесь, поэтому она не
+        держится во время роста новых провинций.
+        
+        Returns:
+            Steps[Tuple[np.ndarray, np.ndarray, int]]: Генератор этапов,
+                возвращающий свободные клетки, номер области каждой клетки
+                (с нуля) и число областей
+        """
+        leftover = grid.land & (labels == NO_PROVINCE)
+        cells = np.flatnonzero(leftover)
+        if not cells.size:
+            return cells, cells, 0
+        regions, region_count = yield from label_components_steps(
+            leftover.reshape(grid.shape), 'partition'
+        )
+        return cells, regions.ravel()[cells] - 1, region_count
+    
+    @staticmethod
+    def _limit_seeds(
+        labels: np.ndarray,
+        grid: '_Grid',
+        cells: np.ndarray,
+        region: np.ndarray,
+        region_size: np.ndarray,
+        seed_count: np.ndarray,
+        limit: int
+    ) -> np.ndarray:
+        """
+        Урезает число семян областей так, чтобы провинций было не больше limit.
+        
+        Область, не граничащая ни с одной провинцией, получает одно семя
+        в любом случае: присоединить ее не к чему.
+        """
+        present = int(np.count_nonzero(np.bincount(labels[labels >= 0])))
+        budget = limit - present
+        if seed_count.sum() <= budget:
+            return seed_count
+        
+        touches = np.zeros(region_size.size, dtype=bool)
+        for offset in grid.offsets:
+            touches[region[labels[cells + offset] >= 0]] = True
+        
+        limited = (~touches).astype(np.int64)
+        budget -= int(limited.sum())
+        # Остальные семена - крупным областям в первую очередь
+        for index in np.argsort(-region_size, kind='stable'):
+            if budget <= 0:
+                break
+            extra = min(int(seed_count[index] - limited[index]), budget)
+            limited[index] += extra
+            budget -= extra
+        return limited
+    
+    def _rebalance(self, grid: '_Grid', labels: np.ndarray) -> Steps[bool]:
+        """
+        Передает маленьким провинциям клетки соседей с запасом размера.
+        
+        За раунд каждая провинция отдает не больше одной клетки, а
+        отдаются только простые клетки (удаление которых не
+        меняет связность донора), поэтому все провинции остаются связными.
+        Каждый раунд - отдельная порция этапа 'partition'.
+        
+        Returns:
+            Steps[bool]: Генератор этапов; True если после передачи
+                остались провинции меньше min_size
+        """
+        sizes = np.bincount(labels[labels >= 0])
+        small = (sizes > 0) & (sizes < self.min_size)
+        small_cells = np.flatnonzero((labels >= 0) & small[np.maximum(labels, 0)])
+        yield 'partition'
+        for _ in range(self.max_size):
+            small = (sizes > 0) & (sizes < self.min_size)
+            small_cells = small_cells[small[labels[small_cells]]]
+            if not small_cells.size:
+                return False
+            spare = sizes > self.min_size
+            
+            # Клетки доноров, граничащие с маленькими провинциями
+            cells = _unique((small_cells[:, np.newaxis] + grid.offsets).ravel())
+            cells = cells[(labels[cells] >= 0) & spare[np.maximum(labels[cells], 0)]]
+            receiver = np.full(cells.size, NO_PROVINCE, dtype=np.int32)
+            receiver_size = np.full(cells.size, self.min_size)
+            for offset in grid.offsets:
+                neighbor = labels[cells + offset]
+                neighbor_size = np.where(
+                    neighbor >= 0, sizes[np.maximum(neighbor, 0)], self.min_size
+                )
+                better = neighbor_size < receiver_size
+                receiver[better] = neighbor[better]
+                receiver_size[better] = neighbor_size[better]
+            
+            border = receiver >= 0
+            cells, receiver = cells[border], receiver[border]
+            donor = labels[cells]
+            simple = grid.is_simple(labels, cells, donor)
+            cells, receiver, donor = cells[simple], receiver[simple], donor[simple]
+            if not cells.size:
+                return True
+            
+            # По одной клетке на донора; получатель берет не больше,
+            # чем ему не хватает до min_size
+            order = np.argsort(_sort_key(donor, grid.priority[cells]))
+            cells, receiver, donor = cells[order], receiver[order], donor[order]
+            first = np.r_[True, donor[1:] != donor[:-1]]
+            cells, receiver = cells[first], receiver[first]
+            order = np.argsort(receiver, kind='stable')
+            cells, receiver = cells[order], receiver[order]
+            accepted = _group_rank(receiver) < self.min_size - sizes[receiver]
+            cells, receiver = cells[accepted], receiver[accepted]
+            
+            sizes -= np.bincount(labels[cells], minlength=sizes.size)
+            sizes += np.bincount(receiver, minlength=sizes.size)
+            labels[cells] = receiver
+            small_cells = np.concatenate([small_cells, cells])
+            yield 'partition'
+        
+        return bool(((sizes > 0) & (sizes < self.min_size)).any())
+    
+    @staticmethod
+    def _has_leftovers(grid: '_Grid', labels: np.ndarray) -> bool:
+        """Проверяет, осталась ли суша вне провинций."""
+        return bool((grid.land & (labels == NO_PROVINCE)).any())
+    
+    def _release_small(self, grid: '_Grid', labels: np.ndarray) -> Steps[bool]:
+        """
+        Освобождает провинции меньше min_size и свободные карманы вместе с соседями.
+        
+        Маленькая провинция или карман, на который не хватило семян,
+        обычно зажаты соседями, уже достигшими max_size; освобожденная
+        область разбивается заново целиком.
+        
+        Returns:
+            Steps[bool]: Генератор этапов; True если хотя бы одна провинция
+                освобождена
+        """
+        sizes = np.bincount(labels[labels >= 0])
+        small = (sizes > 0) & (sizes < self.min_size)
+        owner = np.maximum(labels, 0)
+        stuck = ((labels >= 0) & small[owner]) | (grid.land & (labels == NO_PROVINCE))
+        if not stuck.any():
+            return False
+        yield 'partition'
+        
+        released = small.copy()
+        for _ in range(RELEASE_RINGS):
+            area = stuck | ((labels >= 0) & released[owner])
+            released[labels[grid.near(area) & (labels >= 0)]] = True
+            yield 'partition'
+        freed = np.flatnonzero((labels >= 0) & released[owner])
+        labels[freed] = NO_PROVINCE
+        # Новые приоритеты: иначе область разобьется точно так же, как раньше
+        grid.priority[freed] = self.rng.random(freed.size)
+        return True
+    
+    def _merge_small(self, labels: np.ndarray) -> Steps[np.ndarray]:
+        """
+        Присоединяет провинции меньше min_size к соседям.
+        
+        Провинция сливается с самым маленьким соседом, если сумма не
+        превышает max_size. Слияние двух смежных связных провинций
+        остается связным.
+        
+        Args:
+            labels: Двумерная сетка меток
+        
+        Returns:
+            Steps[np.ndarray]: Генератор этапов, возвращающий сетку меток
+                после слияний
+        """
+        count = int(labels.max()) + 1
+        while True:
+            sizes = np.bincount(labels[labels >= 0], minlength=count)
+            small = np.flatnonzero((sizes > 0) & (sizes < self.min_size))
+            if not small.size:
+                return labels
+            
+            # Пары отсортированы по первой провинции
+            pairs = province_adjacency_pairs(labels)
+            target = np.arange(count)
+            merged = np.zeros(count, dtype=bool)
+            yield 'partition'
+            for index, province in enumerate(small):
+                if index % MERGES_PER_STEP == MERGES_PER_STEP - 1:
+                    yield 'partition'
+                if merged[province]:
+                    continue
+                start, stop = np.searchsorted(pairs[:, 0], [province, province + 1])
+                neighbors = pairs[start:stop, 1]
+                neighbors = neighbors[~merged[neighbors]]
+                fits = neighbors[sizes[neighbors] + sizes[province] <= self.max_size]
+                if not fits.size:
+                    continue
+                best = fits[np.argmin(sizes[fits])]
+                target[province] = best
+                sizes[best] += sizes[province]
+                sizes[province] = 0
+                merged[province] = True
+                merged[best] = True
+            
+            if not merged.any():
+                return labels
+            labels = np.where(labels >= 0, target[np.maximum(labels, 0)], labels)
+            labels = labels.astype(np.int32)
+            yield 'partition'
+    
+    @staticmethod
+    def _compact(labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Перенумеровывает провинции подряд с нуля."""
+        count = int(labels.max()) + 1
+        sizes = np.bincount(labels[labels >= 0], minlength=count)
+        present = sizes > 0
+        remap = np.full(count, NO_PROVINCE, dtype=np.int32)
+        remap[present] = np.arange(int(present.sum()), dtype=np.int32)
+        labels = np.where(labels >= 0, remap[np.maximum(labels, 0)], NO_PROVINCE)
+        return labels.astype(np.int32), sizes[present]
+
+def _sort_key(groups: np.ndarray, priority: np.ndarray, rank: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Ключ сортировки: по группе, затем по убыванию rank, затем по приоритету.
+    
+    Один argsort по ключу заменяет np.lexsort((priority, -rank, groups)) и
+    заметно быстрее. Приоритет лежит в [0, 1), поэтому он меняет порядок
+    только внутри равных старших ключей.
+    
+    Args:
+        groups: Номера групп (целые, не больше 2^24)
+        priority: Случайные приоритеты клеток
+        rank: Второй ключ (0 <= rank < RANK_LEVELS); по умолчанию не учитывается
+    """
+    key = groups * float(RANK_LEVELS)
+    if rank is not None:
+        key += RANK_LEVELS - 1 - rank
+    key += priority
+    return key
+
+def _group_rank(keys: np.ndarray) -> np.ndarray:
+    """Возвращает номер элемента внутри группы равных подряд идущих ключей."""
+    if not keys.size:
+        return np.zeros(0, dtype=np.int64)
+    group_start = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    group_size = np.diff(np.r_[group_start, keys.size])
+    return np.arange(keys.size) - np.repeat(group_start, group_size)
+
+def _unique(values: np.ndarray) -> np.ndarray:
+    """Возвращает отсортированные уникальные значения целочисленного массива."""
+    values = np.sort(values)
+    if not values.size:
+        return values
+    return values[np.r_[True, values[1:] != values[:-1]]]
+
+class _Grid:
+    """Плоское представление сетки с рамкой для роста провинций."""
+    
+    def __init__(self, padded_land: np.ndarray):
+        self.shape = padded_land.shape
+        self.width = padded_land.shape[1]
+        self.land = padded_land.ravel()
+        self.offsets = np.array([1, -1, self.width, -self.width])
+        # Случайный приоритет клеток разрешает конфликты за лимит
+        # (заполняется fill_priority)
+        self.priority = np.empty(self.land.size)
+    
+    def fill_priority(self, rng: np.random.Generator) -> Steps[None]:
+        """
+        Заполняет приоритеты клеток порциями этапа 'partition'.
+        
+        Значения те же, что у одного вызова rng.random(размер сетки).
+        """
+        for part in chunks(self.priority.size):
+            self.priority[part] = rng.random(part.stop - part.start)
+            yield 'partition'
+    
+    def near(self, mask: np.ndarray) -> np.ndarray:
+        """
+        Находит клетки, у которых есть сосед из плоской маски mask.
+        
+        Сдвиги считаются срезами, без массивов индексов: клетки рамки не
+        бывают сушей, поэтому переход через край строки ничего не меняет.
+        """
+        result = np.zeros(mask.size, dtype=bool)
+        for offset in self.offsets:
+            if offset > 0:
+                result[:-offset] |= mask[offset:]
+            else:
+                result[-offset:] |= mask[:offset]
+        return result
+    
+    def is_simple(
+        self,
+        labels: np.ndarray,
+        cells: np.ndarray,
+        province: np.ndarray
+    ) -> np.ndarray:
+        """
+        Проверяет, что удаление клеток не разрывает их провинции.
+        
+        Используется число связности Йокои для 4-связности: клетка
+        простая, если ее соседи из той же провинции образуют в кольце
+        3x3 ровно одну компоненту.
+        """
+        width = self.width
+        # Кольцо 3x3 против часовой стрелки, начиная с восточного соседа
+        ring = (1, 1 - width, -width, -1 - width, -1, width - 1, width, width + 1)
+        inside = [labels[cells + offset] == province for offset in ring]
+        number = np.zeros(cells.size, dtype=np.int8)
+        for k in (0, 2, 4, 6):
+            number += inside[k] & ~(inside[k + 1] & inside[(k + 2) % 8])
+        return number == 1
+    
+    def seed_labels(self, seeds: np.ndarray) -> np.ndarray:
+        """Создает плоский массив меток с провинциями-семенами."""
+        labels = np.full(self.land.size, NO_PROVINCE, dtype=np.int32)
+        labels[seeds] = np.arange(seeds.size, dtype=np.int32)
+        return labels
+
+def province_adjacency_pairs(labels: np.ndarray) -> np.ndarray:
+    """
+    Находит пары соседних провинций.
+    
+    Args:
+        labels: Двумерная сетка меток провинций
+    
+    Returns:
+        np.ndarray: Уникальные пары (a, b) формы (n, 2), обе ориентации,
+            отсортированные по a, затем по b
+    """
+    count = int(labels.max()) + 1
+    keys = []
+    for a, b in ((labels[:, :-1], labels[:, 1:]), (labels[:-1, :], labels[1:, :])):
+        border = (a != b) & (a >= 0) & (b >= 0)
+        a = a[border].astype(np.int64)
+        b = b[border].astype(np.int64)
+        keys.append(a * count + b)
+        keys.append(b * count + a)
+    keys = np.unique(np.concatenate(keys))
+    return np.stack(np.divmod(keys, count), axis=1)
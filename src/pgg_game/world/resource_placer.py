@@ -0,0 +1,163 @@
+"""
+Размещение ресурсов на карте.
+
+Слой ресурсов строится для всей карты за один проход по типам ресурсов из
+MapGenerationSettings.resource_clusters. Для каждого ресурса свой шум
+задает, где его скопления: свободная суша с наибольшими значениями шума
+(доля chance от свободной суши) образует кандидатов, а связные области
+кандидатов меньше min_size клеток отбрасываются. Ресурсы размещаются в
+порядке словаря настроек, поэтому первые (редкие) ресурсы не вытесняются
+последующими. Все шаги - операции над массивами; размещение выполняется
+по этапам (см. pipeline): порция - полоса сетки или шаг разметки скоплений.
+"""
+from dataclasses import replace
+from typing import Dict
+
+import numpy as np
+
+from ..components.resource import ResourceType
+from .connectivity import label_components_steps
+from .map_generator_settings import MapGenerationSettings
+from .noise_generator import create_noise_generator, heightmap_bands
+from .pipeline import Steps, grid_bands, run_steps
+from .seeding import derive_seed
+
+# Код клетки без ресурса в слое ресурсов
+NO_RESOURCE = 0
+
+# Количество кодов слоя ресурсов (включая NO_RESOURCE)
+RESOURCE_CODES = max(resource.value for resource in ResourceType) + 1
+
+# Шум скоплений ресурсов: мельче и проще шума рельефа
+RESOURCE_NOISE_OCTAVES = 3
+RESOURCE_NOISE_SCALE = 120.0
+
+class ResourcePlacer:
+    """Строит слой ресурсов по маске суши."""
+    
+    def __init__(self, settings: MapGenerationSettings):
+        """
+        Args:
+            settings: Настройки генерации (resource_clusters и сид карты)
+        """
+        self.settings = settings
+    
+    def place(self, land: np.ndarray) -> np.ndarray:
+        """
+        Размещает ресурсы на суше (все этапы сразу, см. steps).
+        
+        Args:
+            land: Маска суши формы (height, width)
+        
+        Returns:
+            np.ndarray: Слой ресурсов int8 (значения ResourceType,
+                NO_RESOURCE - клетка без ресурса)
+        """
+        return run_steps(self.steps(land))
+    
+    def steps(self, land: np.ndarray) -> Steps[np.ndarray]:
+        """
+        Размещает ресурсы на суше по этапам (этап 'resources').
+        
+        Args:
+            land: Маска суши формы (height, width)
+        
+        Returns:
+            Steps[np.ndarray]: Генератор этапов, возвращающий слой ресурсов
+        """
+        layer = np.zeros(land.shape, dtype=np.int8)
+        free = np.asarray(land, dtype=bool).copy()
+        for name, cluster in self.settings.resource_clusters.items():
+            resource = ResourceType[name]
+            clusters = yield from self._clusters(
+                resource, free, cluster['chance'], cluster['min_size']
+            )
+            for rows in grid_bands(land.shape):
+                layer[rows][clusters[rows]] = resource.value
+                free[rows] &= ~clusters[rows]
+                yield 'resources'
+        return layer
+    
+    def _clusters(
+        self,
+        resource: ResourceType,
+        free: np.ndarray,
+        chance: float,
+        min_size: int
+    ) -> Steps[np.ndarray]:
+        """Находит скопления ресурса на свободной суше."""
+        total = int(free.sum())
+        target = min(int(round(total * chance)), total)
+        if target <= 0:
+            return np.zeros(free.shape, dtype=bool)
+        
+        if target == total:
+            candidates = free
+        else:
+            # Порог - target-е по величине значение шума на свободной суше
+            values = yield from self._field(resource, free)
+            threshold = np.partition(values, total - target)[total - target]
+            yield 'resources'
+            candidates = np.zeros(free.shape, dtype=bool)
+            start = 0
+            for rows in grid_bands(free.shape):
+                band = free[rows]
+                end = start + int(band.sum())
+                candidates[rows][band] = values[start:end] >= threshold
+                start = end
+                yield 'resources'
+        
+        labels, count = yield from label_components_steps(candidates, 'resources')
+        sizes = np.zeros(count + 1, dtype=np.int64)
+        for rows in grid_bands(free.shape):
+            sizes += np.bincount(labels[rows].ravel(), minlength=count + 1)
+            yield 'resources'
+        sizes[0] = 0
+        kept = sizes >= min_size
+        clusters = np.zeros(free.shape, dtype=bool)
+        for rows in grid_bands(free.shape):
+            clusters[rows] = kept[labels[rows]]
+            yield 'resources'
+        return clusters
+    
+    def _field(self, resource: ResourceType, free: np.ndarray) -> Steps[np.ndarray]:
+        """
+        Шум скоплений ресурса, свой для каждого ресурса и карты.
+        
+        Шум считается полосами, а хранятся только значения на свободных
+        клетках (в построчном порядке, как field[free]).
+        """
+        config = replace(
+            self.settings.noise_config,
+            seed=derive_seed(self.settings.seed, 'resources', resource.name),
+            octaves=RESOURCE_NOISE_OCTAVES,
+            scale=RESOURCE_NOISE_SCALE
+        )
+        height, width = free.shape
+        values = []
+        for rows, band in heightmap_bands(create_noise_generator(config), width, height):
+            values.append(band[free[rows]])
+            yield 'resources'
+        return np.concatenate(values)
+
+def resource_totals(labels: np.ndarray, layer: np.ndarray, province_count: int) -> np.ndarray:
+    """
+    Считает клетки каждого ресурса в каждой провинции одним bincount.
+    
+    Args:
+        labels: Сетка меток провинций (отрицательные - вне провинций)
+        layer: Слой ресурсов
+        province_count: Количество провинций (метки 0..province_count - 1)
+    
+    Returns:
+        np.ndarray: Массив формы (province_count, RESOURCE_CODES):
+            [провинция, код ресурса] -> число клеток
+    """
+    inside = labels >= 0
+    keys = labels[inside].astype(np.int64) * RESOURCE_CODES + layer[inside]
+    counts = np.bincount(keys, minlength=province_count * RESOURCE_CODES)
+    return counts[:province_count * RESOURCE_CODES].reshape(province_count, RESOURCE_CODES)
+
+def totals_by_type(row: np.ndarray) -> Dict[ResourceType, int]:
+    """Переводит строку resource_totals в словарь по типам ресурсов."""
+    return {resource: int(row[resource.value]) for resource in ResourceType}
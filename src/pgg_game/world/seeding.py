@@ -0,0 +1,52 @@
+"""
+Производные сиды и локальные генераторы случайных чисел.
+
+Вся случайность генерации карты выводится из одного сида карты:
+каждый генератор получает собственный random.Random или
+numpy.random.Generator и не трогает глобальное состояние модуля random.
+Поэтому карты можно строить параллельно в потоках и процессах,
+а один и тот же сид всегда дает один и тот же результат.
+"""
+import random
+import zlib
+from typing import Union
+
+import numpy as np
+
+# Диапазон случайного сида карты по умолчанию
+MAX_SEED = 2 ** 31 - 1
+
+SeedKey = Union[int, str]
+
+def random_seed() -> int:
+    """Возвращает новый случайный сид карты."""
+    return random.SystemRandom().randint(0, MAX_SEED)
+
+def derive_seed(seed: int, *keys: SeedKey) -> int:
+    """
+    Выводит независимый сид из сида карты и набора ключей.
+    
+    Args:
+        seed: Сид карты
+        keys: Ключи подсистемы (например, 'noise' или ('province', 3))
+    
+    Returns:
+        int: Производный сид
+    """
+    entropy = [int(seed) & 0xFFFFFFFF]
+    for key in keys:
+        if isinstance(key, str):
+            entropy.append(zlib.crc32(key.encode('utf-8')))
+        else:
+            entropy.append(int(key) & 0xFFFFFFFF)
+    
+    state = np.random.SeedSequence(entropy).generate_state(1)
+    return int(state[0]) & MAX_SEED
+
+def make_rng(seed: int, *keys: SeedKey) -> random.Random:
+    """Создает локальный random.Random для подсистемы."""
+    return random.Random(derive_seed(seed, *keys))
+
+def make_np_rng(seed: int, *keys: SeedKey) -> np.random.Generator:
+    """Создает локальный numpy.random.Generator для подсистемы."""
+    return np.random.default_rng(derive_seed(seed, *keys))
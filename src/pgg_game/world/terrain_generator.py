@@ -0,0 +1,213 @@
+"""
+Генерация рельефа острова.
+
+Карта высот строится полосами строк, затем к ней по полосам применяются
+спад к краям карты и порог уровня воды (полная карта высот после порога
+не хранится), сглаживание клеточным автоматом и выбор самой большой
+связной области суши. Все шаги - операции над массивами NumPy.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+from .connectivity import largest_component_steps
+from .map_generator_settings import MapGenerationSettings
+from .noise_generator import NoiseGenerator, ParallelNoise, create_noise_generator
+from .noise_generator import HEIGHTMAP_BAND_CELLS, PARALLEL_BAND_CELLS, heightmap_bands
+from .pipeline import Steps, row_bands, run_steps
+
+# Порог числа соседей (из 8), при котором клетка становится сушей
+SMOOTHING_LAND_NEIGHBORS = 5
+# Порог числа соседей (из 8), при котором суша остается сушей
+SMOOTHING_KEEP_NEIGHBORS = 4
+# Степень спада высоты к краям (больше - круче спад у самого края)
+FALLOFF_EXPONENT = 4
+
+def neighbor_count(mask: np.ndarray) -> np.ndarray:
+    """
+    Считает соседей-единиц для каждой клетки (окрестность Мура, 8 клеток).
+    
+    Args:
+        mask: Булева маска
+    
+    Returns:
+        np.ndarray: Сетка количества соседей (int8)
+    """
+    padded = np.pad(mask.astype(np.int8), 1)
+    height, width = mask.shape
+    total = np.zeros(mask.shape, dtype=np.int8)
+    for dy in range(3):
+        for dx in range(3):
+            if dx == 1 and dy == 1:
+                continue
+            total += padded[dy:dy + height, dx:dx + width]
+    return total
+
+class TerrainGenerator:
+    """Генератор рельефа: превращает шум в сетку суши и воды."""
+    
+    def __init__(
+        self,
+        settings: MapGenerationSettings,
+        noise: Optional[NoiseGenerator] = None,
+        noise_executor: Optional[ProcessPoolExecutor] = None
+    ):
+        """
+        Args:
+            settings: Параметры генерации карты
+            noise: Генератор шума; по умолчанию создается из settings.noise_config
+                на settings.noise_workers процессах
+            noise_executor: Общий пул процессов для шума (см.
+                noise_generator.create_noise_executor); без него при
+                noise_workers > 1 пул запускается для каждой карты высот
+        """
+        self.settings = settings
+        # Свой пул процессов генератора шума закрывается после каждой
+        # карты высот; переданные генератор и пул закрывает вызывающий код
+        self._owns_noise = noise is None
+        self.noise = noise or create_noise_generator(
+            settings.noise_config,
+            workers=settings.noise_workers,
+            executor=noise_executor
+        )
+    
+    def generate(self, width: int, height: int) -> np.ndarray:
+        """
+        Генерирует сетку острова.
+        
+        Args:
+            width: Ширина карты в клетках
+            height: Высота карты в клетках
+        
+        Returns:
+            np.ndarray: Сетка int32 (1 - суша, 0 - вода)
+        """
+        return run_steps(self.steps(width, height))
+    
+    def steps(self, width: int, height: int) -> Steps[np.ndarray]:
+        """
+        Генерирует сетку острова по этапам (см. pipeline).
+        
+        Этапы: 'terrain' - по порции на полосу карты высот (см.
+        heightmap_bands) и на полосу порога воды, 'smoothing' - по порции
+        на полосу каждого прохода сглаживания и выбора самой большой
+        области суши (см. pipeline.STEP_CELLS).
+        
+        Returns:
+            Steps[np.ndarray]: Генератор этапов, возвращающий сетку острова
+        """
+        land = yield from self._land_steps(width, height)
+        
+        for _ in range(self.settings.smoothing_passes):
+            smoothed = np.empty_like(land)
+            for rows in row_bands(width, height):
+                smoothed[rows] = self._smooth_rows(land, rows)
+                yield 'smoothing'
+            land = smoothed
+        land = yield from largest_component_steps(land, 'smoothing')
+        
+        grid = np.empty((height, width), dtype=np.int32)
+        for rows in row_bands(width, height):
+            grid[rows] = land[rows]
+            yield 'smoothing'
+        return grid
+    
+    def _land_steps(self, width: int, height: int) -> Steps[np.ndarray]:
+        """
+        Строит маску суши по карте высот (этап 'terrain').
+        
+        Карта высот - локальная переменная этого генератора и
+        освобождается сразу после порога воды.
+        """
+        # Пулу процессов нужны крупные полосы, иначе тайлов не хватит на
+        # всех; такую карту высот и так считают не порциями кадра
+        parallel = isinstance(self.noise, ParallelNoise)
+        band_cells = PARALLEL_BAND_CELLS if parallel else HEIGHTMAP_BAND_CELLS
+        heights = np.empty((height, width), dtype=np.float64)
+        low, high = np.inf, -np.inf
+        try:
+            for rows, band in heightmap_bands(self.noise, width, height, band_cells):
+                heights[rows] = band
+                low = min(low, band.min())
+                high = max(high, band.max())
+                yield 'terrain'
+        finally:
+            if self._owns_noise and parallel:
+                self.noise.close()
+        
+        span = high - low
+        land = np.empty((height, width), dtype=bool)
+        for rows in row_bands(width, height):
+            band = self._normalize(heights[rows], low, span)
+            band *= self._edge_falloff(width, height, rows)
+            land[rows] = band > self.settings.water_level
+            yield 'terrain'
+        return land
+    
+    def _edge_falloff(self, width: int, height: int, rows: slice = slice(None)) -> np.ndarray:
+        """
+        Строит множитель спада высоты к краям карты для строк rows.
+        
+        В центре множитель равен 1, к краю убывает до 0; клетки в пределах
+        edge_buffer от края всегда обнуляются.
+        """
+        buffer = self.settings.edge_buffer
+        xs = np.arange(width, dtype=np.float64)
+        ys = np.arange(height, dtype=np.float64)[rows]
+        
+        # Нормированное расстояние от центра: 1 на границе буфера
+        half_w = max((width - 1) / 2 - buffer, 1.0)
+        half_h = max((height - 1) / 2 - buffer, 1.0)
+        nx = (xs - (width - 1) / 2) / half_w
+        ny = (ys - (height - 1) / 2) / half_h
+        
+        distance = np.sqrt(nx[np.newaxis, :] ** 2 + ny[:, np.newaxis] ** 2)
+        falloff = np.clip(1.0 - distance ** FALLOFF_EXPONENT, 0.0, 1.0)
+        
+        edge = np.minimum(
+            np.minimum(xs, width - 1 - xs)[np.newaxis, :],
+            np.minimum(ys, height - 1 - ys)[:, np.newaxis]
+        )
+        falloff[edge < buffer] = 0.0
+        return falloff
+    
+    @staticmethod
+    def _normalize(heights: np.ndarray, low: float, span: float) -> np.ndarray:
+        """Приводит высоты к диапазону [0, 1] по минимуму и размаху всей карты."""
+        if span <= 0:
+            return np.zeros_like(heights)
+        return (heights - low) / span
+    
+    @staticmethod
+    def _smooth_rows(land: np.ndarray, rows: slice) -> np.ndarray:
+        """Один проход сглаживания (см. smooth) для строк rows."""
+        # Соседи считаются по полосе с запасом в строку сверху и снизу
+        top = max(rows.start - 1, 0)
+        window = land[top:rows.stop + 1]
+        neighbors = neighbor_count(window)[rows.start - top:rows.stop - top]
+        band = land[rows]
+        return (
+            (neighbors >= SMOOTHING_LAND_NEIGHBORS) |
+            (band & (neighbors >= SMOOTHING_KEEP_NEIGHBORS))
+        )
+    
+    @staticmethod
+    def smooth(land: np.ndarray, passes: int) -> np.ndarray:
+        """
+        Сглаживает береговую линию клеточным автоматом.
+        
+        Args:
+            land: Булева маска суши
+            passes: Количество проходов
+        
+        Returns:
+            np.ndarray: Сглаженная маска суши
+        """
+        for _ in range(passes):
+            neighbors = neighbor_count(land)
+            land = (
+                (neighbors >= SMOOTHING_LAND_NEIGHBORS) |
+                (land & (neighbors >= SMOOTHING_KEEP_NEIGHBORS))
+            )
+        return land
@@ -0,0 +1,62 @@
+"""Проверки разметки связных областей по обходу в ширину."""
+from collections import deque
+
+import numpy as np
+
+from src.pgg_game.world.connectivity import disconnected_labels, label_components, label_regions
+
+def reference_regions(labels: np.ndarray) -> np.ndarray:
+    """
+    Размечает 4-связные области равных неотрицательных меток обходом в ширину.
+    
+    Области нумеруются с 1 в порядке первой клетки, 0 - фон.
+    """
+    height, width = labels.shape
+    regions = np.zeros(labels.shape, dtype=np.int32)
+    count = 0
+    for y in range(height):
+        for x in range(width):
+            if labels[y, x] < 0 or regions[y, x]:
+                continue
+            count += 1
+            regions[y, x] = count
+            queue = deque([(y, x)])
+            while queue:
+                cy, cx = queue.popleft()
+                for ny, nx in ((cy + 1, cx), (cy - 1, cx), (cy, cx + 1), (cy, cx - 1)):
+                    if (0 <= ny < height and 0 <= nx < width and not regions[ny, nx]
+                            and labels[ny, nx] == labels[cy, cx]):
+                        regions[ny, nx] = count
+                        queue.append((ny, nx))
+    return regions
+
+def random_grids(count: int):
+    """Случайные сетки меток разной формы и плотности (отрицательные - фон)."""
+    rng = np.random.default_rng(19)
+    for _ in range(count):
+        shape = tuple(rng.integers(1, 16, 2))
+        values = int(rng.integers(1, 5))
+        labels = rng.integers(0, values, shape)
+        labels[rng.random(shape) < rng.random()] = -1
+        yield labels.astype(np.int32)
+
+def test_labelling_matches_bfs():
+    """label_components, label_regions и disconnected_labels совпадают с обходом."""
+    for labels in random_grids(500):
+        mask = labels >= 0
+        expected = reference_regions(np.where(mask, 0, -1))
+        components, count = label_components(mask)
+        assert np.array_equal(components, expected)
+        assert count == expected.max()
+        
+        expected = reference_regions(labels)
+        regions, count = label_regions(labels)
+        assert np.array_equal(regions, expected)
+        assert count == expected.max()
+        
+        # Метка несвязна, если у нее больше одной области
+        owners = {}
+        for label, region in zip(labels[mask].tolist(), expected[mask].tolist()):
+            owners.setdefault(label, set()).add(region)
+        split = sorted(label for label, found in owners.items() if len(found) > 1)
+        assert disconnected_labels(labels).tolist() == split
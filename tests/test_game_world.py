@@ -0,0 +1,73 @@
+"""Проверки кэша запросов игрового мира."""
+from dataclasses import dataclass
+
+from src.pgg_game.world.game_world import GameWorld
+
+@dataclass
+class Position:
+    x: int = 0
+
+@dataclass
+class Health:
+    value: int = 10
+
+def world_with(count: int) -> GameWorld:
+    """Мир из count сущностей с Position и Health."""
+    world = GameWorld()
+    for _ in range(count):
+        entity = world.create_entity()
+        world.add_component(entity, Position())
+        world.add_component(entity, Health())
+    return world
+
+def entities(world: GameWorld) -> set:
+    """Сущности запроса (Position, Health)."""
+    return {row[0] for row in world.query(Position, Health)}
+
+def test_query_follows_add_component():
+    """Добавленный компонент попадает в уже построенный запрос."""
+    world = world_with(2)
+    assert entities(world) == {0, 1}
+    
+    entity = world.create_entity()
+    world.add_component(entity, Position())
+    assert entities(world) == {0, 1}
+    world.add_component(entity, Health())
+    
+    assert entities(world) == {0, 1, entity}
+    
+    # Замена компонента обновляет строку запроса
+    health = Health(3)
+    world.add_component(entity, health)
+    rows = {row[0]: row for row in world.query(Position, Health)}
+    assert rows[entity][2] is health
+
+def test_query_follows_remove_component():
+    """Удаленный компонент убирает сущность из запроса."""
+    world = world_with(3)
+    assert entities(world) == {0, 1, 2}
+    
+    world.remove_component(1, Health)
+    
+    assert entities(world) == {0, 2}
+
+def test_query_follows_remove_entity():
+    """Удаленная сущность пропадает из запроса."""
+    world = world_with(3)
+    assert entities(world) == {0, 1, 2}
+    
+    world.remove_entity(2)
+    
+    assert entities(world) == {0, 1}
+
+def test_query_allows_changes_while_iterating():
+    """Во время обхода запроса компоненты можно удалять и добавлять."""
+    world = world_with(4)
+    
+    for entity, position, health in world.query(Position, Health):
+        world.remove_component(entity, Health)
+        other = world.create_entity()
+        world.add_component(other, Position())
+        world.add_component(other, Health())
+    
+    assert entities(world) == {4, 5, 6, 7}
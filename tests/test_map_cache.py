@@ -0,0 +1,72 @@
+"""Проверки дискового кэша карт."""
+import dataclasses
+import os
+
+import numpy as np
+import pytest
+
+from src.pgg_game.world import map_cache
+from src.pgg_game.world.map_cache import CACHE_SUFFIX, CachedMap, MapCache, map_cache_key
+from src.pgg_game.world.map_generator_settings import MapGenerationSettings
+
+def small_map(seed: int = 0) -> CachedMap:
+    """Небольшая карта для записи в кэш."""
+    grid = np.zeros((6, 8), dtype=np.int8)
+    grid[1:5, 1:7] = 1
+    labels = np.where(grid == 1, 0, -1).astype(np.int32)
+    return CachedMap(seed, grid, labels, np.zeros_like(grid))
+
+def test_key_ignores_execution_fields():
+    """Способ поиска карты (процессы попыток и шума) не меняет ключ."""
+    settings = MapGenerationSettings(seed=3)
+    other = dataclasses.replace(settings, parallel_attempts=4, noise_workers=3)
+    
+    assert map_cache_key(other) == map_cache_key(settings)
+
+def test_key_depends_on_noise_config():
+    """Ключ меняется вместе с конфигурацией шума."""
+    settings = MapGenerationSettings(seed=3)
+    noise_config = dataclasses.replace(settings.noise_config, octaves=4)
+    other = dataclasses.replace(settings, noise_config=noise_config)
+    
+    assert map_cache_key(other) != map_cache_key(settings)
+
+def test_key_depends_on_generator_version(monkeypatch):
+    """Новая версия генератора не находит старые карты."""
+    settings = MapGenerationSettings(seed=3)
+    key = map_cache_key(settings)
+    monkeypatch.setattr(map_cache, 'GENERATOR_VERSION', map_cache.GENERATOR_VERSION + 1)
+    
+    assert map_cache_key(settings) != key
+
+def test_failed_store_keeps_previous_entry(tmp_path, monkeypatch):
+    """Прерванная запись не портит карту и не оставляет временных файлов."""
+    cache = MapCache(str(tmp_path))
+    cache.store('key', small_map(seed=1))
+    
+    def broken_save(file, **arrays):
+        file.write(b'partial')
+        raise OSError("диск заполнен")
+    
+    monkeypatch.setattr(np, 'savez_compressed', broken_save)
+    with pytest.raises(OSError):
+        cache.store('key', small_map(seed=2))
+    
+    assert os.listdir(tmp_path) == ['key' + CACHE_SUFFIX]
+    assert cache.load('key').seed == 1
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    """При переполнении удаляется карта, к которой дольше всего не обращались."""
+    cache = MapCache(str(tmp_path))
+    for key in ('a', 'b', 'c'):
+        cache.store(key, small_map())
+    size = os.path.getsize(cache._path('a'))
+    for age, key in enumerate(('a', 'b', 'c')):
+        os.utime(cache._path(key), (1000 + age, 1000 + age))
+    
+    # Обращение обновляет время файла: самой давней становится 'b'
+    assert cache.load('a') is not None
+    cache.max_bytes = 3 * size
+    cache.store('d', small_map())
+    
+    assert sorted(os.listdir(tmp_path)) == ['a' + CACHE_SUFFIX, 'c' + CACHE_SUFFIX, 'd' + CACHE_SUFFIX]
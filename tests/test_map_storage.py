@@ -0,0 +1,43 @@
+"""Проверки хранения карт в файлах."""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from src.pgg_game.world.map_storage import META_FILE, STORAGE_VERSION, load_map, save_map
+
+def saved_map(directory: str) -> np.ndarray:
+    """Сохраняет небольшую карту и возвращает ее метки."""
+    grid = np.zeros((6, 8), dtype=np.int8)
+    grid[1:5, 1:7] = 1
+    labels = np.where(grid == 1, 0, -1).astype(np.int32)
+    save_map(directory, 7, grid, labels)
+    return labels
+
+def rewrite_meta(directory: str, **values) -> None:
+    """Меняет поля meta.json сохраненной карты."""
+    path = os.path.join(directory, META_FILE)
+    with open(path, encoding='utf-8') as file:
+        meta = json.load(file)
+    meta.update(values)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(meta, file)
+
+def test_map_loads_after_generator_change(tmp_path):
+    """Карта открывается, даже если ее записала другая версия генератора."""
+    labels = saved_map(str(tmp_path))
+    rewrite_meta(str(tmp_path), generator=-1)
+    
+    stored = load_map(str(tmp_path))
+    
+    assert stored.seed == 7
+    assert np.array_equal(stored.labels, labels)
+
+def test_map_of_other_format_is_rejected(tmp_path):
+    """Карта другого формата файлов не открывается."""
+    saved_map(str(tmp_path))
+    rewrite_meta(str(tmp_path), format=STORAGE_VERSION + 1)
+    
+    with pytest.raises(ValueError):
+        load_map(str(tmp_path))
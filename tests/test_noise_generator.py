@@ -0,0 +1,45 @@
+"""Проверки пакетной генерации шума."""
+import numpy as np
+import pytest
+
+from src.pgg_game.world.noise_generator import (
+    NoiseConfig,
+    NoiseKernel,
+    ParallelNoise,
+    SimplexNoise,
+    create_noise_executor
+)
+
+@pytest.mark.parametrize('kernel', list(NoiseKernel))
+def test_grid_matches_scalar_noise(kernel):
+    """noise2d_grid совпадает с noise2d, в том числе при отрицательных координатах."""
+    noise = SimplexNoise(NoiseConfig(seed=11, octaves=3, scale=7.0, kernel=kernel))
+    xs = np.linspace(-3.3, 2.9, 23)
+    ys = np.linspace(-2.7, 3.1, 17)
+    
+    grid = noise.noise2d_grid(xs, ys)
+    
+    expected = [[noise.noise2d(x, y) for x in xs] for y in ys]
+    np.testing.assert_allclose(grid, expected, rtol=0, atol=1e-12)
+
+def test_parallel_noise_matches_serial():
+    """Тайлы в пуле процессов дают ту же карту высот, что и один процесс."""
+    config = NoiseConfig(seed=5)
+    with ParallelNoise(config, workers=2, tile_size=16) as noise:
+        parallel = noise.heightmap(50, 37)
+    
+    assert np.array_equal(parallel, SimplexNoise(config).heightmap(50, 37))
+
+def test_shared_pool_serves_several_configs():
+    """Один пул процессов считает шум разных конфигураций без перезапуска."""
+    executor = create_noise_executor(2)
+    try:
+        for seed in (1, 2, 1):
+            config = NoiseConfig(seed=seed)
+            noise = ParallelNoise(config, workers=2, tile_size=16, executor=executor)
+            parallel = noise.heightmap(40, 30)
+            noise.close()
+            
+            assert np.array_equal(parallel, SimplexNoise(config).heightmap(40, 30))
+    finally:
+        executor.shutdown()
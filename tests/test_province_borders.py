@@ -0,0 +1,242 @@
+"""Случайные проверки границ и соседства провинций против полного пересчета."""
+import random
+from typing import Dict, Set, Tuple
+
+import numpy as np
+import pytest
+
+from src.pgg_game.components.province import Province
+from src.pgg_game.components.province_info import ProvinceInfoComponent
+from src.pgg_game.world.grid_kernels import FREE
+from src.pgg_game.world.province_graph import ProvinceGraph
+from src.pgg_game.world.province_manager import ProvinceManager
+
+DIRECTIONS = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+
+def full_border(cells: Set[Tuple[int, int]]) -> Set[Tuple[int, int]]:
+    """Граница, пересчитанная с нуля: клетки с соседом вне множества."""
+    return {
+        (x, y) for x, y in cells
+        if any((x + dx, y + dy) not in cells for dx, dy in DIRECTIONS)
+    }
+
+def full_contacts(labels: np.ndarray) -> Dict[Tuple[int, int], int]:
+    """Длины общих границ провинций, посчитанные перебором клеток."""
+    contacts: Dict[Tuple[int, int], int] = {}
+    height, width = labels.shape
+    for y in range(height):
+        for x in range(width):
+            for nx, ny in ((x + 1, y), (x, y + 1)):
+                if nx >= width or ny >= height:
+                    continue
+                first, second = int(labels[y, x]), int(labels[ny, nx])
+                if first != second and first != FREE and second != FREE:
+                    pair = (min(first, second), max(first, second))
+                    contacts[pair] = contacts.get(pair, 0) + 1
+    return contacts
+
+def connected(cells: Set[Tuple[int, int]]) -> bool:
+    """Проверяет 4-связность клеток обходом в ширину."""
+    if not cells:
+        return True
+    start = next(iter(cells))
+    seen = {start}
+    queue = [start]
+    while queue:
+        x, y = queue.pop()
+        for dx, dy in DIRECTIONS:
+            cell = (x + dx, y + dy)
+            if cell in cells and cell not in seen:
+                seen.add(cell)
+                queue.append(cell)
+    return len(seen) == len(cells)
+
+def assert_manager_consistent(manager: ProvinceManager) -> None:
+    """Сравнивает клетки, границы, соседство и граф с полным пересчетом."""
+    contacts = full_contacts(manager.labels)
+    pairs, lengths = manager.graph.edges()
+    assert dict(zip(map(tuple, pairs.tolist()), lengths.tolist())) == contacts
+    
+    for province_id, province in manager.provinces.items():
+        ys, xs = np.nonzero(manager.labels == province_id)
+        cells = set(zip(xs.tolist(), ys.tolist()))
+        assert province.cells == cells
+        assert province.size == len(cells)
+        assert province.border_cells == full_border(cells)
+        expected = {
+            second if first == province_id else first
+            for first, second in contacts
+            if province_id in (first, second)
+        }
+        assert province.neighbors == expected
+    
+    rebuilt = ProvinceGraph.from_labels(manager.labels, manager.next_id)
+    for built, expected in zip(manager.adjacency(), rebuilt.csr()):
+        assert np.array_equal(built, expected)
+
+@pytest.mark.parametrize('seed', range(20))
+def test_province_border_matches_full_recompute(seed):
+    """Пошаговые и пакетные изменения клеток дают ту же границу, что и пересчет."""
+    rng = random.Random(seed)
+    province = Province(0, 0, 0)
+    cells: Set[Tuple[int, int]] = set()
+    
+    for _ in range(300):
+        operation = rng.random()
+        cell = (rng.randrange(10), rng.randrange(10))
+        batch = [(rng.randrange(10), rng.randrange(10)) for _ in range(rng.randint(0, 6))]
+        if operation < 0.5:
+            province.add_cell(cell)
+            cells.add(cell)
+        elif operation < 0.8:
+            province.remove_cell(cell)
+            cells.discard(cell)
+        elif operation < 0.9:
+            province.add_cells(batch)
+            cells.update(batch)
+        else:
+            province.remove_cells(batch)
+            cells.difference_update(batch)
+        
+        if rng.random() < 0.3:
+            assert province.border_cells == full_border(cells)
+    
+    assert province.cells == cells
+    assert province.border_cells == full_border(cells)
+    for x in range(-1, 11):
+        for y in range(-1, 11):
+            assert province.contains((x, y)) == ((x, y) in cells)
+
+@pytest.mark.parametrize('seed', range(20))
+def test_manager_neighbors_match_full_recompute(seed):
+    """Соседство и граф после добавления клеток и удаления провинций."""
+    rng = random.Random(seed)
+    size = rng.randint(4, 14)
+    manager = ProvinceManager(seed=seed, shape=(size, size))
+    manager.config.max_size = 40
+    ids = [manager.create_province() for _ in range(rng.randint(2, 7))]
+    
+    for _ in range(600):
+        province_id = rng.choice(ids)
+        manager.add_cell_to_province(province_id, (rng.randrange(size), rng.randrange(size)))
+        if rng.random() < 0.01 and len(ids) > 1:
+            manager.remove_province(ids.pop(rng.randrange(len(ids))))
+    
+    assert_manager_consistent(manager)
+
+@pytest.mark.parametrize('seed', range(30))
+def test_transfer_cells_keeps_provinces_connected(seed):
+    """Передачи клеток с разделением сохраняют связность и согласованность."""
+    rng = random.Random(seed)
+    size = rng.randint(5, 16)
+    
+    # Провинции - ячейки Вороного со случайными дырами
+    points = [(rng.randrange(size), rng.randrange(size)) for _ in range(rng.randint(2, 6))]
+    ys, xs = np.mgrid[0:size, 0:size]
+    distance = np.stack([(xs - px) ** 2 + (ys - py) ** 2 for px, py in points])
+    labels = distance.argmin(axis=0).astype(np.int32)
+    labels[np.random.default_rng(seed).random((size, size)) < 0.1] = FREE
+    
+    manager = ProvinceManager(seed=seed)
+    manager.load_labels(labels)
+    for province_id in manager.disconnected_provinces():
+        manager.split_if_disconnected(province_id)
+    assert not manager.disconnected_provinces()
+    assert_manager_consistent(manager)
+    
+    for _ in range(25):
+        source_id = rng.choice(list(manager.provinces))
+        source = manager.provinces[source_id]
+        neighbors = sorted(source.neighbors)
+        if not neighbors:
+            continue
+        target_id = rng.choice(neighbors)
+        
+        xs, ys = source.cell_arrays()
+        cells = list(zip(xs.tolist(), ys.tolist()))
+        chosen = [cell for cell in cells if manager._is_adjacent(cell, target_id)]
+        chosen = rng.sample(chosen, rng.randint(1, len(chosen)))
+        if rng.random() < 0.2:
+            chosen = cells
+        sizes = {i: p.size for i, p in manager.provinces.items()}
+        
+        manager.transfer_cells(source_id, target_id, chosen)
+        
+        assert not manager.disconnected_provinces()
+        assert sum(p.size for p in manager.provinces.values()) == sum(sizes.values())
+        assert manager.provinces[target_id].size == sizes[target_id] + len(chosen)
+        assert (source_id in manager.provinces) == (len(chosen) < sizes[source_id])
+        for province_id, province in manager.provinces.items():
+            assert province.size and connected(province.cells)
+            assert manager.labels[province.center_y, province.center_x] == province_id
+        assert_manager_consistent(manager)
+
+def test_split_if_disconnected_keeps_largest_part():
+    """Разделение оставляет наибольшую часть исходной провинции."""
+    labels = np.array([
+        [0, 0, 0, FREE, 0],
+        [0, 0, 0, FREE, FREE],
+        [FREE, FREE, FREE, FREE, 0],
+    ], dtype=np.int32)
+    manager = ProvinceManager(seed=1)
+    manager.load_labels(labels)
+    
+    created = manager.split_if_disconnected(0)
+    
+    assert len(created) == 2
+    assert manager.provinces[0].size == 6
+    assert sorted(manager.provinces[i].size for i in created) == [1, 1]
+    assert not manager.disconnected_provinces()
+    assert_manager_consistent(manager)
+
+def test_transfer_cells_rejects_detached_cells():
+    """Клетки, не примыкающие к целевой провинции, не передаются."""
+    labels = np.array([
+        [0, 0, 0, 1],
+        [0, 0, 0, 1],
+    ], dtype=np.int32)
+    manager = ProvinceManager(seed=1)
+    manager.load_labels(labels)
+    
+    with pytest.raises(ValueError):
+        manager.transfer_cells(0, 1, [(0, 0)])
+    with pytest.raises(ValueError):
+        manager.transfer_cells(1, 0, [(0, 0)])
+    assert_manager_consistent(manager)
+
+def test_transfer_of_all_cells_removes_source():
+    """Провинция, отдавшая все клетки, удаляется вместе с ребрами графа."""
+    labels = np.array([
+        [0, 0, 1, 1],
+        [0, 0, 1, 2],
+    ], dtype=np.int32)
+    manager = ProvinceManager(seed=1)
+    manager.load_labels(labels)
+    
+    created = manager.transfer_cells(2, 1, [(3, 1)])
+    
+    assert created == []
+    assert 2 not in manager.provinces
+    assert manager.provinces[0].neighbors == {1}
+    assert manager.provinces[1].neighbors == {0}
+    assert manager.graph.neighbors(1) == [0]
+    assert manager.province_at((3, 1)) == 1
+    assert_manager_consistent(manager)
+
+def test_linked_province_info_is_read_only():
+    """Клетки и соседи связанной провинции не перезаписываются молча."""
+    labels = np.array([
+        [0, 0, 1, 1],
+        [0, 0, 1, 1],
+    ], dtype=np.int32)
+    manager = ProvinceManager(seed=1)
+    manager.load_labels(labels)
+    info = ProvinceInfoComponent("Провинция", province=manager.provinces[0])
+    
+    with pytest.raises(AttributeError):
+        info.neighbors = set()
+    with pytest.raises(AttributeError):
+        info.cells = {(0, 0)}
+    assert info.province is manager.provinces[0]
+    assert info.neighbors == {1}
+    assert info.size == 4
@@ -0,0 +1,114 @@
+"""Проверки разбиения суши на провинции на случайных островах."""
+from collections import deque
+
+import numpy as np
+import pytest
+
+from src.pgg_game.world.map_builder import FAILURE_COVERAGE, MapBuilder
+from src.pgg_game.world.map_generator_settings import MapGenerationSettings
+from src.pgg_game.world.province_partitioner import NO_PROVINCE, ProvincePartitioner
+from src.pgg_game.world.terrain_generator import TerrainGenerator
+
+def island(seed: int, width: int = 80, height: int = 60) -> np.ndarray:
+    """Маска суши настоящего рельефа."""
+    settings = MapGenerationSettings(seed=seed, width=width, height=height)
+    return TerrainGenerator(settings).generate(width, height) == 1
+
+def connected(mask: np.ndarray) -> bool:
+    """Проверяет 4-связность маски обходом в ширину."""
+    cells = np.argwhere(mask)
+    if not cells.size:
+        return True
+    seen = np.zeros_like(mask)
+    seen[tuple(cells[0])] = True
+    queue = deque([tuple(cells[0])])
+    while queue:
+        y, x = queue.popleft()
+        for ny, nx in ((y + 1, x), (y - 1, x), (y, x + 1), (y, x - 1)):
+            if 0 <= ny < mask.shape[0] and 0 <= nx < mask.shape[1]:
+                if mask[ny, nx] and not seen[ny, nx]:
+                    seen[ny, nx] = True
+                    queue.append((ny, nx))
+    return int(seen.sum()) == len(cells)
+
+def assert_valid_partition(result, land, min_size, max_size, max_count):
+    """Проверяет все гарантии ProvincePartitioner.steps."""
+    labels = result.labels
+    assert labels.shape == land.shape
+    assert (labels[~land] == NO_PROVINCE).all()
+    assert (labels[land] >= 0).all()
+    
+    sizes = np.bincount(labels[labels >= 0])
+    assert np.array_equal(sizes, result.sizes)
+    assert result.province_count <= max_count
+    assert ((sizes >= min_size) & (sizes <= max_size)).all()
+    for province in range(result.province_count):
+        assert connected(labels == province)
+
+@pytest.mark.parametrize('seed', range(12))
+def test_partition_covers_island_with_valid_provinces(seed):
+    """Разбиение настоящего острова выполняет все гарантии."""
+    land = island(seed)
+    partitioner = ProvincePartitioner(15, 45, np.random.default_rng(seed))
+    
+    result = partitioner.partition(land)
+    
+    # Острова из нескольких кусков бывают неразбиваемыми; тогда None
+    if result is not None:
+        assert_valid_partition(result, land, 15, 45, int(land.sum()) // 15)
+
+def test_partition_usually_succeeds():
+    """Разбиение находится для большинства островов."""
+    found = sum(
+        ProvincePartitioner(15, 45, np.random.default_rng(seed)).partition(island(seed)) is not None
+        for seed in range(12)
+    )
+    assert found >= 9
+
+@pytest.mark.parametrize('seed', range(8))
+def test_partition_respects_max_count(seed):
+    """Провинций не больше max_count даже при большом желаемом числе."""
+    land = island(seed)
+    total = int(land.sum())
+    max_count = total // 40
+    partitioner = ProvincePartitioner(10, 60, np.random.default_rng(seed))
+    
+    result = partitioner.partition(land, province_count=max_count, max_count=max_count)
+    
+    if result is not None:
+        assert_valid_partition(result, land, 10, 60, max_count)
+
+@pytest.mark.parametrize('seed', range(8))
+def test_partition_of_rectangle_always_succeeds(seed):
+    """Прямоугольник разбивается всегда, в том числе с дырами воды."""
+    rng = np.random.default_rng(seed)
+    land = np.zeros((30, 40), dtype=bool)
+    land[2:-2, 2:-2] = True
+    land[rng.integers(3, 27, 6), rng.integers(3, 37, 6)] = False
+    
+    result = ProvincePartitioner(12, 30, rng).partition(land)
+    
+    assert result is not None
+    assert_valid_partition(result, land, 12, 30, int(land.sum()) // 12)
+
+def test_partition_rejects_impossible_sizes():
+    """Остров меньше min_size разбить нельзя."""
+    land = np.zeros((6, 6), dtype=bool)
+    land[1:3, 1:3] = True
+    assert ProvincePartitioner(5, 10, np.random.default_rng(0)).partition(land) is None
+
+def test_verify_rejects_unassigned_land():
+    """Проверка карты отклоняет сушу вне провинций."""
+    grid = np.zeros((6, 8), dtype=np.int32)
+    grid[1:5, 1:7] = 1
+    labels = np.where(grid == 1, 0, NO_PROVINCE).astype(np.int32)
+    labels[1:5, 4:7] = 1
+    labels[1, 1] = NO_PROVINCE
+    
+    builder = MapBuilder.from_labels(grid, labels, seed=0)
+    builder.province_manager.config.update(
+        min_provinces=1, max_provinces=2, min_size=4, max_size=20
+    )
+    
+    assert not builder._verify_provinces()
+    assert builder.failure == FAILURE_COVERAGE